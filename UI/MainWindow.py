@@ -1,8 +1,19 @@
+import importlib
 import os
 import tkinter as tk
 from UI.styles.theme import apply_theme
 
 class MainWindow(tk.Tk):
+
+    # Pantallas de la app: nombre → (módulo, clase). Se importan y crean la
+    # primera vez que se muestran
+    SCREENS = {
+        "home": ("UI.screens.HomeScreen", "HomeScreen"),
+        "spot": ("UI.screens.SpotConstructionScreen", "SpotConstructionScreen"),
+        "trace_import": ("UI.screens.TraceImportScreen", "TraceImportScreen"),
+        "crl": ("UI.screens.CRLScreen", "CRLScreen"),
+    }
+
     def __init__(self, controller):
         super().__init__()
 
@@ -12,6 +23,10 @@ class MainWindow(tk.Tk):
 
         self.controller = controller
 
+        # Pool de pantallas vivas y la visible
+        self._screens = {}
+        self._current = None
+
         self._set_app_icon()   # 👈 AQUÍ
         self.init_ui()
 
@@ -37,5 +52,35 @@ class MainWindow(tk.Tk):
             print(f"[WARN] No se pudo cargar el icono: {e}")
 
     def init_ui(self):
-        from UI.screens.HomeScreen import HomeScreen
-        HomeScreen(self, controller=self.controller)
+        self.show_screen("home")
+
+    def show_screen(self, name):
+        """
+        Navegación: las pantallas no se destruyen, se ocultan con
+        pack_forget. Al volver a una ya creada se llama a su on_show(), que
+        refresca solo lo que haya cambiado en el controller.
+        """
+        screen = self._screens.get(name)
+
+        if self._current is not None and self._current is not screen:
+            self._current.pack_forget()
+
+        if screen is None:
+            module, cls = self.SCREENS[name]
+            # El constructor de cada pantalla se empaqueta y carga sus datos
+            screen = getattr(importlib.import_module(module), cls)(self, controller=self.controller)
+            self._screens[name] = screen
+        elif screen is not self._current:
+            screen.pack(fill="both", expand=True)
+            screen.on_show()
+
+        self._current = screen
+        return screen
+
+    def refresh_screen(self):
+        """
+        Refresca la pantalla visible tras un cambio que llega en segundo
+        plano (p. ej. el fin de una importación abandonada).
+        """
+        if self._current is not None:
+            self._current.on_show()
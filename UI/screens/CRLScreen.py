@@ -26,9 +26,20 @@ class CRLScreen(tk.Frame):
         self.final_crl_pair = None
         self.final_crl_origin = None
         self.active_row_bbox = None
+        # SCP desglosado que se está mostrando
+        self.parsed_scp = None
 
         self.create_widgets()
 
+    def on_show(self):
+        """
+        Vuelta a la pantalla (pool de MainWindow): solo se repinta si el SCP
+        desglosado del controller ya no es el que se muestra.
+        """
+        parsed_scp = getattr(self.controller, "last_parsed_scp", None)
+        if parsed_scp is None or parsed_scp is not self.parsed_scp:
+            self.render()
+
     # ================= UI =================
 
     def create_widgets(self):
@@ -38,6 +49,17 @@ class CRLScreen(tk.Frame):
             on_back=self.go_back
         )
 
+        self.body = tk.Frame(self, bg=BG_MAIN)
+        self.body.pack(fill="both", expand=True)
+
+        self.render()
+
+    def render(self):
+        for widget in self.body.winfo_children():
+            widget.destroy()
+        self.parsed_scp = None
+        self.active_row_bbox = None
+
         parsed_scp = getattr(self.controller, "last_parsed_scp", None)
         if not parsed_scp:
             messagebox.showwarning("Sin datos", "No hay ningún SCP desglosado.")
@@ -60,20 +82,17 @@ class CRLScreen(tk.Frame):
 
         self.render_crl_summary(crls)
         self.render_rungs_table(crls, notional)
+        self.parsed_scp = parsed_scp
 
     # ================= NAV =================
 
     def go_back(self):
-        for widget in self.master.winfo_children():
-            widget.destroy()
-
-        from UI.screens.HomeScreen import HomeScreen
-        HomeScreen(self.master, controller=self.controller)
+        self.master.show_screen("home")
 
     # ================= SUMMARY =================
 
     def render_crl_summary(self, crls):
-        summary_wrapper = tk.Frame(self, bg=BG_MAIN)
+        summary_wrapper = tk.Frame(self.body, bg=BG_MAIN)
         summary_wrapper.pack(fill="x", pady=20)
 
         summary = tk.Frame(summary_wrapper, bg=BG_MAIN)
@@ -132,7 +151,7 @@ class CRLScreen(tk.Frame):
     # ================= TABLE =================
 
     def render_rungs_table(self, crls, notional):
-        frame = tk.Frame(self, bg=BG_MAIN)
+        frame = tk.Frame(self.body, bg=BG_MAIN)
         frame.pack(fill="both", expand=True, padx=40, pady=10)
 
         canvas = tk.Canvas(frame, bg=BG_MAIN, highlightthickness=0)
@@ -242,7 +261,7 @@ class CRLScreen(tk.Frame):
             return
 
         try:
-            data = explain_triangulation(self.controller.last_parsed_scp)
+            data = explain_triangulation(self.parsed_scp)
             self.show_calculation_popup(data)
         except Exception as e:
             messagebox.showerror("Calculation error", str(e))
@@ -252,7 +271,9 @@ class CRLScreen(tk.Frame):
     def show_calculation_popup(self, data):
         popup = tk.Toplevel(self)
         popup.title("Price construction")
-        popup.geometry("560x440")
+        # Cada pata extra añade una línea en BID y otra en ASK
+        extra_legs = len(data["bid"]["components"]) - 2
+        popup.geometry(f"560x{440 + 44 * extra_legs + (40 if data.get('mismatches') else 0)}")
         popup.configure(bg=BG_MAIN)
         popup.resizable(False, False)
         popup.transient(self)
@@ -291,7 +312,7 @@ class CRLScreen(tk.Frame):
             for comp in payload["components"]:
                 tk.Label(
                     card,
-                    text=f"{comp['pair']} ({comp[title.lower()]})",
+                    text=f"{'1/' if comp.get('inverted') else ''}{comp['pair']} ({comp[title.lower()]})",
                     font=FONT_NORMAL,
                     bg=BG_PANEL,
                     fg=TEXT_SECONDARY
@@ -306,4 +327,17 @@ class CRLScreen(tk.Frame):
             ).pack(anchor="w", padx=14, pady=(8, 0))
 
         block("BID", data["bid"], "#10B981")
-        block("ASK", data["ask"], "#EF4444")
\ No newline at end of file
+        block("ASK", data["ask"], "#EF4444")
+
+        if data.get("mismatches"):
+            tk.Label(
+                container,
+                text="⚠ Recalculated cross differs from trace: " + ", ".join(
+                    f"{m['field']} {m['trace']} ≠ {m['recomputed']}" for m in data["mismatches"]
+                ),
+                font=FONT_NORMAL,
+                bg=BG_MAIN,
+                fg="#EF4444",
+                wraplength=500,
+                justify="left"
+            ).pack(anchor="w", pady=(8, 0))
\ No newline at end of file
@@ -1,8 +1,12 @@
 import tkinter as tk
 import os
 import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from itertools import zip_longest
 from tkinter import messagebox
-from services.SCPDeleteService import SCPDeleteService
 
 from UI.components.StyledButton import StyledButton
 from UI.components.Header import Header
@@ -17,28 +21,110 @@ from UI.styles.desk_theme import (
     FONT_BOLD
 )
 
+from services import SCPStartupProfileService
 from services.SCPIndexService import SCPIndexService
+from services.SCPRawArchiveService import SCPRawArchiveService
+from services.SCPSearchService import SCPSearchService
 
 
 class HomeScreen(tk.Frame):
 
+    # ── Tabla virtualizada ──
+    # Pool fijo de filas del canvas: al hacer scroll solo se cambian sus
+    # textos. Las filas se piden al catálogo por bloques de FETCH_BLOCK y se
+    # guardan los MAX_CACHED_BLOCKS últimos.
+    VISIBLE_ROWS = 9
+    FETCH_BLOCK = 200
+    MAX_CACHED_BLOCKS = 8
+
+    # (cabecera, campo, ancho); la última columna es la de borrar
+    COLUMNS = [
+        ("PriceID", "priceId", 160),
+        ("CCY Pair", "ccyPair", 110),
+        ("Notional", "notional", 140),
+        ("Venue", "venue", 200),
+        ("Time", "timestamp", 220),
+    ]
+    DELETE_COL_W = 40
+    ROW_H = 38
+    ROW_GAP = 6
+
+    # Intervalo de lectura de la cola de la revalidación (ms)
+    POLL_MS = 50
+    # Al volver a la pantalla sin cambios de la app, se revalida contra
+    # disco solo si la última sincronización es más antigua que esto (ms)
+    RESYNC_MS = 60_000
+    # Reintentos si el catálogo está bloqueado por otra escritura
+    SYNC_RETRY_MS = 1_000
+    MAX_SYNC_RETRIES = 5
+
     def __init__(self, master, controller=None):
         super().__init__(master, bg=BG_MAIN)
         self.controller = controller
 
         # ── Estado SCPs ──
-        self.scps = []
-        self.page = 0
-        self.page_size = 5  # 👈 aquí controlas cuántos por página
+        self.scps = []  # solo las filas visibles
+        self.total_scps = 0
+        self.total_capped = False
+        self.search_filters = {}
+        self.top = 0  # índice de la primera fila visible
+        self.selected_scp_id = getattr(controller, "active_scp_id", None)
+        # scps_version del controller con el que se cargó la tabla
+        self._scps_version = getattr(controller, "scps_version", 0)
+
+        self._blocks = OrderedDict()  # nº de bloque → filas
+        self._search = None
+
+        # Revalidación del catálogo en curso (hilo → cola → after())
+        self._sync_events = None
+        self._sync_poll_id = None
+        self._sync_retry_id = None
+        self._sync_retries = 0
+        # time.monotonic() de la última sincronización correcta
+        self._synced_at = None
 
         # ── Estado tabla ──
-        self.scp_rows = []
+        self.scp_rows = []  # pool de filas del canvas
         self.scp_canvas = None
+        self.scp_scrollbar = None
         self.page_label = None
 
         self.pack(fill="both", expand=True)
         self.create_widgets()
 
+    def destroy(self):
+        if self._sync_poll_id is not None:
+            self.after_cancel(self._sync_poll_id)
+            self._sync_poll_id = None
+        if self._sync_retry_id is not None:
+            self.after_cancel(self._sync_retry_id)
+            self._sync_retry_id = None
+        if self._search is not None:
+            self._search.close()
+            self._search = None
+        super().destroy()
+
+    def on_show(self):
+        """
+        Vuelta a la pantalla (pool de MainWindow): se recarga la tabla y se
+        sincroniza con disco solo si se han importado o borrado SCPs, o si
+        la última sincronización tiene más de RESYNC_MS.
+        """
+        self.selected_scp_id = getattr(self.controller, "active_scp_id", None)
+
+        version = getattr(self.controller, "scps_version", 0)
+        if version != self._scps_version:
+            self._scps_version = version
+            self.top = 0
+            self.reload_scps()
+        else:
+            self.paint_selection()
+            if self._synced_at is not None and \
+                    (time.monotonic() - self._synced_at) * 1000 < self.RESYNC_MS:
+                return
+
+        self.revalidate_scps()
+
     # ================= UI =================
 
     def create_widgets(self):
@@ -71,9 +157,9 @@ class HomeScreen(tk.Frame):
         self.pagination_wrapper = tk.Frame(content, bg=BG_MAIN)
         self.pagination_wrapper.pack(pady=(0, 20))
 
-        self.load_scps()
-        self.render_scp_table()
+        self.build_scp_table()
         self.render_pagination_controls()
+        self.load_scps()
 
     def delete_scp_inline(self, scp):
         scp_id = scp.get("scpId")
@@ -89,6 +175,7 @@ class HomeScreen(tk.Frame):
         if not confirm:
             return
 
+        from services.SCPDeleteService import SCPDeleteService
         service = SCPDeleteService(base_path=os.getcwd())
         deleted = service.delete(scp_id)
 
@@ -97,9 +184,12 @@ class HomeScreen(tk.Frame):
             if self.controller.active_scp_id == scp_id:
                 self.controller.active_scp_id = None
                 self.controller.last_parsed_scp = None
+            if self.selected_scp_id == scp_id:
+                self.selected_scp_id = None
 
-            self.load_scps()
-            self.refresh_scp_table()
+            self.controller.scps_version += 1
+            self._scps_version = self.controller.scps_version
+            self.reload_scps()
 
             messagebox.showinfo(
                 "SCP eliminado",
@@ -108,107 +198,230 @@ class HomeScreen(tk.Frame):
     # ================= DATA =================
 
     def load_scps(self):
-        service = SCPIndexService(base_path=os.getcwd())
-        self.scps = service.list_scps()
-        self.page = 0
-
-    @property
-    def total_pages(self):
-        return max(1, (len(self.scps) - 1) // self.page_size + 1)
+        """
+        Stale-while-revalidate: se pinta al momento lo que ya tiene el
+        catálogo persistente y se sincroniza con history/parsed en segundo
+        plano; si la sincronización encuentra cambios se recarga la tabla.
+        """
+        self.top = 0
+        # El catálogo se abre (y se crea si no existe) en este hilo antes
+        # de lanzar la sincronización
+        self.reload_scps()
+        SCPStartupProfileService.mark("scps.snapshot")
+        self.revalidate_scps()
+
+    def revalidate_scps(self):
+        if self._sync_events is not None or self._sync_retry_id is not None:
+            return
+        # Con una importación en curso el catálogo está en una transacción;
+        # al terminar cambia scps_version y on_show sincroniza
+        if getattr(self.controller, "import_running", False):
+            return
 
-    def _page_text(self):
-        return f"Page {self.page + 1} / {self.total_pages}"
+        self._sync_events = queue.Queue()
+        threading.Thread(
+            target=self._run_sync,
+            args=(os.getcwd(), self._sync_events),
+            daemon=True
+        ).start()
 
-    def refresh_scp_table(self):
-        self.render_scp_table()
         self.update_page_label()
+        self._sync_poll_id = self.after(self.POLL_MS, self._poll_sync)
+
+    @staticmethod
+    def _run_sync(base_path, events):
+        """
+        Se ejecuta en el hilo worker: no toca widgets, solo publica
+        ("synced", stats) o ("failed", error).
+        """
+        try:
+            events.put(("synced", SCPIndexService(base_path=base_path).sync()))
+        except Exception as e:
+            events.put(("failed", str(e)))
 
-    # ================= SCP TABLE =================
+    def _poll_sync(self):
+        self._sync_poll_id = None
 
-    def render_scp_table(self):
-        for w in self.table_wrapper.winfo_children():
-            w.destroy()
+        try:
+            kind, payload = self._sync_events.get_nowait()
+        except queue.Empty:
+            self._sync_poll_id = self.after(self.POLL_MS, self._poll_sync)
+            return
 
-        if not self.scps:
+        self._sync_events = None
+        SCPStartupProfileService.mark("scps.revalidated")
+
+        if kind == "failed":
+            if "database is locked" in payload and self._sync_retries < self.MAX_SYNC_RETRIES:
+                self._sync_retries += 1
+                self._sync_retry_id = self.after(self.SYNC_RETRY_MS, self._retry_sync)
+            else:
+                self._sync_retries = 0
+                print(f"[WARN] No se pudo sincronizar el catálogo: {payload}")
+            self.update_page_label()
             return
 
-        headers = ["PriceID", "CCY Pair", "Notional", "Venue", "Time", ""]
-        col_widths = [160, 110, 140, 200, 220, 40]  # última = delete
-        row_h = 38
-        table_width = sum(col_widths)
+        self._sync_retries = 0
+        self._synced_at = time.monotonic()
+
+        if any(payload.values()):
+            self.reload_scps()
+        else:
+            self.update_page_label()
+
+    def _retry_sync(self):
+        self._sync_retry_id = None
+        self.revalidate_scps()
+
+    def reload_scps(self):
+        """
+        Recuenta el resultado y descarta las filas cacheadas (tras borrar o
+        cambiar los filtros) manteniendo la posición del scroll.
+        """
+        self._blocks.clear()
+        self.total_scps, self.total_capped = self._search_service().count(
+            **self.search_filters
+        )
+        self.top = min(self.top, self._max_top())
+        self.refresh_scp_table()
+
+    def _search_service(self):
+        if self._search is None:
+            self._search = SCPSearchService(base_path=os.getcwd())
+        return self._search
+
+    def _rows(self, start, count):
+        """
+        Filas [start, start + count) del resultado desde los bloques
+        cacheados (solo se consulta el catálogo por los que faltan).
+        """
+        rows = []
+        end = min(start + count, self.total_scps)
+
+        while start < end:
+            number, offset = divmod(start, self.FETCH_BLOCK)
+            chunk = self._block(number)[offset:offset + end - start]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            start += len(chunk)
+
+        return rows
+
+    def _block(self, number):
+        block = self._blocks.get(number)
+
+        if block is None:
+            block = self._search_service().window(
+                number * self.FETCH_BLOCK, self.FETCH_BLOCK, **self.search_filters
+            )
+            self._blocks[number] = block
+            if len(self._blocks) > self.MAX_CACHED_BLOCKS:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(number)
+
+        return block
+
+    def _max_top(self):
+        return max(0, self.total_scps - self.VISIBLE_ROWS)
+
+    def _page_text(self):
+        more = "+" if self.total_capped else ""
+
+        if not self.total_scps:
+            text = "Sin SCPs"
+        else:
+            last = min(self.top + self.VISIBLE_ROWS, self.total_scps)
+            text = f"Rows {self.top + 1}–{last} / {self.total_scps}{more}"
+
+        if self.search_filters:
+            text += f"  ·  {self.total_scps}{more} resultados"
+        if self._sync_events is not None or self._sync_retry_id is not None:
+            text += "  ·  actualizando..."
+        return text
+
+    # ================= SCP TABLE =================
+
+    def build_scp_table(self):
+        """
+        Crea una sola vez el canvas con la cabecera y el pool de filas;
+        refresh_scp_table solo cambia su contenido.
+        """
+        table_width = sum(w for _, _, w in self.COLUMNS) + self.DELETE_COL_W
+        pitch = self.ROW_H + self.ROW_GAP
+        x0, header_y = 0, 16
+        first_y = header_y + self.ROW_H + 10
 
         canvas = tk.Canvas(
             self.table_wrapper,
             bg=BG_MAIN,
             highlightthickness=0,
-            height=260,
+            height=first_y + self.VISIBLE_ROWS * pitch,
             width=table_width
         )
-        canvas.pack(anchor="center")
+        canvas.pack(side="left")
+
+        self.scp_scrollbar = tk.Scrollbar(
+            self.table_wrapper,
+            orient="vertical",
+            command=self.on_scrollbar
+        )
+        self.scp_scrollbar.pack(side="left", fill="y")
+
         canvas.bind("<Button-1>", self.on_scp_click)
+        canvas.bind("<MouseWheel>", self.on_mousewheel)
+        canvas.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        canvas.bind("<Button-5>", lambda e: self.scroll_rows(3))
 
-        self.scp_rows.clear()
         self.scp_canvas = canvas
-
-        x0, y = 0, 16
+        self.scp_rows.clear()
 
         # ── HEADER ─────────────────────────────
         x = x0
-        for h, w in zip(headers, col_widths):
+        for title, _, w in self.COLUMNS:
             canvas.create_text(
                 x + w / 2,
-                y + row_h / 2,
-                text=h,
+                header_y + self.ROW_H / 2,
+                text=title,
                 fill=TEXT_SECONDARY,
                 font=FONT_BOLD
             )
             x += w
 
-        y += row_h + 10
-
-        start = self.page * self.page_size
-        end = start + self.page_size
+        # ── POOL DE FILAS ──────────────────────
+        for slot in range(self.VISIBLE_ROWS):
+            y = first_y + slot * pitch
 
-        # ── ROWS ───────────────────────────────
-        for scp in self.scps[start:end]:
             rect = canvas.create_rectangle(
                 x0, y,
-                x0 + table_width, y + row_h,
+                x0 + table_width, y + self.ROW_H,
                 fill=BG_CARD,
-                outline=BORDER
+                outline=BORDER,
+                state="hidden"
             )
 
-            values = [
-                scp.get("priceId"),
-                scp.get("ccyPair"),
-                scp.get("notional"),
-                scp.get("venue"),
-                scp.get("timestamp")
-            ]
-
             texts = []
             x = x0
-            for val, w in zip(values, col_widths[:-1]):  # sin la col delete
-                t = canvas.create_text(
+            for _, _, w in self.COLUMNS:
+                texts.append(canvas.create_text(
                     x + w / 2,
-                    y + row_h / 2,
-                    text=val,
+                    y + self.ROW_H / 2,
+                    text="",
                     fill=TEXT_PRIMARY,
-                    font=FONT_NORMAL
-                )
-                texts.append(t)
+                    font=FONT_NORMAL,
+                    state="hidden"
+                ))
                 x += w
 
             # ── DELETE ICON ────────────────────
-            delete_x = x0 + table_width - 20
-            delete_y = y + row_h / 2
-
             delete_icon = canvas.create_text(
-                delete_x,
-                delete_y,
+                x0 + table_width - 20,
+                y + self.ROW_H / 2,
                 text="🗑",
                 font=("Segoe UI Emoji", 13),
-                fill="#9CA3AF"
+                fill="#9CA3AF",
+                state="hidden"
             )
 
             # Hover
@@ -228,20 +441,96 @@ class HomeScreen(tk.Frame):
                 )
             )
 
-            # Click delete
+            # Click delete (el SCP es el que ocupe la fila en ese momento)
             canvas.tag_bind(
                 delete_icon, "<Button-1>",
-                lambda e, scp=scp: self.delete_scp_inline(scp)
+                lambda e, slot=slot: self.delete_scp_inline(self.scp_rows[slot]["scp"] or {})
             )
 
             self.scp_rows.append({
-                "bbox": canvas.bbox(rect),
+                "bbox": (x0, y, x0 + table_width, y + self.ROW_H),
                 "rect": rect,
                 "texts": texts,
-                "scp": scp
+                "delete": delete_icon,
+                "scp": None
             })
 
-            y += row_h + 6
+    def refresh_scp_table(self):
+        self.scps = self._rows(self.top, self.VISIBLE_ROWS)
+
+        for row, scp in zip_longest(self.scp_rows, self.scps):
+            row["scp"] = scp
+            state = "normal" if scp else "hidden"
+
+            self.scp_canvas.itemconfig(row["rect"], state=state)
+            self.scp_canvas.itemconfig(row["delete"], state=state)
+            for t, (_, field, _) in zip(row["texts"], self.COLUMNS):
+                value = scp.get(field) if scp else None
+                self.scp_canvas.itemconfig(
+                    t, state=state, text="" if value is None else value
+                )
+
+        self.paint_selection()
+        self.update_scrollbar()
+        self.update_page_label()
+
+    def paint_selection(self):
+        for row in self.scp_rows:
+            selected = (
+                row["scp"] is not None
+                and row["scp"]["scpId"] == self.selected_scp_id
+            )
+            self.scp_canvas.itemconfig(
+                row["rect"], fill=ACCENT_ACTIVE if selected else BG_CARD
+            )
+            for t in row["texts"]:
+                self.scp_canvas.itemconfig(
+                    t, fill="black" if selected else TEXT_PRIMARY
+                )
+
+    # ================= SCROLL =================
+
+    def scroll_to(self, top):
+        top = max(0, int(top))
+
+        # Total acotado (búsquedas): se amplía al llegar al final
+        if self.total_capped and top + self.VISIBLE_ROWS >= self.total_scps:
+            self.total_scps, self.total_capped = self._search_service().count(
+                limit=self.total_scps * 4, **self.search_filters
+            )
+
+        top = min(top, self._max_top())
+        if top != self.top:
+            self.top = top
+            self.refresh_scp_table()
+        else:
+            self.update_scrollbar()
+            self.update_page_label()
+
+    def scroll_rows(self, delta):
+        self.scroll_to(self.top + delta)
+
+    def on_mousewheel(self, event):
+        # Windows: múltiplos de 120; macOS: unidades pequeñas
+        steps = int(event.delta / 120) or (1 if event.delta > 0 else -1)
+        self.scroll_rows(-steps * 3)
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * self.total_scps)
+        elif action == "scroll":
+            step = self.VISIBLE_ROWS if unit == "pages" else 1
+            self.scroll_rows(int(value) * step)
+
+    def update_scrollbar(self):
+        if not self.total_scps:
+            self.scp_scrollbar.set(0, 1)
+            return
+
+        self.scp_scrollbar.set(
+            self.top / self.total_scps,
+            min(1, (self.top + self.VISIBLE_ROWS) / self.total_scps)
+        )
 
     # ================= PAGINATION =================
 
@@ -274,35 +563,25 @@ class HomeScreen(tk.Frame):
             self.page_label.config(text=self._page_text())
 
     def prev_page(self):
-        if self.page > 0:
-            self.page -= 1
-            self.refresh_scp_table()
+        self.scroll_rows(-self.VISIBLE_ROWS)
 
     def next_page(self):
-        if self.page < self.total_pages - 1:
-            self.page += 1
-            self.refresh_scp_table()
+        self.scroll_rows(self.VISIBLE_ROWS)
 
     # ================= INTERACTION =================
 
     def on_scp_click(self, event):
         for row in self.scp_rows:
             x1, y1, x2, y2 = row["bbox"]
-            if x1 <= event.x <= x2 and y1 <= event.y <= y2:
+            if row["scp"] and x1 <= event.x <= x2 and y1 <= event.y <= y2:
                 self.select_scp_row(row)
                 break
 
     def select_scp_row(self, row):
-        for r in self.scp_rows:
-            self.scp_canvas.itemconfig(r["rect"], fill=BG_CARD)
-            for t in r["texts"]:
-                self.scp_canvas.itemconfig(t, fill=TEXT_PRIMARY)
-
-        self.scp_canvas.itemconfig(row["rect"], fill=ACCENT_ACTIVE)
-        for t in row["texts"]:
-            self.scp_canvas.itemconfig(t, fill="black")
-
         scp = row["scp"]
+        self.selected_scp_id = scp["scpId"]
+        self.paint_selection()
+
         self.controller.active_scp_id = scp["scpId"]
 
         path = os.path.join(
@@ -320,25 +599,100 @@ class HomeScreen(tk.Frame):
         except Exception:
             self.controller.last_parsed_scp = None
 
+        archive = SCPRawArchiveService(os.getcwd())
+        try:
+            self.controller.last_raw_scp = archive.load(scp["scpId"])
+        except Exception:
+            self.controller.last_raw_scp = None
+        finally:
+            archive.close()
+
     # ================= EVENTS =================
 
+    SEARCH_FIELDS = [
+        ("ccy_pair", "CCY Pair"),
+        ("venue", "Venue"),
+        ("client_id", "Client ID (client / account / user)"),
+        ("notional_min", "Notional mínimo"),
+        ("notional_max", "Notional máximo"),
+        ("time_from", "Time desde (ISO)"),
+        ("time_to", "Time hasta (ISO)"),
+        ("crl_origin", "CRL origin"),
+        ("mkt_mode", "Mkt mode (N/A/B/F)"),
+    ]
+
     def on_search(self):
-        messagebox.showinfo("Info", "Funcionalidad pendiente.")
+        modal = tk.Toplevel(self)
+        modal.title("Buscar Traza")
+        modal.configure(bg=BG_MAIN)
+        modal.transient(self)
+        modal.grab_set()
+
+        card = tk.Frame(modal, bg=BG_CARD,
+                        highlightbackground=BORDER,
+                        highlightthickness=1)
+        card.pack(fill="both", expand=True, padx=24, pady=24)
+
+        form = tk.Frame(card, bg=BG_CARD)
+        form.pack(padx=20, pady=(20, 10))
+
+        entries = {}
+        for row, (name, label) in enumerate(self.SEARCH_FIELDS):
+            tk.Label(
+                form,
+                text=label,
+                font=FONT_NORMAL,
+                fg=TEXT_SECONDARY,
+                bg=BG_CARD
+            ).grid(row=row, column=0, sticky="w", pady=4, padx=(0, 16))
+
+            entry = tk.Entry(form, width=28, font=FONT_NORMAL)
+            entry.insert(0, str(self.search_filters.get(name, "")))
+            entry.grid(row=row, column=1, pady=4)
+            entries[name] = entry
+
+        buttons = tk.Frame(card, bg=BG_CARD)
+        buttons.pack(pady=(10, 20))
+
+        def apply():
+            filters = {
+                name: entry.get().strip()
+                for name, entry in entries.items()
+                if entry.get().strip()
+            }
+
+            for name in ("notional_min", "notional_max"):
+                if name in filters:
+                    try:
+                        filters[name] = float(filters[name].replace(",", "."))
+                    except ValueError:
+                        messagebox.showwarning(
+                            "Buscar Traza",
+                            "El notional debe ser numérico.",
+                            parent=modal
+                        )
+                        return
+
+            self.apply_search(filters)
+            modal.destroy()
+
+        def clear():
+            self.apply_search({})
+            modal.destroy()
+
+        StyledButton(buttons, "Buscar", apply, width=140).pack(side="left", padx=8)
+        StyledButton(buttons, "Limpiar", clear, width=140).pack(side="left", padx=8)
+
+    def apply_search(self, filters):
+        self.search_filters = filters
+        self.top = 0
+        self.reload_scps()
 
     def on_spot(self):
-        for w in self.master.winfo_children():
-            w.destroy()
-        from UI.screens.SpotConstructionScreen import SpotConstructionScreen
-        SpotConstructionScreen(self.master, controller=self.controller)
+        self.master.show_screen("spot")
 
     def open_trace_import(self):
-        for w in self.master.winfo_children():
-            w.destroy()
-        from UI.screens.TraceImportScreen import TraceImportScreen
-        TraceImportScreen(self.master, controller=self.controller)
+        self.master.show_screen("trace_import")
 
     def open_crl_view(self):
-        for w in self.master.winfo_children():
-            w.destroy()
-        from UI.screens.CRLScreen import CRLScreen
-        CRLScreen(self.master, controller=self.controller)
\ No newline at end of file
+        self.master.show_screen("crl")
\ No newline at end of file
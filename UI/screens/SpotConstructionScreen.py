@@ -13,6 +13,8 @@ from UI.styles.desk_theme import (
 )
 
 from services.SPOTAuditExplainService import SpotAuditExplainService
+from services.SCPCatalogService import SCPCatalogService
+from services.SPOTColumnarStoreService import SPOTColumnarStoreService
 
 ACTIVE_BORDER = "#F59E0B"
 
@@ -23,9 +25,27 @@ class SpotConstructionScreen(tk.Frame):
         super().__init__(master, bg=BG_MAIN)
         self.controller = controller
         self._spot_data = None
+        # (active_scp_id, scps_version) del desglose pintado
+        self._rendered_key = None
+        # Se reutiliza entre refrescos: conserva el índice de segmentos
+        self._spot_store = SPOTColumnarStoreService(os.getcwd())
         self.pack(fill="both", expand=True)
         self._build_ui()
 
+    def on_show(self):
+        """
+        Vuelta a la pantalla (pool de MainWindow): solo se repinta si cambió
+        el SCP activo o se han importado/borrado SCPs.
+        """
+        if self._current_key() != self._rendered_key:
+            self.refresh_and_render()
+
+    def _current_key(self):
+        return (
+            getattr(self.controller, "active_scp_id", None),
+            getattr(self.controller, "scps_version", 0)
+        )
+
     # =========================================================
     # UI
     # =========================================================
@@ -82,6 +102,8 @@ class SpotConstructionScreen(tk.Frame):
     def refresh_and_render(self):
         for w in self.content.winfo_children():
             w.destroy()
+        self._rendered_key = None
+        self.canvas.yview_moveto(0)
 
         scp_id = getattr(self.controller, "active_scp_id", None)
         if not scp_id:
@@ -91,14 +113,25 @@ class SpotConstructionScreen(tk.Frame):
         path = os.path.join(
             os.getcwd(), "resources", "scp", "spot_construction", f"{scp_id}.json"
         )
-        if not os.path.exists(path):
-            messagebox.showwarning("Sin desglose", "No existe el JSON de Spot.")
-            return
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            # Importado con almacenamiento columnar: solo se lee el día
+            # que registra el catálogo
+            catalog = SCPCatalogService(os.getcwd())
+            try:
+                day = catalog.spot_day(scp_id)
+            finally:
+                catalog.close()
+            data = self._spot_store.load(scp_id, day)
 
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if data is None:
+            messagebox.showwarning("Sin desglose", "No existe el desglose de Spot.")
+            return
 
         self._spot_data = data
+        self._rendered_key = (scp_id, getattr(self.controller, "scps_version", 0))
 
         active_amt = None
         notional_raw = data.get("notional", {}).get("amount")
@@ -368,7 +401,4 @@ class SpotConstructionScreen(tk.Frame):
     # =========================================================
 
     def go_back(self):
-        for w in self.master.winfo_children():
-            w.destroy()
-        from UI.screens.HomeScreen import HomeScreen
-        HomeScreen(self.master, controller=self.controller)
\ No newline at end of file
+        self.master.show_screen("home")
@@ -1,11 +1,12 @@
 import os
-import json
+import queue
+import threading
 import tkinter as tk
-from tkinter import messagebox, scrolledtext
+from tkinter import messagebox, scrolledtext, ttk
 
 from UI.components.StyledButton import StyledButton
 from UI.components.Header import Header
-from services.SPOTConstructionService import SPOTConstructionService
+from services.SCPImportService import SCPImportService
 
 from UI.styles.desk_theme import (
     BG_MAIN,
@@ -21,19 +22,38 @@ from UI.styles.desk_theme import (
     ACCENT_LINK,
 )
 
-from services.SCPParserService import (
-    parse_block,
-    decimal_serializer
-)
-
 
 class TraceImportScreen(tk.Frame):
+
+    # Intervalo de lectura de la cola del worker (ms)
+    POLL_MS = 50
+
     def __init__(self, master, controller=None):
         super().__init__(master, bg=BG_MAIN)
         self.controller = controller
+
+        # Importación en curso (hilo worker → cola → after())
+        self._worker = None
+        self._events = None
+        self._cancel = None
+        self._poll_id = None
+        # Importación cancelada al salir de la pantalla: se sigue leyendo la
+        # cola hasta que el worker termina, sin entregar resultados
+        self._abandoned = False
+
         self.pack(fill="both", expand=True)
         self.create_widgets()
 
+    def destroy(self):
+        self._stop_import()
+        super().destroy()
+
+    def on_show(self):
+        """
+        Vuelta a la pantalla (pool de MainWindow): se conserva la traza
+        pegada que no llegó a importarse.
+        """
+
     # ================= UI =================
 
     def create_widgets(self):
@@ -80,25 +100,54 @@ class TraceImportScreen(tk.Frame):
         )
         self.text_area.pack(fill="both", expand=True, padx=12, pady=12)
 
-        StyledButton(
+        self.save_button = StyledButton(
             container,
             "Guardar SCP",
             command=self.save_scp,
             bg=ACCENT_LINK
-        ).pack(anchor="center", pady=20)
+        )
+        self.save_button.pack(anchor="center", pady=20)
+
+        # Progreso (solo visible durante la importación)
+        self.progress_frame = tk.Frame(container, bg=BG_MAIN)
+
+        self.progress_label = tk.Label(
+            self.progress_frame,
+            text="",
+            font=FONT_NORMAL,
+            fg=TEXT_SECONDARY,
+            bg=BG_MAIN
+        )
+        self.progress_label.pack(anchor="center", pady=(0, 6))
+
+        self.progress_bar = ttk.Progressbar(
+            self.progress_frame,
+            mode="determinate",
+            length=400
+        )
+        self.progress_bar.pack(anchor="center")
+
+        StyledButton(
+            self.progress_frame,
+            "Cancelar",
+            command=self.cancel_import
+        ).pack(anchor="center", pady=(12, 0))
 
     # ================= NAV =================
 
     def go_back(self):
-        for widget in self.master.winfo_children():
-            widget.destroy()
-
-        from UI.screens.HomeScreen import HomeScreen
-        HomeScreen(self.master, controller=self.controller)
+        if self._cancel is not None:
+            # El worker termina la traza en curso en segundo plano
+            self.cancel_import()
+            self._abandoned = True
+        self.master.show_screen("home")
 
     # ================= LOGIC =================
 
     def save_scp(self):
+        if self._worker is not None:
+            return
+
         content = self.text_area.get("1.0", tk.END).strip()
 
         if not content:
@@ -108,70 +157,183 @@ class TraceImportScreen(tk.Frame):
             )
             return
 
-        try:
-
-            parsed_scp = parse_block(content)
-            scp_id = parsed_scp.get("id")
-
-            if not scp_id:
-                raise ValueError("No se pudo extraer el ID del SCP")
-
-            base_path = os.getcwd()
-            scp_base = os.path.join(base_path, "resources", "scp")
-
-            raw_dir = os.path.join(scp_base, "history", "raw")
-            parsed_dir = os.path.join(scp_base, "history", "parsed")
-
-            os.makedirs(raw_dir, exist_ok=True)
-            os.makedirs(parsed_dir, exist_ok=True)
-
-            raw_path = os.path.join(raw_dir, f"{scp_id}.txt")
-            parsed_path = os.path.join(parsed_dir, f"{scp_id}.json")
-
-
-            if self.controller:
-                self.controller.last_raw_scp = content
-                self.controller.last_parsed_scp = parsed_scp
-                self.controller.active_scp_id = scp_id
-
-
-            if not os.path.exists(raw_path):
-                with open(raw_path, "w", encoding="utf-8") as f:
-                    f.write(content)
-
+        self._events = queue.Queue()
+        self._cancel = threading.Event()
+        self._worker = threading.Thread(
+            target=self._run_import,
+            args=(content, self._events, self._cancel),
+            daemon=True
+        )
 
-            with open(parsed_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    parsed_scp,
-                    f,
-                    indent=2,
-                    ensure_ascii=False,
-                    default=str
+        self.save_button.pack_forget()
+        self.progress_bar.config(value=0, maximum=1)
+        self.progress_label.config(text="Preparando importación...")
+        self.progress_frame.pack(anchor="center", pady=20)
+
+        if self.controller:
+            self.controller.import_running = True
+        self._worker.start()
+        self._poll_id = self.after(self.POLL_MS, self._poll_import)
+
+    def cancel_import(self):
+        if self._cancel is not None:
+            self._cancel.set()
+            self.progress_label.config(text="Cancelando tras la traza en curso...")
+
+    # ================= WORKER =================
+
+    @staticmethod
+    def _run_import(content: str, events: queue.Queue, cancel: threading.Event):
+        """
+        Se ejecuta en el hilo worker: no toca widgets, solo publica en la
+        cola eventos ("start", total), ("progress", hechos, total, resultado)
+        y ("finished", resultados, cancelado) o ("failed", error).
+        """
+        try:
+            importer = SCPImportService(base_path=os.getcwd())
+            traces = list(importer.iter_text_traces(content))
+            total = len(traces)
+            events.put(("start", total))
+
+            results = []
+            with importer.catalog.batch(), importer.raw_archive.batch(), \
+                    importer.spot_store.batch():
+                for trace in traces:
+                    if cancel.is_set():
+                        break
+
+                    try:
+                        result = importer.import_trace(trace)
+                        result["raw"] = trace
+                        result["error"] = None
+                    except Exception as e:
+                        result = {"scpId": None, "error": str(e)}
+
+                    results.append(result)
+                    events.put(("progress", len(results), total, result))
+
+            events.put(("finished", results, len(results) < total))
+        except Exception as e:
+            events.put(("failed", str(e)))
+
+    def _poll_import(self):
+        self._poll_id = None
+
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = event[0]
+
+            if kind == "start":
+                self.progress_bar.config(maximum=max(event[1], 1))
+                self.progress_label.config(text=f"Importando 0 de {event[1]} trazas...")
+
+            elif kind == "progress":
+                done, total, result = event[1:]
+                self.progress_bar.config(value=done)
+                if not self._cancel.is_set():
+                    self.progress_label.config(
+                        text=f"Importando {done} de {total} trazas... {result['scpId'] or ''}"
+                    )
+
+            elif kind == "finished":
+                self._finish_import()
+                if self._abandoned:
+                    self._abandoned = False
+                    self._notify_abandoned(event[1])
+                    return
+                self._deliver_results(event[1], event[2])
+                return
+
+            elif kind == "failed":
+                self._finish_import()
+                if self._abandoned:
+                    self._abandoned = False
+                    return
+                messagebox.showerror(
+                    "Error",
+                    f"No se pudo importar la traza SCP:\n{event[1]}"
                 )
+                return
+
+        self._poll_id = self.after(self.POLL_MS, self._poll_import)
+
+    def _finish_import(self):
+        self._worker = None
+        self._events = None
+        self._cancel = None
+        if self.controller:
+            self.controller.import_running = False
+
+        self.progress_frame.pack_forget()
+        self.save_button.pack(anchor="center", pady=20)
+
+    def _stop_import(self):
+        """
+        Cancela la importación en curso al cerrar la app: el worker termina
+        la traza actual y no se entregan resultados.
+        """
+        if self._cancel is not None:
+            self._cancel.set()
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _notify_abandoned(self, results):
+        """
+        Fin de una importación cancelada al salir: con el worker ya terminado
+        (y sus transacciones cerradas) lo importado cuenta como cambio de
+        SCPs y se refresca la pantalla visible.
+        """
+        if not any(not r["error"] for r in results):
+            return
+        if self.controller:
+            self.controller.scps_version += 1
+        self.master.refresh_screen()
+
+    def _deliver_results(self, results, cancelled: bool):
+        imported = [r for r in results if not r["error"]]
+        failed = [r for r in results if r["error"]]
+
+        if not imported:
+            if cancelled and not failed:
+                messagebox.showinfo("Importación cancelada", "No se ha importado ningún SCP.")
+            else:
+                messagebox.showerror(
+                    "Error",
+                    f"No se pudo importar la traza SCP:\n{failed[-1]['error'] if failed else ''}"
+                )
+            return
 
-
-            spot_service = SPOTConstructionService(
-                parsed_scp=parsed_scp,
-                base_path=base_path
-            )
-
-            spot_path = spot_service.save()
-
-
-            if self.controller:
-                self.controller.last_spot_construction_path = spot_path
-
-
-            messagebox.showinfo(
-                "Importación correcta",
+        last = imported[-1]
+        scp_id = last["scpId"]
+
+        if self.controller:
+            self.controller.last_raw_scp = last["raw"]
+            self.controller.last_parsed_scp = last["parsedScp"]
+            self.controller.active_scp_id = scp_id
+            self.controller.last_spot_construction_path = last["spotPath"]
+            self.controller.last_import_results = [
+                {"scpId": r["scpId"], "error": r["error"]} for r in results
+            ]
+            self.controller.scps_version += 1
+
+        if len(results) == 1 and not cancelled:
+            message = (
                 f"SCP importado y procesado correctamente.\n\n"
                 f"ID: {scp_id}"
             )
+        else:
+            message = f"SCPs importados: {len(imported)}"
+            if failed:
+                message += f"\nCon error: {len(failed)}\n\n{failed[0]['error']}"
+            if cancelled:
+                message += "\n\nImportación cancelada antes de terminar."
 
-            self.go_back()
+        messagebox.showinfo("Importación correcta", message)
 
-        except Exception as e:
-            messagebox.showerror(
-                "Error",
-                f"No se pudo importar la traza SCP:\n{e}"
-            )
\ No newline at end of file
+        self.text_area.delete("1.0", tk.END)
+        self.go_back()
@@ -0,0 +1,673 @@
+"""
+Modo batch sin interfaz gráfica.
+
+    python cli.py import LOG [LOG ...]        importa logs (planos o .gz)
+    python cli.py construct [ID ...] [--all]  spot construction desde history/parsed
+                 [--columns]                 una línea por rung (construcción columnar)
+    python cli.py list                        listado del catálogo
+    python cli.py search --ccy-pair EURUSD    búsqueda en el catálogo
+    python cli.py explain ID [ID ...]         audit explain de los rungs
+    python cli.py delete ID [ID ...]          borra los artefactos de SCPs
+    python cli.py serve [--port 8765]         servicio HTTP local de explain
+    python cli.py bench [--save-baseline]     benchmarks sobre trazas sintéticas
+    python cli.py triangulation LOG | --all   valida los CRLs SYNTHETIC
+    python cli.py report OUT [ID ...] [--day]  informe de audit explain en un fichero
+    python cli.py raw get|stats|gc|migrate     traza raw y mantenimiento del archivo raw
+    python cli.py scan DAY --columns COL ...   columnas de los rungs del almacén columnar
+                 [--where COL=VALOR ...]
+
+La salida es JSON Lines (un objeto por línea en stdout). Las fases de CPU
+se reparten entre todos los cores (--workers para limitarlo). El código de
+salida es 1 si algún elemento termina con error.
+
+--metrics PATH activa la instrumentación del pipeline (spans por etapa,
+contadores, p50/p99) y la escribe en PATH al terminar.
+"""
+
+import argparse
+import json
+import os
+import sys
+from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, List
+
+from services import SCPTraceGeneratorService as generator_defaults
+from services.SCPBenchmarkService import (
+    SCPBenchmarkService, BENCHMARKS, DEFAULT_TRACES, DEFAULT_REPEAT, DEFAULT_THRESHOLD
+)
+from services.SCPBulkImportService import SCPBulkImportService
+from services.SCPCatalogService import SCPCatalogService
+from services.SCPDeleteService import SCPDeleteService
+from services import SCPMetricsService
+from services.CRLService import validate_triangulations, DEFAULT_TRIANGULATION_TOLERANCE
+from services.SCPImportService import SCPImportService, SPOT_STORAGES, RAW_STORAGES
+from services.SCPParserService import PARSER_ENGINES, parse_scp_lazy
+from services.SCPRawArchiveService import SCPRawArchiveService
+from services.SCPSearchService import SCPSearchService
+from services.SCPTraceGeneratorService import SCPTraceGeneratorService
+from services.SPOTAuditExplainService import SpotAuditExplainService
+from services.SPOTBatchConstructionService import SPOTBatchConstructionService
+from services.SPOTColumnarStoreService import SPOTColumnarStoreService, SCP_COLUMNS, RUNG_COLUMNS
+from services.SPOTConstructionService import SPOTConstructionService
+from services.SPOTExplainHTTPService import SPOTExplainHTTPService
+from services.SPOTExplainReportService import SPOTExplainReportService, REPORT_FORMATS, load_spot
+
+
+# SCPs por tarea enviada al pool (construct / explain)
+POOL_CHUNK_SIZE = 32
+
+# SCPs por lote de construct --columns (SPOTBatchConstructionService)
+COLUMNS_BATCH_SIZE = 256
+
+# Filtros de SCPSearchService expuestos en search / report
+SEARCH_FILTERS = (
+    "ccy_pair", "venue", "crl_origin", "mkt_mode", "client_id",
+    "venue_client_id", "venue_account_id", "venue_user_id",
+    "notional_min", "notional_max", "time_from", "time_to"
+)
+
+
+# =========================
+# OUTPUT
+# =========================
+
+def emit(record: Dict[str, Any]):
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def _parsed_path(base_path: str, scp_id: str) -> str:
+    return os.path.join(base_path, "resources", "scp", "history", "parsed", f"{scp_id}.json")
+
+
+def _all_scp_ids(base_path: str) -> List[str]:
+    catalog = SCPCatalogService(base_path)
+    try:
+        catalog.sync()
+        return [entry["scpId"] for entry in catalog.list_scps()]
+    finally:
+        catalog.close()
+
+
+def _pool_map(
+        fn, base_path: str, items: List[Any], workers: int, *args,
+        chunksize: int = POOL_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Aplica fn(base_path, item, *args) a cada item en un ProcessPoolExecutor
+    y devuelve los resultados en orden de entrada.
+    """
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield fn(base_path, item, *args)
+        return
+
+    n = len(items)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(
+            _with_metrics, [fn] * n, [base_path] * n, items, *([arg] * n for arg in args),
+            chunksize=chunksize
+        ):
+            if "metrics" in result:
+                SCPMetricsService.merge(result.pop("metrics"))
+            yield result
+
+
+def _with_metrics(fn, base_path: str, item, *args) -> Dict[str, Any]:
+    """
+    fn en un worker del pool: con la instrumentación activa, el resultado
+    lleva las métricas del worker para sumarlas en el proceso principal.
+    """
+    result = fn(base_path, item, *args)
+    if SCPMetricsService.is_enabled():
+        result["metrics"] = SCPMetricsService.drain()
+    return result
+
+
+# =========================
+# WORKERS
+# =========================
+
+def _construct_one(base_path: str, scp_id: str, save: bool) -> Dict[str, Any]:
+    try:
+        with open(_parsed_path(base_path, scp_id), "r", encoding="utf-8") as f:
+            parsed_scp = json.load(f)
+
+        service = SPOTConstructionService(parsed_scp, base_path)
+        if save:
+            return {"scpId": scp_id, "spotPath": service.save()}
+        return {"scpId": scp_id, "spot": service.build()}
+    except Exception as e:
+        return {"scpId": scp_id, "error": f"{type(e).__name__}: {e}"}
+
+
+def _construct_columns(base_path: str, scp_ids: List[str]) -> Dict[str, Any]:
+    """
+    Spot construction columnar de un lote de SCPs: una fila por rung
+    (columnas de SPOTBatchConstructionService sin scpIndex) y los SCPs que
+    no se pudieron cargar.
+    """
+    parsed_scps = []
+    errors = []
+
+    for scp_id in scp_ids:
+        try:
+            with open(_parsed_path(base_path, scp_id), "r", encoding="utf-8") as f:
+                parsed_scp = json.load(f)
+            # Valida igual que SPOTBatchConstructionService
+            SPOTConstructionService(parsed_scp, base_path)
+            parsed_scps.append(parsed_scp)
+        except Exception as e:
+            errors.append({"scpId": scp_id, "error": f"{type(e).__name__}: {e}"})
+
+    table = SPOTBatchConstructionService(parsed_scps, base_path).build_columns()
+    columns = [name for name in SPOTBatchConstructionService.COLUMNS if name != "scpIndex"]
+
+    return {
+        "rows": [dict(zip(columns, row)) for row in zip(*(table[name] for name in columns))],
+        "errors": errors
+    }
+
+
+def _explain_one(base_path: str, scp_id: str, amt: str, active: bool) -> Dict[str, Any]:
+    try:
+        spot = load_spot(base_path, scp_id)
+        if spot is None:
+            raise ValueError("No existe el desglose de Spot")
+
+        if active:
+            rung = SPOTConstructionService.active_rung(spot)
+            rungs = [rung] if rung is not None else []
+        else:
+            rungs = [
+                rung for rung in spot.get("rungs", [])
+                if amt is None or str(rung.get("amt")) == amt
+            ]
+
+        return {
+            "scpId": scp_id,
+            "explains": [
+                {
+                    "amt": rung.get("amt"),
+                    "explain": SpotAuditExplainService(
+                        context=spot.get("context", {}),
+                        notional=spot.get("notional", {}),
+                        rung=rung
+                    ).build()
+                }
+                for rung in rungs
+            ]
+        }
+    except Exception as e:
+        return {"scpId": scp_id, "error": f"{type(e).__name__}: {e}"}
+
+
+# =========================
+# COMMANDS
+# =========================
+
+def cmd_import(args) -> int:
+    service = SCPBulkImportService(
+        base_path=args.base_path,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        engine=args.engine,
+        storage=args.storage,
+        raw_storage=args.raw_storage,
+        cache=not args.no_cache
+    )
+    report = service.import_logs(args.logs)
+
+    for failure in report.pop("failures"):
+        emit({"event": "failure", **failure})
+    emit({"event": "summary", **report})
+
+    return 1 if report["failed"] else 0
+
+
+def _emit_results(results: Iterable[Dict[str, Any]]) -> int:
+    status = 0
+    for result in results:
+        if result.get("error"):
+            status = 1
+        emit(result)
+    return status
+
+
+def _target_ids(args) -> List[str]:
+    if args.all:
+        return _all_scp_ids(args.base_path)
+    if not args.scp_ids:
+        raise SystemExit("Indica al menos un SCP id o --all")
+    return args.scp_ids
+
+
+def cmd_construct(args) -> int:
+    if args.columns:
+        return _construct_columns_all(args)
+    return _emit_results(
+        _pool_map(_construct_one, args.base_path, _target_ids(args), args.workers, args.save)
+    )
+
+
+def _construct_columns_all(args) -> int:
+    scp_ids = _target_ids(args)
+    batches = [
+        scp_ids[i:i + COLUMNS_BATCH_SIZE] for i in range(0, len(scp_ids), COLUMNS_BATCH_SIZE)
+    ]
+
+    status = 0
+    for result in _pool_map(_construct_columns, args.base_path, batches, args.workers, chunksize=1):
+        for error in result["errors"]:
+            status = 1
+            emit(error)
+        for row in result["rows"]:
+            emit(row)
+    return status
+
+
+def cmd_explain(args) -> int:
+    return _emit_results(
+        _pool_map(_explain_one, args.base_path, _target_ids(args), args.workers, args.amt, args.active)
+    )
+
+
+def cmd_list(args) -> int:
+    catalog = SCPCatalogService(args.base_path)
+    try:
+        catalog.sync()
+        entries = catalog.list_scps()
+    finally:
+        catalog.close()
+
+    for entry in entries[:args.limit] if args.limit else entries:
+        emit(entry)
+    return 0
+
+
+def _search_filters(args) -> Dict[str, Any]:
+    return {name: getattr(args, name) for name in SEARCH_FILTERS}
+
+
+def cmd_search(args) -> int:
+    filters = _search_filters(args)
+
+    service = SCPSearchService(args.base_path)
+    try:
+        # Al día antes de buscar (tras un cambio de esquema el catálogo
+        # se recrea vacío)
+        service.catalog.sync()
+        result = service.search(page=args.page, page_size=args.page_size, **filters)
+    finally:
+        service.close()
+
+    for item in result.pop("items"):
+        emit(item)
+    if args.with_total:
+        emit({"event": "total", **result})
+    return 0
+
+
+def cmd_delete(args) -> int:
+    service = SCPDeleteService(args.base_path)
+    for scp_id in args.scp_ids:
+        emit({"scpId": scp_id, "deleted": service.delete(scp_id)})
+    return 0
+
+
+def cmd_serve(args) -> int:
+    service = SPOTExplainHTTPService(
+        base_path=args.base_path,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        engine=args.engine
+    )
+    emit({"event": "listening", "url": f"http://{args.host}:{args.port}"})
+    sys.stdout.flush()
+    service.run()
+    return 0
+
+
+def cmd_bench(args) -> int:
+    generator = SCPTraceGeneratorService(
+        seed=args.seed,
+        rungs=args.rungs,
+        synthetic_ratio=args.synthetic,
+        rung_modifier_ratio=args.rung_modifiers,
+        depth=args.depth
+    )
+    service = SCPBenchmarkService(
+        args.base_path, generator=generator, traces=args.traces, repeat=args.repeat
+    )
+    report = service.run(args.only)
+
+    baseline = None if args.save_baseline else service.load_baseline()
+    try:
+        comparison = service.compare(report, baseline, args.threshold)
+    except ValueError as e:
+        raise SystemExit(f"{e} (usa --save-baseline para regenerarla)")
+
+    for item in comparison:
+        emit({
+            "event": "benchmark",
+            **item,
+            "scpPerSec": 1 / item["seconds"] if item["seconds"] else None
+        })
+
+    if args.save_baseline:
+        emit({"event": "baseline", "path": service.save_baseline(report)})
+
+    regressions = [item["name"] for item in comparison if item["regression"]]
+    emit({
+        "event": "summary",
+        "config": report["config"],
+        "baseline": baseline is not None,
+        "threshold": args.threshold,
+        "regressions": regressions
+    })
+    return 1 if regressions else 0
+
+
+def _triangulation_corpus(args, failures: List[Dict[str, Any]]) -> Iterator[Any]:
+    """
+    SCPs a validar: las trazas de los logs (parseo perezoso: solo se
+    materializa el CRL) o los JSON de history/parsed con --all.
+    """
+    if args.all:
+        for scp_id in _all_scp_ids(args.base_path):
+            try:
+                with open(_parsed_path(args.base_path, scp_id), "r", encoding="utf-8") as f:
+                    yield json.load(f)
+            except Exception as e:
+                failures.append({"scpId": scp_id, "error": f"{type(e).__name__}: {e}"})
+        return
+
+    if not args.logs:
+        raise SystemExit("Indica al menos un log o --all")
+
+    importer = SCPImportService(args.base_path)
+    for path in args.logs:
+        for trace in importer.iter_raw_traces(path):
+            try:
+                yield parse_scp_lazy(trace)
+            except Exception as e:
+                failures.append({"scpId": None, "error": f"{type(e).__name__}: {e}"})
+
+
+def cmd_triangulation(args) -> int:
+    failures = []
+    checked = mismatched = 0
+
+    results = validate_triangulations(
+        _triangulation_corpus(args, failures), tolerance=Decimal(args.tolerance)
+    )
+    for result in results:
+        checked += 1
+        if not result["ok"]:
+            mismatched += 1
+        if args.emit_all or not result["ok"]:
+            emit(result)
+
+    for failure in failures:
+        emit({"event": "failure", **failure})
+    emit({
+        "event": "summary",
+        "checked": checked,
+        "mismatched": mismatched,
+        "failed": len(failures)
+    })
+    return 1 if mismatched or failures else 0
+
+
+def cmd_report(args) -> int:
+    filters = _search_filters(args)
+    if args.day:
+        if filters["time_from"] or filters["time_to"]:
+            raise SystemExit("--day no se combina con --time-from / --time-to")
+        filters["time_from"] = filters["time_to"] = args.day
+
+    if args.scp_ids and any(value not in (None, "") for value in filters.values()):
+        raise SystemExit("Indica SCP ids o filtros, no ambos")
+
+    service = SPOTExplainReportService(args.base_path, workers=args.workers)
+    summary = service.write(
+        args.output,
+        scp_ids=args.scp_ids or None,
+        rungs="active" if args.active else "all",
+        report_format=args.format,
+        **({} if args.scp_ids else filters)
+    )
+
+    for failure in summary.pop("failures"):
+        emit({"event": "failure", **failure})
+    emit({"event": "summary", **summary})
+
+    return 1 if summary["failed"] else 0
+
+
+def cmd_raw(args) -> int:
+    if args.action != "get" and args.scp_ids:
+        raise SystemExit(f"raw {args.action} no admite SCP ids")
+
+    archive = SCPRawArchiveService(args.base_path)
+    status = 0
+    try:
+        if args.action == "get":
+            for scp_id in args.scp_ids:
+                trace = archive.load(scp_id)
+                if trace is None:
+                    status = 1
+                    emit({"scpId": scp_id, "error": "No existe la traza raw"})
+                else:
+                    emit({"scpId": scp_id, "raw": trace})
+        elif args.action == "stats":
+            emit({"event": "stats", **archive.stats()})
+        elif args.action == "gc":
+            emit({"event": "gc", **archive.gc()})
+        else:
+            migrated = archive.migrate_raw_files(train=not args.no_train, remove=args.remove)
+            emit({"event": "migrated", "files": migrated, **archive.stats()})
+    finally:
+        archive.close()
+
+    return status
+
+
+def _scan_filter(text: str):
+    """
+    COL=VALOR de scan --where: las columnas enteras se comparan como int y
+    el resto como texto (los decimales se leen como string exacto).
+    """
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise SystemExit(f"Filtro inválido (se espera COL=VALOR): {text}")
+
+    kind = RUNG_COLUMNS.get(name) or SCP_COLUMNS.get(name)
+    if kind in ("u8", "i32", "i64"):
+        try:
+            value = int(value)
+        except ValueError:
+            raise SystemExit(f"La columna {name} es entera: {value}")
+    return name, value
+
+
+def cmd_scan(args) -> int:
+    where = dict(_scan_filter(text) for text in args.where)
+
+    try:
+        table = SPOTColumnarStoreService(args.base_path).scan(args.day, args.columns, where)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    for row in zip(*(table[name] for name in args.columns)):
+        emit(dict(zip(args.columns, row)))
+    return 0
+
+
+# =========================
+# ARGUMENTS
+# =========================
+
+def _add_search_filters(p: argparse.ArgumentParser):
+    for name in (
+        "ccy-pair", "venue", "crl-origin", "mkt-mode", "client-id",
+        "venue-client-id", "venue-account-id", "venue-user-id", "time-from", "time-to"
+    ):
+        p.add_argument(f"--{name}")
+    p.add_argument("--notional-min", type=float)
+    p.add_argument("--notional-max", type=float)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="SCP tools en modo batch (salida JSON Lines)")
+    parser.add_argument("--base-path", default=os.getcwd(), help="raíz con resources/ (por defecto el cwd)")
+    parser.add_argument(
+        "--metrics", metavar="PATH",
+        help="activa la instrumentación y escribe las métricas al terminar "
+             "(JSON si PATH termina en .json, si no texto de Prometheus)"
+    )
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="importa ficheros de log")
+    p.add_argument("logs", nargs="+")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--chunk-size", type=int, default=SCPBulkImportService.DEFAULT_CHUNK_SIZE)
+    p.add_argument("--engine", choices=sorted(PARSER_ENGINES))
+    p.add_argument("--storage", choices=SPOT_STORAGES)
+    p.add_argument("--raw-storage", choices=RAW_STORAGES)
+    p.add_argument("--no-cache", action="store_true", help="sin caché de parseo")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("construct", help="spot construction desde history/parsed")
+    p.add_argument("scp_ids", nargs="*")
+    p.add_argument("--all", action="store_true", help="todos los SCPs del catálogo")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--save", action="store_true", help="escribe el JSON en vez de emitirlo")
+    group.add_argument(
+        "--columns", action="store_true",
+        help="una línea por rung con la construcción columnar (lotes de SCPs)"
+    )
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.set_defaults(func=cmd_construct)
+
+    p = sub.add_parser("list", help="listado del catálogo (time del TOM descendente)")
+    p.add_argument("--limit", type=int, default=0)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("search", help="búsqueda en el catálogo")
+    _add_search_filters(p)
+    p.add_argument("--page", type=int, default=0)
+    p.add_argument("--page-size", type=int, default=100)
+    p.add_argument("--with-total", action="store_true", help="añade una línea final con el total")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("explain", help="audit explain de los rungs de SCPs")
+    p.add_argument("scp_ids", nargs="*")
+    p.add_argument("--all", action="store_true", help="todos los SCPs del catálogo")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--amt", help="solo el rung con este importe")
+    group.add_argument("--active", action="store_true", help="solo el rung activo para el notional")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.set_defaults(func=cmd_explain)
+
+    p = sub.add_parser("delete", help="borra los artefactos de SCPs")
+    p.add_argument("scp_ids", nargs="+")
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser("serve", help="servicio HTTP local de explain")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=SPOTExplainHTTPService.DEFAULT_PORT)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--engine", choices=sorted(PARSER_ENGINES))
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("bench", help="benchmarks sobre trazas sintéticas")
+    p.add_argument("--only", nargs="+", choices=BENCHMARKS, help="solo estos benchmarks")
+    p.add_argument("--traces", type=int, default=DEFAULT_TRACES)
+    p.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    p.add_argument("--seed", type=int, default=generator_defaults.DEFAULT_SEED)
+    p.add_argument("--rungs", type=int, default=generator_defaults.DEFAULT_RUNGS)
+    p.add_argument(
+        "--synthetic", type=float, default=generator_defaults.DEFAULT_SYNTHETIC_RATIO,
+        help="fracción de CRLs sintéticos"
+    )
+    p.add_argument(
+        "--rung-modifiers", type=float, default=generator_defaults.DEFAULT_RUNG_MODIFIER_RATIO,
+        help="fracción con tabla de rung modifiers"
+    )
+    p.add_argument(
+        "--depth", type=int, default=generator_defaults.DEFAULT_DEPTH,
+        help="anidamiento de los CRLs sintéticos"
+    )
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="regresión relativa tolerada")
+    p.add_argument("--save-baseline", action="store_true", help="guarda los resultados como baseline")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("triangulation", help="recalcula y valida los CRLs SYNTHETIC")
+    p.add_argument("logs", nargs="*")
+    p.add_argument("--all", action="store_true", help="todos los SCPs del catálogo")
+    p.add_argument(
+        "--tolerance", default=str(DEFAULT_TRIANGULATION_TOLERANCE),
+        help="diferencia relativa tolerada en los raw/comp"
+    )
+    p.add_argument("--emit-all", action="store_true", help="emite también los CRLs que coinciden")
+    p.set_defaults(func=cmd_triangulation)
+
+    p = sub.add_parser("report", help="informe de audit explain de muchos SCPs en un fichero")
+    p.add_argument("output", help="fichero de salida (.txt, .html o .jsonl)")
+    p.add_argument("scp_ids", nargs="*", help="SCPs del informe (por defecto los que cumplen los filtros)")
+    _add_search_filters(p)
+    p.add_argument("--day", help="solo los SCPs de este día (YYYY-MM-DD, time del TOM)")
+    p.add_argument("--active", action="store_true", help="solo el rung activo para el notional")
+    p.add_argument("--format", choices=REPORT_FORMATS, help="por defecto según la extensión")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("raw", help="trazas raw y mantenimiento del archivo raw comprimido")
+    p.add_argument(
+        "action", choices=("get", "stats", "gc", "migrate"),
+        help="get: traza de SCPs · stats: tamaño del archivo · gc: libera bloques sin uso · "
+             "migrate: archiva los ficheros history/raw"
+    )
+    p.add_argument("scp_ids", nargs="*", help="SCPs de raw get")
+    p.add_argument("--no-train", action="store_true", help="migrate sin entrenar el diccionario")
+    p.add_argument(
+        "--remove", action="store_true",
+        help="migrate borra cada fichero tras comprobar que se recupera idéntico"
+    )
+    p.set_defaults(func=cmd_raw)
+
+    p = sub.add_parser("scan", help="columnas de los rungs vivos de un día del almacén columnar")
+    p.add_argument("day", help="día del fichero columnar (YYYY-MM-DD o undated)")
+    p.add_argument(
+        "--columns", nargs="+", required=True,
+        help="columnas de rung o de SCP (p. ej. amt midSpread.spread context.ccyPair)"
+    )
+    p.add_argument(
+        "--where", action="append", default=[], metavar="COL=VALOR",
+        help="filtro de igualdad (repetible)"
+    )
+    p.set_defaults(func=cmd_scan)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        SCPMetricsService.enable()
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Salida cortada (| head): no es un error del batch
+        sys.stderr.close()
+        return 0
+    finally:
+        if args.metrics:
+            SCPMetricsService.export(args.metrics)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
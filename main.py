@@ -1,4 +1,7 @@
-from UI.MainWindow import MainWindow
+import argparse
+import sys
+
+from services import SCPStartupProfileService
 
 class AppController:
     """
@@ -10,11 +13,51 @@ class AppController:
     def __init__(self):
         self.last_raw_scp = None
         self.active_scp_id = None
+        # Resultado ({scpId, error}) de cada traza de la última importación
+        self.last_import_results = None
+        # Se incrementa al importar o borrar SCPs: las pantallas del pool
+        # recargan sus datos al volver a mostrarse
+        self.scps_version = 0
+        # Importación de TraceImportScreen en curso (HomeScreen no sincroniza
+        # el catálogo mientras tanto)
+        self.import_running = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FX Price Construction Engine")
+    parser.add_argument(
+        "--startup-profile", action="store_true",
+        help="escribe en stderr los tiempos del arranque y de cada import"
+    )
+    args = parser.parse_args(argv)
 
+    if args.startup_profile:
+        SCPStartupProfileService.install()
+
+    # La UI (tkinter, estilos, pantallas) se importa aquí para que el perfil
+    # de arranque la incluya
+    from UI.MainWindow import MainWindow
+    SCPStartupProfileService.mark("imports")
 
-def main():
     controller = AppController()
     app = MainWindow(controller)
+    SCPStartupProfileService.mark("window")
+
+    if args.startup_profile:
+        painted = []
+
+        def first_paint():
+            SCPStartupProfileService.mark("first_paint")
+            sys.stderr.write(SCPStartupProfileService.report())
+
+        def on_expose(event):
+            # Tk pinta en tareas idle tras el primer Expose
+            if not painted:
+                painted.append(True)
+                app.after_idle(first_paint)
+
+        app.bind("<Expose>", on_expose, add="+")
+
     app.mainloop()
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
-from decimal import Decimal
+from collections.abc import Mapping
+from decimal import Decimal, ROUND_HALF_UP, localcontext
 
 def extract_all_crls(parsed_scp: dict) -> list[dict]:
     crls = []
@@ -27,7 +28,7 @@ def extract_all_crls(parsed_scp: dict) -> list[dict]:
 
 def _normalize_crl(crl: dict) -> dict:
     rungs = crl.get("rungs", [])
-    if isinstance(rungs, dict):
+    if isinstance(rungs, Mapping):
         rungs = [rungs]
 
     return {
@@ -39,6 +40,245 @@ def _normalize_crl(crl: dict) -> dict:
         "rungs": rungs
     }
 
+# ================= TRIANGULATION =================
+
+# Redondeo del cruce final a roundDp (finalTriBid / finalTriAsk)
+TRIANGULATION_ROUNDING = ROUND_HALF_UP
+
+# Diferencia relativa tolerada entre el cruce recalculado y el de la traza
+# (los raw de la traza pueden arrastrar ruido de coma flotante)
+DEFAULT_TRIANGULATION_TOLERANCE = Decimal("1e-9")
+
+# Precisión de los productos de la cadena (independiente del contexto global)
+_TRIANGULATION_PRECISION = 34
+
+
+def triangulation_legs(xcalc: Mapping) -> list[dict]:
+    """
+    Patas de un XCalc (comp1Calc, comp2Calc, ... consecutivas) con su
+    precio efectivo: el precio tras el ajuste forward de compNFwdAdj si lo
+    hay (traderFwdAdjBid/Ask; si falta y el ajuste no está hecho,
+    traderAdj + puntos forward) y si no traderAdjBid/Ask.
+    """
+    legs = []
+    n = 1
+
+    while f"comp{n}Calc" in xcalc:
+        calc = xcalc[f"comp{n}Calc"]
+        fwd_adj = xcalc.get(f"comp{n}FwdAdj")
+        crl = calc.get("crl")
+
+        pair = calc.get("ccyPair") or (crl.get("ccyPair") if crl else None)
+        if not isinstance(pair, str) or len(pair) != 6:
+            raise ValueError(f"Par inválido en comp{n}Calc: {pair}")
+
+        legs.append({
+            "leg": n,
+            "pair": pair,
+            "bid": _leg_price(calc, fwd_adj, "Bid"),
+            "ask": _leg_price(calc, fwd_adj, "Ask"),
+            "crl": crl
+        })
+        n += 1
+
+    if len(legs) < 2:
+        raise ValueError("La triangulación necesita al menos dos patas")
+
+    return legs
+
+
+def _leg_price(calc: Mapping, fwd_adj: Mapping | None, side: str) -> Decimal:
+    price = Decimal(str(calc[f"traderAdj{side}"]))
+
+    if not fwd_adj:
+        return price
+
+    adjusted = fwd_adj.get(f"traderFwdAdj{side}")
+    if adjusted is not None:
+        return Decimal(str(adjusted))
+
+    if fwd_adj.get("fwdAdjCond", True) and not fwd_adj.get("fwdAdjDone"):
+        price += Decimal(str(fwd_adj.get(f"fwd{side}Pt", 0)))
+
+    return price
+
+
+def orient_legs(final_pair: str, legs: list[dict]) -> list[dict]:
+    """
+    Encadena las patas de la divisa base a la de términos de final_pair.
+    Una pata cotizada al revés (USDEUR para ir de EUR a USD) se invierte:
+    bid = 1 / ask, ask = 1 / bid. Las patas pueden venir en cualquier orden.
+    """
+    if not isinstance(final_pair, str) or len(final_pair) != 6:
+        raise ValueError(f"Par inválido: {final_pair}")
+
+    base, terms = final_pair[:3], final_pair[3:]
+    current = base
+    remaining = list(legs)
+    chain = []
+
+    with localcontext() as ctx:
+        ctx.prec = _TRIANGULATION_PRECISION
+
+        while remaining:
+            for leg in remaining:
+                if leg["pair"][:3] == current:
+                    inverted, current = False, leg["pair"][3:]
+                    break
+                if leg["pair"][3:] == current:
+                    inverted, current = True, leg["pair"][:3]
+                    break
+            else:
+                raise ValueError(
+                    f"Las patas no forman una cadena de {base} a {terms}: "
+                    + ", ".join(leg["pair"] for leg in remaining)
+                )
+
+            remaining.remove(leg)
+            chain.append({
+                **leg,
+                "inverted": inverted,
+                "rateBid": 1 / leg["ask"] if inverted else leg["bid"],
+                "rateAsk": 1 / leg["bid"] if inverted else leg["ask"]
+            })
+
+    if current != terms:
+        raise ValueError(f"La cadena de patas termina en {current} y no en {terms}")
+
+    return chain
+
+
+def recompute_triangulation(crl: Mapping) -> dict:
+    """
+    Recalcula el cruce de un CRL SYNTHETIC desde los precios de sus patas:
+    raw = producto de la cadena, comp = raw × compFactor y final = comp
+    redondeado a roundDp.
+    """
+    xcalc = crl.get("XCalc")
+    if not xcalc:
+        raise ValueError("CRL is not synthetic / no XCalc found")
+
+    chain = orient_legs(crl.get("ccyPair"), triangulation_legs(xcalc))
+    factor = Decimal(str(xcalc.get("compFactor", 1)))
+    round_dp = xcalc.get("roundDp")
+
+    with localcontext() as ctx:
+        ctx.prec = _TRIANGULATION_PRECISION
+
+        raw_bid = raw_ask = Decimal(1)
+        for leg in chain:
+            raw_bid *= leg["rateBid"]
+            raw_ask *= leg["rateAsk"]
+
+        comp_bid = raw_bid * factor
+        comp_ask = raw_ask * factor
+
+        if round_dp is None:
+            final_bid, final_ask = comp_bid, comp_ask
+        else:
+            exp = Decimal(1).scaleb(-int(round_dp))
+            final_bid = comp_bid.quantize(exp, TRIANGULATION_ROUNDING)
+            final_ask = comp_ask.quantize(exp, TRIANGULATION_ROUNDING)
+
+    return {
+        "pair": crl.get("ccyPair"),
+        "chain": chain,
+        "rawBid": raw_bid,
+        "rawAsk": raw_ask,
+        "compBid": comp_bid,
+        "compAsk": comp_ask,
+        "finalBid": final_bid,
+        "finalAsk": final_ask
+    }
+
+
+def check_triangulation(
+        crl: Mapping,
+        recomputed: dict = None,
+        tolerance: Decimal = DEFAULT_TRIANGULATION_TOLERANCE
+) -> list[dict]:
+    """
+    Campos del XCalc de la traza que no coinciden con el recálculo: los raw
+    y comp con diferencia relativa mayor que tolerance; los finales
+    exactos. Lista vacía si todo coincide.
+    """
+    recomputed = recomputed or recompute_triangulation(crl)
+    xcalc = crl["XCalc"]
+    mismatches = []
+
+    for field, key, exact in (
+            ("rawTriBid", "rawBid", False),
+            ("rawTriAsk", "rawAsk", False),
+            ("triCompBid", "compBid", False),
+            ("triCompAsk", "compAsk", False),
+            ("finalTriBid", "finalBid", True),
+            ("finalTriAsk", "finalAsk", True),
+    ):
+        if xcalc.get(field) is None:
+            continue
+
+        expected = recomputed[key]
+        actual = Decimal(str(xcalc[field]))
+
+        if exact:
+            ok = actual == expected
+        else:
+            ok = abs(actual - expected) <= tolerance * abs(expected)
+
+        if not ok:
+            mismatches.append({"field": field, "trace": actual, "recomputed": expected})
+
+    return mismatches
+
+
+def synthetic_crls(parsed_scp: Mapping):
+    """
+    (ruta, CRL) de cada CRL SYNTHETIC de un SCP: el principal y, en
+    cadenas anidadas, los de las patas que son a su vez sintéticas.
+    """
+    root = parsed_scp.get("crl")
+    if not root:
+        return
+
+    pending = [("crl", root)]
+    while pending:
+        path, crl = pending.pop()
+        xcalc = crl.get("XCalc")
+        if not xcalc:
+            continue
+
+        yield path, crl
+
+        n = 1
+        while f"comp{n}Calc" in xcalc:
+            leg_crl = xcalc[f"comp{n}Calc"].get("crl")
+            if leg_crl:
+                pending.append((f"{path}.XCalc.comp{n}Calc.crl", leg_crl))
+            n += 1
+
+
+def validate_triangulations(parsed_scps, tolerance: Decimal = DEFAULT_TRIANGULATION_TOLERANCE):
+    """
+    Valida en una pasada todos los CRLs SYNTHETIC de un corpus (iterable de
+    SCPs parseados, también LazyBlock) y devuelve uno por CRL:
+    {"scpId", "path", "pair", "ok", "mismatches"} o, si la cadena no se
+    puede recalcular, {"scpId", "path", "pair", "ok": False, "error"}.
+    """
+    for parsed_scp in parsed_scps:
+        scp_id = parsed_scp.get("id")
+
+        for path, crl in synthetic_crls(parsed_scp):
+            result = {"scpId": scp_id, "path": path, "pair": crl.get("ccyPair")}
+            try:
+                mismatches = check_triangulation(crl, tolerance=tolerance)
+                result["ok"] = not mismatches
+                result["mismatches"] = mismatches
+            except (ValueError, KeyError, TypeError, ArithmeticError) as e:
+                result["ok"] = False
+                result["error"] = f"{type(e).__name__}: {e}"
+            yield result
+
+
 def explain_triangulation(parsed_scp):
     crl = parsed_scp.get("crl", {})
     xcalc = crl.get("XCalc")
@@ -46,46 +286,36 @@ def explain_triangulation(parsed_scp):
     if not xcalc:
         raise ValueError("CRL is not synthetic / no XCalc found")
 
-    comp1 = xcalc["comp1Calc"]
-    comp2 = xcalc["comp2Calc"]
+    recomputed = recompute_triangulation(crl)
+    chain = recomputed["chain"]
+    formula = " × ".join(
+        f'1/{leg["pair"]}' if leg["inverted"] else leg["pair"]
+        for leg in chain
+    )
 
-    crl1 = comp1["crl"]
-    crl2 = comp2["crl"]
-
-    bid1 = Decimal(comp1["traderAdjBid"])
-    bid2 = Decimal(comp2["traderAdjBid"])
-    ask1 = Decimal(comp1["traderAdjAsk"])
-    ask2 = Decimal(comp2["traderAdjAsk"])
+    def side(name: str, key: str) -> dict:
+        return {
+            "formula": formula,
+            "components": [
+                {"pair": leg["pair"], name: leg[key], "inverted": leg["inverted"]}
+                for leg in chain
+            ],
+            "result": Decimal(str(xcalc[f"finalTri{key.capitalize()}"])),
+            "recomputed": recomputed[f"final{key.capitalize()}"]
+        }
 
     return {
         "finalPair": crl["ccyPair"],
         "method": "TRIANGULATION",
-        "bid": {
-            "formula": f'{crl1["ccyPair"]} × {crl2["ccyPair"]}',
-            "components": [
-                {"pair": crl1["ccyPair"], "bid": bid1},
-                {"pair": crl2["ccyPair"], "bid": bid2},
-            ],
-            "result": Decimal(xcalc["finalTriBid"])
-        },
-        "ask": {
-            "formula": f'{crl1["ccyPair"]} × {crl2["ccyPair"]}',
-            "components": [
-                {"pair": crl1["ccyPair"], "ask": ask1},
-                {"pair": crl2["ccyPair"], "ask": ask2},
-            ],
-            "result": Decimal(xcalc["finalTriAsk"])
-        },
+        "bid": side("bid", "bid"),
+        "ask": side("ask", "ask"),
+        "mismatches": check_triangulation(crl, recomputed),
         "sources": [
             {
-                "pair": crl1["ccyPair"],
-                "origin": crl1["origin"],
-                "id": crl1["id"]
-            },
-            {
-                "pair": crl2["ccyPair"],
-                "origin": crl2["origin"],
-                "id": crl2["id"]
+                "pair": leg["pair"],
+                "origin": leg["crl"].get("origin") if leg["crl"] else None,
+                "id": leg["crl"].get("id") if leg["crl"] else None
             }
+            for leg in chain
         ]
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,273 @@
+import gc
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from statistics import median
+from typing import Dict, Any, List
+
+from services.CRLService import extract_all_crls, explain_triangulation
+from services.SCPCatalogService import SCPCatalogService
+from services.SCPImportService import SCPImportService, SPOT_STORAGES
+from services.SCPModel import ModelBuilder
+from services.SCPIndexService import SCPIndexService
+from services.SCPParserService import parse_scp
+from services.SCPTraceGeneratorService import SCPTraceGeneratorService
+from services.SPOTAuditExplainService import SpotAuditExplainService
+from services.SPOTConstructionService import SPOTConstructionService
+
+
+# Benchmarks disponibles (en orden de ejecución)
+BENCHMARKS = (
+    "parse",
+    "parse.model",
+    "construction",
+    "crl",
+    "explain",
+    "index.sync",
+    "index.list",
+) + tuple(f"storage.{storage}" for storage in SPOT_STORAGES)
+
+DEFAULT_TRACES = 200
+DEFAULT_REPEAT = 5
+
+# Regresión: más de un 20% por encima de la baseline
+DEFAULT_THRESHOLD = 0.2
+
+
+class SCPBenchmarkService:
+    """
+    Benchmarks del pipeline sobre un corpus sintético reproducible
+    (SCPTraceGeneratorService): parseo, spot construction, extracción de
+    CRLs y triangulación, audit explain, índice (sincronización del
+    catálogo en frío y listado) e importación con cada almacenamiento.
+
+    Cada benchmark se repite 'repeat' veces y se queda con la mediana del
+    tiempo por SCP. Los resultados se pueden guardar como baseline
+    (resources/scp/benchmarks/baseline.json) y comparar con ella: un
+    benchmark es una regresión si supera la baseline en más de threshold
+    (0.2 = un 20% más lento).
+    """
+
+    BASELINE_NAME = "baseline.json"
+
+    def __init__(
+            self,
+            base_path: str,
+            generator: SCPTraceGeneratorService = None,
+            traces: int = DEFAULT_TRACES,
+            repeat: int = DEFAULT_REPEAT
+    ):
+        if traces < 1 or repeat < 1:
+            raise ValueError("El número de trazas y de repeticiones debe ser positivo")
+
+        self.base_path = base_path
+        self.generator = generator or SCPTraceGeneratorService()
+        self.traces = traces
+        self.repeat = repeat
+
+        self.baseline_path = os.path.join(
+            base_path, "resources", "scp", "benchmarks", self.BASELINE_NAME
+        )
+
+    def config(self) -> Dict[str, Any]:
+        return {"traces": self.traces, "generator": self.generator.config()}
+
+    # =========================
+    # RUN
+    # =========================
+
+    def run(self, names: List[str] = None) -> Dict[str, Any]:
+        """
+        Ejecuta los benchmarks indicados (todos por defecto):
+        {
+            "config": {...},
+            "createdAt": str,
+            "python": str,
+            "results": {name: {"seconds": s por SCP (mediana), "rounds": [...]}}
+        }
+        """
+        names = list(names or BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise ValueError(f"Benchmark desconocido: {', '.join(unknown)}")
+
+        traces = list(self.generator.traces(self.traces))
+        parsed = [parse_scp(trace) for trace in traces]
+        spots = [SPOTConstructionService(scp, self.base_path).build() for scp in parsed]
+
+        workdir = tempfile.mkdtemp(prefix="scp-bench-")
+        try:
+            workloads = {
+                "parse": lambda: [parse_scp(trace) for trace in traces],
+                "parse.model": lambda: self._parse_model(traces),
+                "construction": lambda: [
+                    SPOTConstructionService(scp, workdir).build() for scp in parsed
+                ],
+                "crl": lambda: [self._crl(scp) for scp in parsed],
+                "explain": lambda: [self._explain(spot) for spot in spots],
+                "index.sync": self._index_workload(workdir, traces, cold=True),
+                "index.list": self._index_workload(workdir, traces, cold=False),
+            }
+            for storage in SPOT_STORAGES:
+                workloads[f"storage.{storage}"] = self._storage_workload(workdir, traces, storage)
+
+            results = {}
+            for name in names:
+                rounds = self._measure(workloads[name])
+                results[name] = {
+                    "seconds": median(rounds),
+                    "rounds": rounds
+                }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return {
+            "config": self.config(),
+            "createdAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "results": results
+        }
+
+    def _measure(self, workload) -> List[float]:
+        """
+        Segundos por SCP de cada repetición. Si el workload es un par
+        (setup, run) el setup queda fuera de la medida.
+        """
+        setup, run = workload if isinstance(workload, tuple) else (None, workload)
+        rounds = []
+
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            gc.collect()
+            t0 = time.perf_counter()
+            run()
+            rounds.append((time.perf_counter() - t0) / self.traces)
+
+        return rounds
+
+    # =========================
+    # WORKLOADS
+    # =========================
+
+    @staticmethod
+    def _parse_model(traces: List[str]) -> list:
+        # Un builder por ronda: comparte layouts y valores entre los SCPs
+        builder = ModelBuilder()
+        return [builder.parse(trace) for trace in traces]
+
+    @staticmethod
+    def _crl(parsed_scp: Dict[str, Any]):
+        crls = extract_all_crls(parsed_scp)
+        if parsed_scp.get("crl", {}).get("XCalc"):
+            explain_triangulation(parsed_scp)
+        return crls
+
+    @staticmethod
+    def _explain(spot: Dict[str, Any]) -> List[str]:
+        return [
+            SpotAuditExplainService(
+                context=spot.get("context", {}),
+                notional=spot.get("notional", {}),
+                rung=rung
+            ).build()
+            for rung in spot.get("rungs", [])
+        ]
+
+    @staticmethod
+    def _import_all(base_path: str, traces: List[str], storage: str):
+        importer = SCPImportService(base_path=base_path, storage=storage, cache=False)
+        try:
+            with importer.catalog.batch(), importer.raw_archive.batch(), \
+                    importer.spot_store.batch():
+                for trace in traces:
+                    importer.import_trace(trace)
+        finally:
+            importer.catalog.close()
+            importer.raw_archive.close()
+
+    def _storage_workload(self, workdir: str, traces: List[str], storage: str):
+        target = os.path.join(workdir, f"storage-{storage}")
+
+        def setup():
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(target)
+
+        return setup, lambda: self._import_all(target, traces, storage)
+
+    def _index_workload(self, workdir: str, traces: List[str], cold: bool):
+        """
+        cold: sincronización del catálogo desde cero (se borra antes de cada
+        repetición); si no, listado con el catálogo ya al día.
+        """
+        target = os.path.join(workdir, "index")
+        db_path = SCPCatalogService(target).db_path
+
+        def prepare():
+            if not os.path.exists(target):
+                self._import_all(target, traces, "json")
+
+        def setup():
+            prepare()
+            if cold:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(db_path + suffix):
+                        os.remove(db_path + suffix)
+            else:
+                SCPIndexService(target).sync()
+
+        return setup, lambda: SCPIndexService(target).list_scps()
+
+    # =========================
+    # BASELINE
+    # =========================
+
+    def load_baseline(self) -> Dict[str, Any] | None:
+        if not os.path.exists(self.baseline_path):
+            return None
+        with open(self.baseline_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_baseline(self, report: Dict[str, Any]) -> str:
+        os.makedirs(os.path.dirname(self.baseline_path), exist_ok=True)
+        tmp = f"{self.baseline_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp, self.baseline_path)
+        return self.baseline_path
+
+    @staticmethod
+    def compare(
+            report: Dict[str, Any],
+            baseline: Dict[str, Any] | None,
+            threshold: float = DEFAULT_THRESHOLD
+    ) -> List[Dict[str, Any]]:
+        """
+        Compara cada benchmark con la baseline: change es la variación
+        relativa del tiempo por SCP (0.1 = un 10% más lento) y regression
+        indica si supera threshold. Sin baseline (o sin ese benchmark en
+        ella) baseline y change son None.
+        """
+        if threshold < 0:
+            raise ValueError("El umbral de regresión no puede ser negativo")
+        if baseline is not None and baseline["config"] != report["config"]:
+            raise ValueError("La baseline se generó con otra configuración de benchmark")
+
+        references = baseline["results"] if baseline is not None else {}
+
+        comparison = []
+        for name, result in report["results"].items():
+            reference = references.get(name, {}).get("seconds")
+            change = result["seconds"] / reference - 1 if reference else None
+            comparison.append({
+                "name": name,
+                "seconds": result["seconds"],
+                "baseline": reference,
+                "change": change,
+                "regression": change is not None and change > threshold
+            })
+        return comparison
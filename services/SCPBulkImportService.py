@@ -0,0 +1,242 @@
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Dict, Any, Iterable, Iterator, List
+
+from services.SCPImportService import SCPImportService
+from services import SCPMetricsService
+
+
+STAGES = ("scan", "parse", "construction", "write")
+
+
+def _process_chunk(
+        base_path: str,
+        engine: str,
+        storage: str,
+        raw_storage: str,
+        cache: bool,
+        start_index: int,
+        traces: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Trabajo de CPU de un chunk (se ejecuta en un proceso del pool):
+    parseo + spot construction + serialización de artefactos.
+    La escritura a disco la hace el proceso principal.
+    """
+    importer = SCPImportService(
+        base_path=base_path, engine=engine, storage=storage, raw_storage=raw_storage,
+        cache=cache
+    )
+    results = []
+
+    # Caché de parseo: las escrituras del chunk se vuelcan al final en una
+    # única transacción corta (sin lock de SQLite mientras se parsea)
+    cache_batch = importer.cache.batch() if importer.cache is not None else nullcontext()
+
+    with cache_batch:
+        for offset, trace in enumerate(traces):
+            timings = {}
+            result = {"index": start_index + offset, "timings": timings}
+            parsed_scp = None
+
+            try:
+                t0 = time.perf_counter()
+                parsed_scp = importer.parse(trace)
+                t1 = time.perf_counter()
+                timings["parse"] = t1 - t0
+
+                artifacts = importer.build_artifacts(trace, parsed_scp)
+                t2 = time.perf_counter()
+                # build_artifacts incluye construcción + serialización JSON
+                timings["construction"] = t2 - t1
+
+                result["artifacts"] = artifacts
+                result["scpId"] = artifacts["scpId"]
+            except Exception as e:
+                result["scpId"] = parsed_scp.get("id") if isinstance(parsed_scp, dict) else None
+                result["error"] = f"{type(e).__name__}: {e}"
+
+            results.append(result)
+
+    # Métricas del worker: se suman en el proceso principal (_collect)
+    if SCPMetricsService.is_enabled() and results:
+        results[-1]["metrics"] = SCPMetricsService.drain()
+
+    return results
+
+
+class SCPBulkImportService:
+    """
+    Importación masiva de trazas SCP.
+
+    El parseo y el spot construction se reparten en chunks sobre un
+    ProcessPoolExecutor; la escritura de artefactos se hace en el proceso
+    principal y en el orden de entrada, de modo que el resultado en disco
+    para cada SCP id es el mismo que en una importación secuencial.
+
+    Una traza inválida no aborta la importación: se devuelve en 'failures'.
+    """
+
+    DEFAULT_CHUNK_SIZE = 64
+
+    def __init__(
+            self,
+            base_path: str,
+            workers: int = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            engine: str = None,
+            storage: str = None,
+            raw_storage: str = None,
+            cache: bool = True
+    ):
+        self.base_path = base_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.engine = engine
+        self.importer = SCPImportService(
+            base_path=base_path, engine=engine, storage=storage, raw_storage=raw_storage,
+            cache=cache
+        )
+        self.storage = self.importer.storage
+        self.raw_storage = self.importer.raw_storage
+        self.cache = cache
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def import_logs(self, log_paths: Iterable[str]) -> Dict[str, Any]:
+        traces = chain.from_iterable(
+            self.importer.iter_raw_traces(path) for path in log_paths
+        )
+        return self.import_traces(traces)
+
+    def import_traces(self, traces: Iterable[str]) -> Dict[str, Any]:
+        """
+        Importa un iterable de trazas raw y devuelve un informe:
+        {
+            "imported": int,
+            "failed": int,
+            "failures": [{"index", "scpId", "error"}],
+            "elapsed": float (s),
+            "throughput": {"scpPerSec", "mbPerSec"},
+            "stages": {stage: segundos acumulados en todos los procesos}
+        }
+        """
+        stages = {stage: 0.0 for stage in STAGES}
+        failures = []
+        imported = 0
+        total_chars = 0
+
+        started = time.perf_counter()
+
+        # Catálogo y archivo raw: una única transacción para toda la
+        # importación; almacén columnar: un segmento por día
+        with self.importer.catalog.batch(), self.importer.raw_archive.batch(), \
+                self.importer.spot_store.batch():
+            for result in self._iter_results(traces, stages):
+                if result.get("error"):
+                    failures.append({
+                        "index": result["index"],
+                        "scpId": result.get("scpId"),
+                        "error": result["error"]
+                    })
+                    continue
+
+                artifacts = result["artifacts"]
+                total_chars += len(artifacts["raw"])
+
+                t0 = time.perf_counter()
+                try:
+                    self.importer.write_artifacts(artifacts)
+                    imported += 1
+                except Exception as e:
+                    failures.append({
+                        "index": result["index"],
+                        "scpId": result.get("scpId"),
+                        "error": f"{type(e).__name__}: {e}"
+                    })
+                stages["write"] += time.perf_counter() - t0
+
+        elapsed = time.perf_counter() - started
+
+        return {
+            "imported": imported,
+            "failed": len(failures),
+            "failures": failures,
+            "elapsed": elapsed,
+            "throughput": {
+                "scpPerSec": imported / elapsed if elapsed else 0.0,
+                "mbPerSec": total_chars / (1024 * 1024) / elapsed if elapsed else 0.0
+            },
+            "stages": stages
+        }
+
+    # =========================
+    # PIPELINE
+    # =========================
+
+    def _iter_chunks(self, traces: Iterable[str], stages: Dict[str, float]) -> Iterator[tuple]:
+        iterator = iter(traces)
+        index = 0
+
+        while True:
+            t0 = time.perf_counter()
+            chunk = list(islice(iterator, self.chunk_size))
+            stages["scan"] += time.perf_counter() - t0
+
+            if not chunk:
+                return
+
+            yield index, chunk
+            index += len(chunk)
+
+    def _iter_results(self, traces: Iterable[str], stages: Dict[str, float]) -> Iterator[Dict[str, Any]]:
+        """
+        Envía chunks al pool manteniendo como máximo 2 × workers en vuelo
+        (memoria acotada) y devuelve los resultados en orden de entrada.
+        """
+        max_in_flight = self.workers * 2
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+
+            for start_index, chunk in self._iter_chunks(traces, stages):
+                future = pool.submit(
+                    _process_chunk, self.base_path, self.engine, self.storage,
+                    self.raw_storage, self.cache, start_index, chunk
+                )
+                pending.append((start_index, len(chunk), future))
+
+                if len(pending) >= max_in_flight:
+                    yield from self._collect(pending.popleft(), stages)
+
+            while pending:
+                yield from self._collect(pending.popleft(), stages)
+
+    @staticmethod
+    def _collect(entry, stages: Dict[str, float]) -> Iterator[Dict[str, Any]]:
+        start_index, size, future = entry
+
+        try:
+            results = future.result()
+        except Exception as e:
+            # Caída del worker: todo el chunk se marca como fallido
+            for offset in range(size):
+                yield {
+                    "index": start_index + offset,
+                    "scpId": None,
+                    "error": f"{type(e).__name__}: {e}"
+                }
+            return
+
+        for result in results:
+            for stage, seconds in result.pop("timings", {}).items():
+                stages[stage] += seconds
+            if "metrics" in result:
+                SCPMetricsService.merge(result.pop("metrics"))
+            yield result
@@ -0,0 +1,369 @@
+import os
+import json
+import sqlite3
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from services.SCPParserService import atom_code
+from services.SPOTColumnarStoreService import SPOTColumnarStoreService
+
+
+class SCPCatalogService:
+    """
+    Catálogo persistente (SQLite) de los SCPs guardados en history/parsed.
+
+    Guarda por SCP los campos que necesita el listado (priceId, ccyPair,
+    notional, venue, time del TOM), los filtros de búsqueda (ids de
+    cliente, origen del CRL, mktMode) y el día de su fichero en el almacén
+    columnar, junto con el mtime/tamaño del JSON parseado, de modo que:
+    - la importación y el borrado lo actualizan de forma incremental
+    - sync() solo vuelve a leer los ficheros cuyo mtime/tamaño ha cambiado
+    - las búsquedas usan índices secundarios y nunca abren los JSON
+    """
+
+    SCHEMA_VERSION = 4
+    DB_NAME = "catalog.sqlite"
+
+    # Columnas (y orden) de las filas que devuelven los listados
+    LIST_COLUMNS = "scp_id, price_id, ccy_pair, notional, venue, tom_time"
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.history_path = os.path.join(
+            base_path,
+            "resources",
+            "scp",
+            "history"
+        )
+        self.parsed_path = os.path.join(self.history_path, "parsed")
+        self.db_path = os.path.join(self.history_path, self.DB_NAME)
+
+        self._conn = None
+        self._batch_depth = 0
+
+    # =========================
+    # CONNECTION / SCHEMA
+    # =========================
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.history_path, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._ensure_schema()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _ensure_schema(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == self.SCHEMA_VERSION:
+            return
+
+        # Esquema antiguo o inexistente → se recrea; sync() lo repuebla
+        self._conn.executescript(
+            """
+            DROP TABLE IF EXISTS scps;
+            DROP TABLE IF EXISTS invalid_files;
+            DROP TABLE IF EXISTS stats;
+
+            CREATE TABLE scps (
+                scp_id            TEXT PRIMARY KEY,
+                price_id          TEXT,
+                ccy_pair          TEXT,
+                notional          TEXT,
+                notional_num      REAL,
+                venue             TEXT,
+                tom_time          TEXT,
+                venue_client_id   TEXT,
+                venue_account_id  TEXT,
+                venue_user_id     TEXT,
+                crl_origin        TEXT,
+                mkt_mode          TEXT,
+                spot_day          TEXT,
+                mtime_ns          INTEGER NOT NULL,
+                size              INTEGER NOT NULL
+            );
+
+            CREATE INDEX idx_scps_tom_time ON scps (tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_ccy_pair ON scps (ccy_pair, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_ccy_pair_venue ON scps (ccy_pair, venue, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_venue ON scps (venue, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_client ON scps (venue_client_id, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_account ON scps (venue_account_id, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_user ON scps (venue_user_id, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_origin ON scps (crl_origin, mkt_mode, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_mkt_mode ON scps (mkt_mode, tom_time DESC, scp_id DESC);
+            CREATE INDEX idx_scps_notional ON scps (notional_num);
+
+            -- JSON corruptos: se recuerdan para no releerlos mientras no cambien
+            CREATE TABLE invalid_files (
+                scp_id    TEXT PRIMARY KEY,
+                mtime_ns  INTEGER NOT NULL,
+                size      INTEGER NOT NULL
+            );
+
+            -- Contador exacto de SCPs (el listado sin filtros no hace COUNT)
+            CREATE TABLE stats (total INTEGER NOT NULL);
+            INSERT INTO stats (total) VALUES (0);
+
+            CREATE TRIGGER trg_scps_insert AFTER INSERT ON scps
+            BEGIN UPDATE stats SET total = total + 1; END;
+
+            CREATE TRIGGER trg_scps_delete AFTER DELETE ON scps
+            BEGIN UPDATE stats SET total = total - 1; END;
+            """
+        )
+        self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa varias actualizaciones en una única transacción
+        (importaciones masivas).
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.commit()
+
+    def _commit(self):
+        if self._batch_depth == 0:
+            self.conn.commit()
+
+    # =========================
+    # ENTRIES
+    # =========================
+
+    @staticmethod
+    def entry_from_parsed(scp_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extrae los campos del catálogo de un SCP parseado
+        (en memoria o cargado desde su JSON).
+        """
+        key = data.get("key", {})
+        notional = key.get("notional", {})
+        tom = data.get("tom", {})
+        crl = data.get("crl") or {}
+
+        return {
+            "scpId": scp_id,
+            "priceId": data.get("id", scp_id),
+            "ccyPair": key.get("ccyPair", "-"),
+            "notional": notional.get("amount", "-"),
+            "venue": key.get("venue", "-"),
+            "timestamp": tom.get("time", "-"),
+            "venueClientId": key.get("venueClientId"),
+            "venueAccountId": key.get("venueAccountId"),
+            "venueUserId": key.get("venueUserId"),
+            "crlOrigin": crl.get("origin") if isinstance(crl, Mapping) else None,
+            # Fast (mktMode=F) llega del parser como False
+            "mktMode": atom_code(tom.get("mktMode")),
+            "spotDay": SPOTColumnarStoreService.day_of(data)
+        }
+
+    def upsert(self, entry: Dict[str, Any]):
+        """
+        Registra (o actualiza) un SCP a partir de su entrada de catálogo.
+        El mtime se toma del JSON parseado ya escrito.
+        """
+        scp_id = entry["scpId"]
+        st = os.stat(os.path.join(self.parsed_path, f"{scp_id}.json"))
+        self._write_entry(entry, st.st_mtime_ns, st.st_size)
+        self._commit()
+
+    def remove(self, scp_id: str):
+        self.conn.execute("DELETE FROM scps WHERE scp_id = ?", (scp_id,))
+        self.conn.execute("DELETE FROM invalid_files WHERE scp_id = ?", (scp_id,))
+        self._commit()
+
+    def _write_entry(self, entry: Dict[str, Any], mtime_ns: int, size: int):
+        # UPSERT (no INSERT OR REPLACE) para que los triggers del contador
+        # solo cuenten altas reales
+        self.conn.execute(
+            """
+            INSERT INTO scps (
+                scp_id, price_id, ccy_pair, notional, notional_num, venue, tom_time,
+                venue_client_id, venue_account_id, venue_user_id, crl_origin, mkt_mode,
+                spot_day, mtime_ns, size
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scp_id) DO UPDATE SET
+                price_id = excluded.price_id,
+                ccy_pair = excluded.ccy_pair,
+                notional = excluded.notional,
+                notional_num = excluded.notional_num,
+                venue = excluded.venue,
+                tom_time = excluded.tom_time,
+                venue_client_id = excluded.venue_client_id,
+                venue_account_id = excluded.venue_account_id,
+                venue_user_id = excluded.venue_user_id,
+                crl_origin = excluded.crl_origin,
+                mkt_mode = excluded.mkt_mode,
+                spot_day = excluded.spot_day,
+                mtime_ns = excluded.mtime_ns,
+                size = excluded.size
+            """,
+            (
+                entry["scpId"],
+                self._to_text(entry.get("priceId")),
+                self._to_text(entry.get("ccyPair")),
+                self._to_text(entry.get("notional")),
+                self._to_number(entry.get("notional")),
+                self._to_text(entry.get("venue")),
+                self._to_text(entry.get("timestamp")),
+                self._to_text(entry.get("venueClientId")),
+                self._to_text(entry.get("venueAccountId")),
+                self._to_text(entry.get("venueUserId")),
+                self._to_text(entry.get("crlOrigin")),
+                self._to_text(entry.get("mktMode")),
+                self._to_text(entry.get("spotDay")),
+                mtime_ns,
+                size
+            )
+        )
+        self.conn.execute("DELETE FROM invalid_files WHERE scp_id = ?", (entry["scpId"],))
+
+    def _write_invalid(self, scp_id: str, mtime_ns: int, size: int):
+        self.conn.execute("DELETE FROM scps WHERE scp_id = ?", (scp_id,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO invalid_files (scp_id, mtime_ns, size) VALUES (?, ?, ?)",
+            (scp_id, mtime_ns, size)
+        )
+
+    # =========================
+    # SYNC
+    # =========================
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Reconcilia el catálogo con history/parsed: lee solo los JSON nuevos
+        o modificados y elimina los que ya no existen.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+
+        if not os.path.isdir(self.parsed_path):
+            removed = self.conn.execute("DELETE FROM scps").rowcount
+            self.conn.execute("DELETE FROM invalid_files")
+            self.conn.commit()
+            stats["removed"] = removed
+            return stats
+
+        stored = {
+            scp_id: (mtime_ns, size)
+            for scp_id, mtime_ns, size in self.conn.execute(
+                """
+                SELECT scp_id, mtime_ns, size FROM scps
+                UNION ALL
+                SELECT scp_id, mtime_ns, size FROM invalid_files
+                """
+            )
+        }
+
+        seen = set()
+
+        with self.batch():
+            with os.scandir(self.parsed_path) as it:
+                for file in it:
+                    if not file.name.endswith(".json"):
+                        continue
+
+                    scp_id = file.name[:-len(".json")]
+                    seen.add(scp_id)
+
+                    try:
+                        st = file.stat()
+                    except OSError:
+                        continue
+
+                    previous = stored.get(scp_id)
+                    if previous == (st.st_mtime_ns, st.st_size):
+                        continue
+
+                    self._index_file(scp_id, file.path, st)
+                    stats["updated" if previous else "added"] += 1
+
+            for scp_id in stored.keys() - seen:
+                self.remove(scp_id)
+                stats["removed"] += 1
+
+        return stats
+
+    def _index_file(self, scp_id: str, path: str, st: os.stat_result):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            entry = self.entry_from_parsed(scp_id, data)
+        except Exception:
+            # SCP corrupto o incompleto → se registra como no válido para no
+            # releerlo mientras el fichero no cambie
+            self._write_invalid(scp_id, st.st_mtime_ns, st.st_size)
+            return
+
+        self._write_entry(entry, st.st_mtime_ns, st.st_size)
+
+    # =========================
+    # QUERIES
+    # =========================
+
+    def list_scps(self) -> List[Dict[str, Any]]:
+        """
+        SCPs válidos en orden descendente por time del TOM.
+        """
+        rows = self.conn.execute(
+            f"""
+            SELECT {self.LIST_COLUMNS}
+            FROM scps
+            ORDER BY tom_time DESC, scp_id DESC
+            """
+        )
+        return [self.row_to_entry(row) for row in rows]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT total FROM stats").fetchone()[0]
+
+    def spot_day(self, scp_id: str) -> Optional[str]:
+        """
+        Día del SCP en el almacén columnar (SPOTColumnarStoreService.day_of)
+        o None si no está en el catálogo.
+        """
+        row = self.conn.execute(
+            "SELECT spot_day FROM scps WHERE scp_id = ?", (scp_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def row_to_entry(row) -> Dict[str, Any]:
+        scp_id, price_id, ccy_pair, notional, venue, tom_time = row
+        return {
+            "scpId": scp_id,
+            "priceId": price_id,
+            "ccyPair": ccy_pair,
+            "notional": notional,
+            "venue": venue,
+            "timestamp": tom_time
+        }
+
+    @staticmethod
+    def _to_text(value) -> Optional[str]:
+        if value is None:
+            return None
+        return str(value)
+
+    @staticmethod
+    def _to_number(value) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
@@ -1,5 +1,9 @@
 import os
 
+from services.SCPCatalogService import SCPCatalogService
+from services.SCPRawArchiveService import SCPRawArchiveService
+from services.SPOTColumnarStoreService import SPOTColumnarStoreService
+
 
 class SCPDeleteService:
 
@@ -14,6 +18,11 @@ class SCPDeleteService:
         deleted = False
 
         paths = [
+            os.path.join(
+                self.base_path,
+                "resources", "scp", "history", "raw",
+                f"{scp_id}.txt"
+            ),
             os.path.join(
                 self.base_path,
                 "resources", "scp", "history", "parsed",
@@ -31,4 +40,22 @@ class SCPDeleteService:
                 os.remove(path)
                 deleted = True
 
+        if SPOTColumnarStoreService(self.base_path).delete(scp_id):
+            deleted = True
+
+        # Sin archivo raw no se crea: el SCP se importó con raw_storage=files
+        archive = SCPRawArchiveService(self.base_path)
+        if os.path.exists(archive.db_path):
+            try:
+                if archive.remove(scp_id):
+                    deleted = True
+            finally:
+                archive.close()
+
+        catalog = SCPCatalogService(self.base_path)
+        try:
+            catalog.remove(scp_id)
+        finally:
+            catalog.close()
+
         return deleted
\ No newline at end of file
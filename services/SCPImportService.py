@@ -0,0 +1,342 @@
+import io
+import os
+import re
+import gzip
+import json
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator
+
+from services.SCPParserService import parse_scp, parse_scp_lazy
+from services.SCPCatalogService import SCPCatalogService
+from services.SPOTConstructionService import SPOTConstructionService
+from services.SPOTColumnarStoreService import SPOTColumnarStoreService
+from services.SCPRawArchiveService import SCPRawArchiveService
+from services.SCPParseCacheService import SCPParseCacheService
+from services.SCPMetricsService import span, timed
+
+
+SCP_MARKER = "SCP [key=SCPKey ["
+
+_BRACKET_RE = re.compile(r'[\[\]]')
+
+# Almacenamiento del spot construction:
+# - json: un JSON indentado por SCP (resources/scp/spot_construction/<id>.json)
+# - columnar: ficheros binarios por día (SPOTColumnarStoreService)
+SPOT_STORAGES = ("json", "columnar")
+DEFAULT_SPOT_STORAGE = "json"
+
+# Almacenamiento de la traza raw:
+# - archive: comprimida y deduplicada (SCPRawArchiveService)
+# - files: un .txt por SCP (resources/scp/history/raw/<id>.txt)
+RAW_STORAGES = ("archive", "files")
+DEFAULT_RAW_STORAGE = "archive"
+
+
+class SCPImportService:
+    """
+    Importa trazas SCP y genera los mismos artefactos que la pantalla de
+    importación:
+    - resources/scp/history/raw/<id>.txt (o el archivo raw comprimido)
+    - resources/scp/history/parsed/<id>.json
+    - resources/scp/spot_construction/<id>.json (o el almacén columnar)
+
+    Además permite importar ficheros de log completos (incluso de varios GB,
+    planos o .gz) en streaming: las trazas se localizan por el marcador
+    'SCP [key=SCPKey [' y se entregan una a una sin cargar el fichero entero.
+    """
+
+    DEFAULT_CHUNK_SIZE = 1024 * 1024
+    DEFAULT_MAX_TRACE_CHARS = 4 * 1024 * 1024
+
+    def __init__(
+            self,
+            base_path: str,
+            engine: str = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            max_trace_chars: int = DEFAULT_MAX_TRACE_CHARS,
+            storage: str = None,
+            raw_storage: str = None,
+            cache: bool = True
+    ):
+        storage = storage or DEFAULT_SPOT_STORAGE
+        if storage not in SPOT_STORAGES:
+            raise ValueError(f"Almacenamiento de spot construction desconocido: {storage}")
+
+        raw_storage = raw_storage or DEFAULT_RAW_STORAGE
+        if raw_storage not in RAW_STORAGES:
+            raise ValueError(f"Almacenamiento raw desconocido: {raw_storage}")
+
+        self.base_path = base_path
+        self.engine = engine
+        self.storage = storage
+        self.raw_storage = raw_storage
+        self.chunk_size = chunk_size
+        self.max_trace_chars = max_trace_chars
+
+        scp_base = os.path.join(base_path, "resources", "scp")
+        self.raw_dir = os.path.join(scp_base, "history", "raw")
+        self.parsed_dir = os.path.join(scp_base, "history", "parsed")
+
+        self.catalog = SCPCatalogService(base_path)
+        self.spot_store = SPOTColumnarStoreService(base_path)
+        self.raw_archive = SCPRawArchiveService(base_path)
+        # Reimportar una traza ya vista no vuelve a parsearla ni construirla
+        self.cache = SCPParseCacheService.shared(base_path) if cache else None
+
+    # =========================
+    # SINGLE TRACE
+    # =========================
+
+    def import_trace(self, content: str) -> Dict[str, Any]:
+        """
+        Parsea una traza SCP, guarda raw + parsed y genera el spot
+        construction. Lanza excepción si la traza no es válida.
+        """
+        return self.save_parsed(content, self.parse(content))
+
+    def parse(self, content: str) -> Dict[str, Any]:
+        """
+        parse_scp con el motor del servicio (desde la caché si la hay).
+        """
+        if self.cache is not None:
+            return self.cache.parse(content, self.engine)
+        return parse_scp(content, self.engine)
+
+    def save_parsed(self, content: str, parsed_scp: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.write_artifacts(self.build_artifacts(content, parsed_scp))
+        result["parsedScp"] = parsed_scp
+        return result
+
+    def build_artifacts(self, content: str, parsed_scp: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Genera en memoria el contenido de los tres artefactos de un SCP
+        (raw, parsed JSON y spot construction: JSON o, con almacenamiento
+        columnar, el resultado de build() y su día) y su entrada de
+        catálogo, sin escribir nada. Con el archivo raw la traza se
+        comprime aquí (rawPacked).
+        """
+        scp_id = parsed_scp.get("id") if isinstance(parsed_scp, dict) else None
+
+        if not scp_id:
+            raise ValueError("No se pudo extraer el ID del SCP")
+
+        if self.cache is not None:
+            spot = self.cache.construction(content, parsed_scp, self.engine)
+        else:
+            spot = SPOTConstructionService(
+                parsed_scp=parsed_scp,
+                base_path=self.base_path
+            ).build()
+
+        with span("serialize"):
+            if self.storage == "columnar":
+                spot_day = SPOTColumnarStoreService.day_of(parsed_scp)
+            else:
+                # Mismo JSON que SPOTConstructionService.to_json()
+                spot = json.dumps(spot, indent=2, ensure_ascii=False)
+                spot_day = None
+
+            return {
+                "scpId": scp_id,
+                "raw": content,
+                "parsed": json.dumps(
+                    parsed_scp,
+                    indent=2,
+                    ensure_ascii=False,
+                    default=str
+                ),
+                "spot": spot,
+                "spotDay": spot_day,
+                "rawPacked": self.raw_archive.pack(content) if self.raw_storage == "archive" else None,
+                "catalog": SCPCatalogService.entry_from_parsed(scp_id, parsed_scp)
+            }
+
+    @timed("write")
+    def write_artifacts(self, artifacts: Dict[str, Any]) -> Dict[str, Any]:
+        scp_id = artifacts["scpId"]
+
+        os.makedirs(self.parsed_dir, exist_ok=True)
+
+        raw_path = os.path.join(self.raw_dir, f"{scp_id}.txt")
+        parsed_path = os.path.join(self.parsed_dir, f"{scp_id}.json")
+        spot_path = SPOTConstructionService.output_path(self.base_path, scp_id)
+
+        with span("write.raw"):
+            if artifacts.get("rawPacked") is not None:
+                self.raw_archive.store(scp_id, artifacts["rawPacked"])
+                raw_path = self.raw_archive.db_path
+            elif not os.path.exists(raw_path):
+                os.makedirs(self.raw_dir, exist_ok=True)
+                with open(raw_path, "w", encoding="utf-8") as f:
+                    f.write(artifacts["raw"])
+
+        with span("write.parsed"):
+            with open(parsed_path, "w", encoding="utf-8") as f:
+                f.write(artifacts["parsed"])
+
+        with span("write.spot"):
+            if artifacts.get("spotDay") is not None:
+                # Un JSON anterior taparía el resultado columnar en la pantalla
+                if os.path.exists(spot_path):
+                    os.remove(spot_path)
+                spot_path = self.spot_store.append(scp_id, artifacts["spotDay"], artifacts["spot"])
+            else:
+                os.makedirs(os.path.dirname(spot_path), exist_ok=True)
+                with open(spot_path, "w", encoding="utf-8") as f:
+                    f.write(artifacts["spot"])
+
+        with span("write.catalog"):
+            self.catalog.upsert(artifacts["catalog"])
+
+        return {
+            "scpId": scp_id,
+            "rawPath": raw_path,
+            "parsedPath": parsed_path,
+            "spotPath": spot_path
+        }
+
+    # =========================
+    # LOG FILES (STREAMING)
+    # =========================
+
+    def iter_raw_traces(self, log_path: str) -> Iterator[str]:
+        """
+        Devuelve, de forma perezosa, cada traza SCP completa encontrada en
+        el fichero de log.
+        """
+        with self._open_log(log_path) as f:
+            yield from self._scan_traces(f)
+
+    def iter_text_traces(self, content: str) -> Iterator[str]:
+        """
+        Trazas SCP de un texto pegado (una o varias). Si el texto no
+        contiene ninguna traza completa se devuelve entero, como única
+        traza, para que su importación informe del error.
+        """
+        traces = self._scan_traces(io.StringIO(content))
+
+        first = next(traces, None)
+        if first is None:
+            yield content
+            return
+
+        yield first
+        yield from traces
+
+    def iter_scps(self, log_path: str, lazy: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Devuelve, de forma perezosa, cada SCP del log ya parseado.
+        Con lazy=True cada SCP es un LazyBlock: solo se parsean los campos
+        que se leen, lo que abarata los recorridos de búsqueda/indexado.
+        """
+        for trace in self.iter_raw_traces(log_path):
+            yield parse_scp_lazy(trace) if lazy else parse_scp(trace, self.engine)
+
+    def iter_catalog_entries(self, log_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Devuelve la entrada de catálogo de cada SCP del log sin escribir
+        artefactos ni parsear los campos que el catálogo no usa.
+        """
+        for parsed_scp in self.iter_scps(log_path, lazy=True):
+            scp_id = parsed_scp.get("id") if isinstance(parsed_scp, Mapping) else None
+            if scp_id:
+                yield SCPCatalogService.entry_from_parsed(scp_id, parsed_scp)
+
+    def import_log(self, log_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Importa todas las trazas del log escribiendo sus artefactos.
+        Por cada traza devuelve un resultado; una traza inválida no detiene
+        la importación (se devuelve con 'error').
+        """
+        for index, trace in enumerate(self.iter_raw_traces(log_path)):
+            try:
+                result = self.import_trace(trace)
+                result.pop("parsedScp", None)
+                result["error"] = None
+            except Exception as e:
+                result = {"scpId": None, "error": str(e)}
+
+            result["index"] = index
+            yield result
+
+    # =========================
+    # HELPERS
+    # =========================
+
+    @staticmethod
+    def _open_log(log_path: str):
+        if log_path.endswith(".gz"):
+            return gzip.open(log_path, "rt", encoding="utf-8", errors="replace")
+        return open(log_path, "r", encoding="utf-8", errors="replace")
+
+    def _scan_traces(self, f) -> Iterator[str]:
+        """
+        Localiza trazas SCP en un stream de texto contando corchetes desde
+        cada marcador. El buffer solo retiene la traza en curso: el resto del
+        fichero nunca se carga en memoria.
+
+        Una traza truncada (aparece otro marcador antes de cerrarse o supera
+        max_trace_chars) se descarta y se continúa con la siguiente.
+        """
+        buf = ""
+        start = -1  # inicio de la traza en curso dentro de buf
+        scan = 0    # offset desde el que seguir buscando / contando
+        depth = 0
+
+        while True:
+            chunk = f.read(self.chunk_size)
+            if not chunk:
+                return
+
+            # Se descarta lo ya consumido antes de añadir el chunk nuevo
+            if start >= 0:
+                base = start
+            else:
+                base = max(0, min(scan, len(buf) - len(SCP_MARKER) + 1))
+
+            buf = buf[base:] + chunk
+            scan -= base
+            if start >= 0:
+                start = 0
+
+            while True:
+                if start < 0:
+                    start = buf.find(SCP_MARKER, scan)
+                    if start < 0:
+                        # Se conserva un posible marcador partido entre chunks
+                        scan = max(scan, len(buf) - len(SCP_MARKER) + 1)
+                        break
+                    scan = start
+                    depth = 0
+
+                search_from = max(start + 1, scan - len(SCP_MARKER) + 1)
+
+                end = -1
+                for m in _BRACKET_RE.finditer(buf, scan):
+                    depth += 1 if m.group() == "[" else -1
+                    if depth == 0:
+                        end = m.end()
+                        break
+
+                # Otro marcador antes del cierre → traza truncada
+                limit = end if end >= 0 else len(buf)
+                next_marker = buf.find(SCP_MARKER, search_from, limit)
+                if next_marker >= 0:
+                    start = -1
+                    scan = next_marker
+                    continue
+
+                if end >= 0:
+                    yield buf[start:end]
+                    start = -1
+                    scan = end
+                    continue
+
+                if len(buf) - start > self.max_trace_chars:
+                    start = -1
+                    scan = len(buf)
+                    break
+
+                # Traza incompleta: se sigue contando con el próximo chunk
+                scan = len(buf)
+                break
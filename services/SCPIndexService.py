@@ -1,7 +1,8 @@
 # services/SCPIndexService.py
 
 import os
-import json
+
+from services.SCPCatalogService import SCPCatalogService
 
 
 class SCPIndexService:
@@ -20,40 +21,21 @@ class SCPIndexService:
         if not os.path.exists(self.parsed_path):
             return []
 
-        scps = []
-
-        for file in os.listdir(self.parsed_path):
-            if not file.endswith(".json"):
-                continue
-
-            scp_id = file.replace(".json", "")
-            path = os.path.join(self.parsed_path, file)
-
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                key = data.get("key", {})
-                notional = key.get("notional", {})
-                tom = data.get("tom", {})
-
-                scps.append({
-                    "scpId": scp_id,
-                    "priceId": data.get("id", scp_id),
-                    "ccyPair": key.get("ccyPair", "-"),
-                    "notional": notional.get("amount", "-"),
-                    "venue": key.get("venue", "-"),
-                    # ✅ TIME CORRECTO (desde TOM)
-                    "timestamp": tom.get("time", "-")
-                })
-
-            except Exception:
-                # SCP corrupto o incompleto → se ignora
-                continue
-
-        # Orden descendente por timestamp ISO
-        return sorted(
-            scps,
-            key=lambda x: x["timestamp"] or "",
-            reverse=True
-        )
\ No newline at end of file
+        # El catálogo persistente solo relee los JSON nuevos o modificados
+        catalog = SCPCatalogService(self.base_path)
+        try:
+            catalog.sync()
+            # Orden descendente por timestamp ISO (time del TOM)
+            return catalog.list_scps()
+        finally:
+            catalog.close()
+
+    def sync(self):
+        """
+        Pone al día el catálogo sin cargar el listado completo.
+        """
+        catalog = SCPCatalogService(self.base_path)
+        try:
+            return catalog.sync()
+        finally:
+            catalog.close()
\ No newline at end of file
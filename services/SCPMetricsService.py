@@ -0,0 +1,359 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Any
+
+
+# =========================
+# INSTRUMENTACIÓN DEL PIPELINE
+# =========================
+#
+# Spans con nombre (parse, etapas del spot construction, escrituras,
+# explain), contadores y un histograma de latencias por span con p50/p99.
+#
+# Desactivada por defecto (se activa con enable() o la variable de entorno
+# SCP_METRICS=1, que heredan los procesos del pool):
+# - los métodos decorados con @timed quedan sin envoltorio mientras está
+#   desactivada (el decorador los sustituye en la clase solo al activarla),
+#   así que las etapas internas por rung no pagan nada;
+# - span(), count() y las funciones decoradas solo comprueban un flag.
+#
+# Las métricas son del proceso: drain()/merge() permiten llevar las de los
+# workers al proceso principal. Exportación: to_prometheus() (formato de
+# texto de Prometheus) y snapshot() / to_json().
+
+ENV_VAR = "SCP_METRICS"
+
+# Histograma: buckets logarítmicos de factor 2^(1/4) desde 1 µs (error
+# relativo de los percentiles < 10%). En Prometheus se exporta uno de cada
+# BUCKETS_PER_OCTAVE (potencias de 2), que siguen siendo acumulados exactos.
+BUCKET_BASE = 1e-6
+BUCKETS_PER_OCTAVE = 4
+BUCKET_COUNT = 30 * BUCKETS_PER_OCTAVE  # hasta ~18 min
+
+QUANTILES = (0.5, 0.99)
+
+_LOG_FACTOR = math.log(2) / BUCKETS_PER_OCTAVE
+
+
+def _bucket_of(seconds: float) -> int:
+    if seconds <= BUCKET_BASE:
+        return 0
+    # Bucket i: (upper(i - 1), upper(i)]
+    return min(BUCKET_COUNT - 1, math.ceil(math.log(seconds / BUCKET_BASE) / _LOG_FACTOR))
+
+
+def _bucket_upper(index: int) -> float:
+    return BUCKET_BASE * 2 ** (index / BUCKETS_PER_OCTAVE)
+
+
+class _Histogram:
+
+    __slots__ = ("count", "sum", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * BUCKET_COUNT
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[_bucket_of(seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimación del percentil q: centro geométrico del bucket donde cae,
+        acotado al mínimo/máximo observados.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                lower = _bucket_upper(index - 1) if index else 0.0
+                value = math.sqrt(lower * _bucket_upper(index)) if lower else _bucket_upper(index)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            **{f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES},
+            # Disperso: índice de bucket → observaciones
+            "buckets": {str(i): n for i, n in enumerate(self.buckets) if n}
+        }
+
+    def merge(self, data: Dict[str, Any]):
+        if not data["count"]:
+            return
+        self.count += data["count"]
+        self.sum += data["sum"]
+        self.min = min(self.min, data["min"])
+        self.max = max(self.max, data["max"])
+        for index, n in data["buckets"].items():
+            self.buckets[int(index)] += n
+
+
+class _Registry:
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: Dict[str, _Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        # (clase, atributo, función original, envoltorio) de los métodos @timed
+        self.methods = []
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = _Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, n: int):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+
+_registry = _Registry()
+
+
+# =========================
+# ACTIVACIÓN
+# =========================
+
+def enable():
+    _registry.enabled = True
+    os.environ[ENV_VAR] = "1"
+    for owner, attr, _, wrapper in _registry.methods:
+        setattr(owner, attr, wrapper)
+
+
+def disable():
+    _registry.enabled = False
+    os.environ.pop(ENV_VAR, None)
+    for owner, attr, original, _ in _registry.methods:
+        setattr(owner, attr, original)
+
+
+def is_enabled() -> bool:
+    return _registry.enabled
+
+
+# =========================
+# REGISTRO
+# =========================
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """
+    with span("write.parsed_json"): ... → observa la duración del bloque.
+    """
+    if not _registry.enabled:
+        return _NULL_SPAN
+    return _timed_block(name)
+
+
+@contextmanager
+def _timed_block(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe(name, time.perf_counter() - t0)
+
+
+def count(name: str, n: int = 1):
+    if _registry.enabled:
+        _registry.count(name, n)
+
+
+def observe(name: str, seconds: float):
+    if _registry.enabled:
+        _registry.observe(name, seconds)
+
+
+class _Timed:
+    """
+    Resultado de @timed: en una clase se sustituye por la función original
+    (y se registra para envolverla al activar las métricas); fuera de una
+    clase actúa como envoltorio que comprueba el flag.
+    """
+
+    def __init__(self, fn, name: str):
+        self.fn = fn
+        self.name = name
+        wraps(fn)(self)
+
+    def __call__(self, *args, **kwargs):
+        if not _registry.enabled:
+            return self.fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            _registry.observe(self.name, time.perf_counter() - t0)
+
+    def __set_name__(self, owner, attr):
+        fn, name = self.fn, self.name
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _registry.observe(name, time.perf_counter() - t0)
+
+        _registry.methods.append((owner, attr, fn, wrapper))
+        setattr(owner, attr, wrapper if _registry.enabled else fn)
+
+
+def timed(name: str):
+    """
+    Decorador: cada llamada se observa en el span name.
+    """
+    def decorator(fn):
+        return _Timed(fn, name)
+    return decorator
+
+
+# =========================
+# EXPORT / MERGE
+# =========================
+
+def snapshot() -> Dict[str, Any]:
+    with _registry.lock:
+        return {
+            "enabled": _registry.enabled,
+            "spans": {name: h.to_dict() for name, h in sorted(_registry.spans.items())},
+            "counters": dict(sorted(_registry.counters.items()))
+        }
+
+
+def reset():
+    with _registry.lock:
+        _registry.spans.clear()
+        _registry.counters.clear()
+
+
+def drain() -> Dict[str, Any]:
+    """
+    snapshot() y reset() en un paso (métricas de un worker hacia el
+    proceso principal).
+    """
+    with _registry.lock:
+        data = {
+            "spans": {name: h.to_dict() for name, h in _registry.spans.items()},
+            "counters": dict(_registry.counters)
+        }
+        _registry.spans.clear()
+        _registry.counters.clear()
+    return data
+
+
+def merge(data: Dict[str, Any]):
+    with _registry.lock:
+        for name, histogram in data.get("spans", {}).items():
+            target = _registry.spans.get(name)
+            if target is None:
+                target = _registry.spans[name] = _Histogram()
+            target.merge(histogram)
+        for name, n in data.get("counters", {}).items():
+            _registry.counters[name] = _registry.counters.get(name, 0) + n
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus() -> str:
+    data = snapshot()
+    lines = [
+        "# HELP scp_span_seconds Duración de los spans del pipeline de pricing.",
+        "# TYPE scp_span_seconds histogram",
+    ]
+
+    for name, h in data["spans"].items():
+        label = f'span="{_label(name)}"'
+        buckets = {int(i): n for i, n in h["buckets"].items()}
+        cumulative = 0
+        for index in range(BUCKET_COUNT):
+            cumulative += buckets.get(index, 0)
+            if index % BUCKETS_PER_OCTAVE == 0:
+                lines.append(
+                    f'scp_span_seconds_bucket{{{label},le="{_bucket_upper(index):.9g}"}} {cumulative}'
+                )
+        lines.append(f'scp_span_seconds_bucket{{{label},le="+Inf"}} {h["count"]}')
+        lines.append(f"scp_span_seconds_sum{{{label}}} {h['sum']:.9g}")
+        lines.append(f"scp_span_seconds_count{{{label}}} {h['count']}")
+
+    lines.append("# HELP scp_span_quantile_seconds Percentiles estimados de los spans.")
+    lines.append("# TYPE scp_span_quantile_seconds gauge")
+    for name, h in data["spans"].items():
+        for q in QUANTILES:
+            value = h[f"p{round(q * 100)}"]
+            lines.append(
+                f'scp_span_quantile_seconds{{span="{_label(name)}",quantile="{q}"}} {value:.9g}'
+            )
+
+    lines.append("# HELP scp_events_total Contadores del pipeline de pricing.")
+    lines.append("# TYPE scp_events_total counter")
+    for name, n in data["counters"].items():
+        lines.append(f'scp_events_total{{event="{_label(name)}"}} {n}')
+
+    return "\n".join(lines) + "\n"
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+def export(path: str) -> str:
+    """
+    Escribe las métricas en path: JSON si termina en .json, si no texto de
+    Prometheus (p. ej. para el textfile collector de node_exporter). La
+    escritura es atómica.
+    """
+    content = to_json() if path.endswith(".json") else to_prometheus()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return path
+
+
+if os.environ.get(ENV_VAR) == "1":
+    _registry.enabled = True
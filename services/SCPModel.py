@@ -0,0 +1,341 @@
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Dict, Any, Tuple
+
+from services.SCPParserService import parse_scp
+
+
+# =========================
+# SCP OBJECT MODEL
+# =========================
+#
+# Representación compacta de un SCP parseado. En lugar del árbol de dicts
+# de parse_scp, cada bloque es un objeto con __slots__:
+#
+# - SCP, CRL, TOM, Rung, XCalc y TMU tienen un slot por campo conocido
+#   (scp.crl.rungs[0].bidPrice); los campos no previstos van a un dict
+#   _extra que normalmente es None.
+# - El resto de bloques y mapas (SCPKey, AutoSkew, notional...) son Block:
+#   una tupla de valores alineada con sus claves.
+# - El orden de claves de cada bloque se guarda como un _Layout compartido
+#   por todos los bloques con la misma forma, así que la conversión a dict
+#   es exacta (mismas claves, mismo orden, mismos tipos).
+# - Las listas siguen siendo listas; los Decimal / enteros / strings
+#   repetidos se comparten entre SCPs a través de un ModelBuilder.
+#
+# Todos los nodos implementan Mapping (get, [], in, keys, items, == con un
+# dict), de modo que los servicios que leen el SCP con .get() funcionan
+# sobre el modelo sin cambios. Para serializar (json, pickle de la caché)
+# se usa to_dict().
+#
+# parse_scp(trace, builder=ModelBuilder()) construye el modelo durante el
+# parseo: con el motor single-pass cada bloque Class [...] se convierte en
+# cuanto se cierra, sin que llegue a existir el árbol de dicts completo.
+
+_TYPE_KEY = "__type__"
+
+
+class _Layout:
+    """
+    Orden de claves de un bloque (incluido __type__ si lo tiene),
+    compartido entre todos los bloques con la misma forma.
+    """
+
+    __slots__ = ("keys", "index")
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+
+
+class Node(Mapping):
+    """
+    Base de los bloques del modelo: acceso tipo dict de solo lectura sobre
+    las claves originales del bloque.
+    """
+
+    __slots__ = ("_type", "_layout")
+
+    # Clase → __type__ con el que se registra (None: mapa sin __type__)
+    TYPE = None
+
+    def __iter__(self):
+        return iter(self._layout.keys)
+
+    def __len__(self):
+        return len(self._layout.keys)
+
+    def __contains__(self, key):
+        return key in self._layout.index
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._type or ''})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Árbol de dicts/listas idéntico al que devuelve parse_scp.
+        """
+        return {key: _to_plain(self[key]) for key in self._layout.keys}
+
+
+class Block(Node):
+    """
+    Bloque o mapa genérico: valores en una tupla alineada con el layout.
+    """
+
+    __slots__ = ("_values",)
+
+    def __getitem__(self, key):
+        if key == _TYPE_KEY and key in self._layout.index:
+            return self._type
+        return self._values[self._layout.index[key]]
+
+
+class TypedNode(Node):
+    """
+    Bloque con un slot por campo conocido (FIELDS). Los campos ausentes no
+    ocupan valor; los no previstos se guardan en _extra.
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS: Tuple[str, ...] = ()
+
+    def __getitem__(self, key):
+        if key not in self._layout.index:
+            raise KeyError(key)
+
+        if key == _TYPE_KEY:
+            return self._type
+        if key in self._field_set:
+            return getattr(self, key)
+        return self._extra[key]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+
+
+class SCP(TypedNode):
+    TYPE = "SCP"
+    FIELDS = (
+        "key", "id", "clientPrc", "traderAdjPrc", "trigTime", "trigType",
+        "trigId", "calcTime", "crl", "tom", "skew", "tmu", "smu", "flowLmtCond"
+    )
+    __slots__ = FIELDS
+
+
+class CRL(TypedNode):
+    TYPE = "CRL"
+    FIELDS = ("id", "ccyPair", "valDt", "origin", "rType", "rungs", "XCalc")
+    __slots__ = FIELDS
+
+
+class TOM(TypedNode):
+    TYPE = "TOM"
+    FIELDS = (
+        "ccyPair", "trader", "riskCentre", "aMktModeQC", "aMktMode",
+        "mMktMode", "mktMode", "rungs", "time"
+    )
+    __slots__ = FIELDS
+
+
+class Rung(TypedNode):
+    """
+    Rung de CRL (bidPrice/askPrice) o de TOM (bid/ask/minSpread).
+    """
+    TYPE = "Rung"
+    FIELDS = (
+        "amt", "bidPrice", "bidCond", "askPrice", "askCond",
+        "bidSpread", "askSpread", "minSpread"
+    )
+    __slots__ = FIELDS
+
+
+class XCalc(TypedNode):
+    """
+    crl.XCalc (mapa sin __type__ en la traza).
+    """
+    TYPE = None
+    FIELDS = (
+        "comp1FwdAdj", "comp2FwdAdj", "rawTriBid", "triCompBid", "finalTriBid",
+        "rawTriAsk", "triCompAsk", "finalTriAsk", "trigTime", "trigType",
+        "trigId", "compFactor", "rungVol", "comp1FwdPtStatus", "comp1FwdPt",
+        "comp2FwdPtStatus", "comp2FwdPt", "roundDp", "comp1Calc", "comp2Calc"
+    )
+    __slots__ = FIELDS
+
+
+class TMU(TypedNode):
+    TYPE = "STMU"
+    FIELDS = ("package", "traderSchemeName", "riskCentre", "rungs", "rungmodifiers")
+    __slots__ = FIELDS
+
+
+TYPED_NODES = {cls.TYPE: cls for cls in (SCP, CRL, TOM, Rung, TMU)}
+
+# Mapas sin __type__ que se tipan por su posición: (tipo del padre, clave)
+CONTEXT_NODES = {("CRL", "XCalc"): XCalc}
+
+
+def _to_plain(value):
+    if isinstance(value, Node):
+        return value.to_dict()
+    if type(value) is list:
+        return [_to_plain(v) for v in value]
+    return value
+
+
+# =========================
+# BUILDER
+# =========================
+
+class ModelBuilder:
+    """
+    Convierte SCPs parseados (dicts) al modelo.
+
+    Comparte entre todos los SCPs que construye los layouts y los valores
+    inmutables repetidos (Decimal, enteros, strings). Para Decimal la clave
+    es su texto, de modo que 1.0 y 1.00 siguen siendo valores distintos.
+    Las tablas de valores se vacían al superar MAX_INTERNED entradas.
+    """
+
+    MAX_INTERNED = 200_000
+
+    def __init__(self):
+        self._layouts = {}
+        self._values = {}
+
+    def build(self, data) -> Node:
+        """
+        SCP parseado (dict) → modelo. Los subárboles que ya son nodos se
+        conservan y el dict de entrada no se modifica; lo que no es un dict
+        (un nodo, o el texto de una traza que no es un bloque) se devuelve
+        tal cual.
+        """
+        if type(data) is not dict:
+            return data
+        return self._node(data, None)
+
+    def block(self, data: Dict[str, Any]) -> Node:
+        """
+        Hook del parser: bloque Class [...] recién cerrado, con sus bloques
+        hijos ya convertidos.
+        """
+        return self._node(data, None)
+
+    def parse(self, trace: str, engine: str = None) -> Node:
+        """
+        Parsea una traza directamente al modelo (ver parse_scp).
+        """
+        return parse_scp(trace, engine, builder=self)
+
+    # =========================
+    # CONVERSION
+    # =========================
+
+    def _layout(self, keys: Tuple[str, ...]) -> _Layout:
+        layout = self._layouts.get(keys)
+        if layout is None:
+            layout = self._layouts[keys] = _Layout(keys)
+        return layout
+
+    def _node(self, data: Dict[str, Any], parent_type) -> Node:
+        layout = self._layout(tuple(data))
+
+        if _TYPE_KEY in data:
+            block_type = data[_TYPE_KEY]
+            cls = TYPED_NODES.get(block_type) if type(block_type) is str else None
+        else:
+            block_type = cls = None
+
+        if cls is None:
+            node = Block.__new__(Block)
+            node._type = block_type
+            node._layout = layout
+            node._values = tuple(
+                None if key == _TYPE_KEY else self._value(value, block_type, key)
+                for key, value in data.items()
+            )
+            return node
+
+        return self._typed(cls, data, block_type, layout)
+
+    def _typed(self, cls, data: Dict[str, Any], block_type, layout: _Layout) -> TypedNode:
+        node = cls.__new__(cls)
+        node._type = block_type
+        node._layout = layout
+        node._extra = None
+
+        fields = cls._field_set
+
+        for key, value in data.items():
+            if key == _TYPE_KEY:
+                continue
+
+            value = self._value(value, block_type, key)
+
+            if key in fields:
+                setattr(node, key, value)
+            else:
+                if node._extra is None:
+                    node._extra = {}
+                node._extra[key] = value
+
+        return node
+
+    def _value(self, value, parent_type, key):
+        kind = type(value)
+
+        if kind is dict:
+            if _TYPE_KEY not in value:
+                cls = CONTEXT_NODES.get((parent_type, key))
+                if cls is not None:
+                    return self._typed(cls, value, None, self._layout(tuple(value)))
+            return self._node(value, parent_type)
+
+        if kind is list:
+            return [self._value(v, parent_type, key) for v in value]
+
+        if kind is str or kind is int or kind is Decimal:
+            return self._intern(kind, value)
+
+        return value
+
+    def _intern(self, kind, value):
+        token = (kind, str(value)) if kind is Decimal else (kind, value)
+
+        shared = self._values.get(token)
+        if shared is None:
+            if len(self._values) >= self.MAX_INTERNED:
+                self._values.clear()
+            shared = self._values[token] = value
+        return shared
+
+
+# =========================
+# CONVENIENCE
+# =========================
+
+_DEFAULT_BUILDER = ModelBuilder()
+
+
+def from_dict(data: Dict[str, Any], builder: ModelBuilder = None) -> Node:
+    """
+    SCP parseado (dict) → modelo.
+    """
+    return (builder or _DEFAULT_BUILDER).build(data)
+
+
+def to_dict(node: Node) -> Dict[str, Any]:
+    """
+    Modelo → SCP parseado (dict), idéntico al original.
+    """
+    return node.to_dict()
+
+
+def parse_scp_model(trace: str, engine: str = None, builder: ModelBuilder = None) -> Node:
+    """
+    Traza SCP → modelo (ver ModelBuilder.parse).
+    """
+    return (builder or _DEFAULT_BUILDER).parse(trace, engine)
@@ -0,0 +1,453 @@
+import ast
+import importlib.util
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import sha256
+from typing import Dict, Any, Callable, List
+
+from services.SCPMetricsService import count
+from services.SCPParserService import parse_scp, DEFAULT_PARSER_ENGINE
+from services.SPOTConstructionService import SPOTConstructionService
+
+
+# Tipos de entrada: resultado de parse_scp y de SPOTConstructionService.build
+KIND_PARSE = "parse"
+KIND_SPOT = "spot"
+
+
+# =========================
+# VERSIONES
+# =========================
+#
+# La versión de cada tipo de entrada es un hash del código que la produce:
+# el módulo y, recursivamente, los módulos de services que importa (también
+# los imports dentro de funciones). Cualquier cambio en ese código invalida
+# las entradas cacheadas sin tener que subir una versión a mano.
+
+def _service_imports(tree: ast.AST) -> List[str]:
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            if node.module == "services":
+                names.extend(f"services.{alias.name}" for alias in node.names)
+            elif node.module.startswith("services."):
+                names.append(node.module)
+        elif isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names if alias.name.startswith("services."))
+    return names
+
+
+def source_version(*modules: str) -> str:
+    """
+    Hash del código de los módulos y de los módulos de services de los que
+    dependen.
+    """
+    sources = {}
+    pending = list(modules)
+
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+            raise ValueError(f"No se encuentra el código del módulo: {name}")
+
+        with open(spec.origin, "rb") as f:
+            sources[name] = f.read()
+        pending.extend(_service_imports(ast.parse(sources[name])))
+
+    digest = sha256()
+    for name in sorted(sources):
+        digest.update(name.encode("utf-8") + b"\0" + sources[name] + b"\0")
+    return digest.hexdigest()[:16]
+
+
+# El spot construction depende también del parser (SPOTConstructionService
+# importa SCPParserService)
+_VERSIONS = {
+    KIND_PARSE: source_version("services.SCPParserService"),
+    KIND_SPOT: source_version("services.SPOTConstructionService"),
+}
+
+
+class SCPParseCacheService:
+    """
+    Caché de dos niveles de los resultados de parseo y de spot construction,
+    indexada por el SHA-256 de la traza:
+
+    - memoria: LRU del proceso limitada por bytes (memory_budget)
+    - disco (solo parseo, ver DISK_KINDS): SQLite en resources/scp/cache,
+      limitado por disk_budget; al superarlo se descartan las entradas
+      usadas hace más tiempo
+
+    La clave incluye el motor de parseo y la versión del código que
+    produce cada resultado (source_version): al cambiar ese código las
+    entradas anteriores dejan de coincidir y se borran del disco al abrirlo.
+
+    Las entradas se guardan serializadas (pickle), así que cada acierto
+    devuelve una copia nueva: modificar el resultado no altera la caché.
+
+    Dentro de batch() las escrituras en disco se acumulan en memoria y se
+    vuelcan al salir en una única transacción corta: el lock de escritura
+    de SQLite no se mantiene mientras se parsea.
+    """
+
+    SCHEMA_VERSION = 1
+    DB_NAME = "parse_cache.sqlite"
+
+    DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+    DEFAULT_DISK_BUDGET = 512 * 1024 * 1024
+
+    COMPRESSION_LEVEL = 1
+
+    # Tipos que se guardan también en disco. build() cuesta menos que leer
+    # y deserializar una entrada del disco, así que el spot construction
+    # solo se cachea en memoria.
+    DISK_KINDS = (KIND_PARSE,)
+
+    # Instancias compartidas por base_path (shared())
+    _shared: Dict[str, "SCPParseCacheService"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+            self,
+            base_path: str,
+            memory_budget: int = DEFAULT_MEMORY_BUDGET,
+            disk_budget: int = DEFAULT_DISK_BUDGET,
+            disk: bool = True
+    ):
+        if memory_budget < 0 or disk_budget < 0:
+            raise ValueError("El presupuesto de la caché no puede ser negativo")
+
+        self.base_path = base_path
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.disk = disk
+
+        self.cache_path = os.path.join(base_path, "resources", "scp", "cache")
+        self.db_path = os.path.join(self.cache_path, self.DB_NAME)
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+
+        self._conn = None
+        self._batch_depth = 0
+        # Escrituras pendientes dentro de batch(): key → (kind, datos
+        # comprimidos) y key → último uso de los aciertos en disco
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        # La instancia compartida se usa también desde hilos de la UI
+        self._lock = threading.RLock()
+
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    @classmethod
+    def shared(cls, base_path: str) -> "SCPParseCacheService":
+        """
+        Caché común del proceso para base_path: así los aciertos en memoria
+        se mantienen entre distintas instancias de los servicios.
+        """
+        key = os.path.abspath(base_path)
+        with cls._shared_lock:
+            cache = cls._shared.get(key)
+            if cache is None:
+                cache = cls._shared[key] = cls(base_path)
+            return cache
+
+    # =========================
+    # CONNECTION / SCHEMA
+    # =========================
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.cache_path, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._ensure_schema()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _ensure_schema(self):
+        # Los workers del pool abren la caché a la vez: la comprobación y la
+        # creación del esquema van en una transacción con el lock de escritura
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+            if version != self.SCHEMA_VERSION:
+                # Es solo una caché: con otro esquema se recrea vacía
+                self._conn.execute("DROP TABLE IF EXISTS entries")
+                self._conn.execute(
+                    """
+                    CREATE TABLE entries (
+                        key      TEXT PRIMARY KEY,
+                        kind     TEXT NOT NULL,
+                        version  TEXT NOT NULL,
+                        size     INTEGER NOT NULL,
+                        used     REAL NOT NULL,
+                        data     BLOB NOT NULL
+                    )
+                    """
+                )
+                self._conn.execute("CREATE INDEX idx_entries_used ON entries (used)")
+                self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+            # Invalidación: fuera las entradas de versiones de parser/construcción
+            # que ya no son las actuales
+            self._conn.execute(
+                """
+                DELETE FROM entries
+                WHERE (kind = ? AND version != ?) OR (kind = ? AND version != ?)
+                """,
+                (KIND_PARSE, self.version(KIND_PARSE), KIND_SPOT, self.version(KIND_SPOT))
+            )
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa las escrituras en disco (importaciones masivas): se vuelcan
+        al salir en una única transacción.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        """
+        Escribe en disco las entradas y usos acumulados en batch().
+        """
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+
+            pending, self._pending = self._pending, OrderedDict()
+            touched, self._touched = self._touched, {}
+
+            conn = self.conn
+            try:
+                conn.executemany(
+                    "UPDATE entries SET used = ? WHERE key = ?",
+                    [(used, key) for key, used in touched.items()]
+                )
+                for key, (kind, packed) in pending.items():
+                    self._insert(kind, key, packed)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                # Las cuentas de tamaño ya no coinciden con el disco
+                self._disk_bytes = None
+                raise
+
+    # =========================
+    # KEYS
+    # =========================
+
+    @staticmethod
+    def version(kind: str) -> str:
+        """
+        Versión del código que produce las entradas de un tipo.
+        """
+        if kind not in _VERSIONS:
+            raise ValueError(f"Tipo de entrada de caché desconocido: {kind}")
+        return _VERSIONS[kind]
+
+    @classmethod
+    def key_for(cls, kind: str, trace: str, engine: str = None) -> str:
+        digest = sha256(trace.encode("utf-8")).hexdigest()
+        return f"{kind}:{engine or DEFAULT_PARSER_ENGINE}:{cls.version(kind)}:{digest}"
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def parse(self, trace: str, engine: str = None) -> Dict[str, Any]:
+        """
+        parse_scp(trace, engine) desde la caché si ya se parseó.
+        """
+        return self.get_or_compute(
+            KIND_PARSE, trace, engine, lambda: parse_scp(trace, engine)
+        )
+
+    def construction(self, trace: str, parsed_scp: Dict[str, Any], engine: str = None) -> Dict[str, Any]:
+        """
+        SPOTConstructionService.build() del SCP parsed_scp (el parseo de
+        trace) desde la caché si ya se construyó.
+        """
+        return self.get_or_compute(
+            KIND_SPOT,
+            trace,
+            engine,
+            lambda: SPOTConstructionService(parsed_scp, self.base_path).build()
+        )
+
+    def get_or_compute(self, kind: str, trace: str, engine: str, compute: Callable[[], Any]):
+        key = self.key_for(kind, trace, engine)
+
+        data = self._get(kind, key)
+        if data is not None:
+            return pickle.loads(data)
+
+        value = compute()
+        self._put(kind, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return value
+
+    def clear(self, disk: bool = True):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if disk and self.disk:
+                self._pending.clear()
+                self._touched.clear()
+                self.conn.execute("DELETE FROM entries")
+                self._disk_bytes = 0
+                self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {
+                "memoryEntries": len(self._memory),
+                "memoryBytes": self._memory_bytes,
+                "memoryHits": self.hits["memory"],
+                "diskHits": self.hits["disk"],
+                "misses": self.misses
+            }
+            if self.disk:
+                entries, size = self.conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+                result["diskEntries"] = entries
+                result["diskBytes"] = size
+            return result
+
+    # =========================
+    # LEVELS
+    # =========================
+
+    def _get(self, kind: str, key: str):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                count(f"cache.{kind}.memory_hit")
+                return data
+
+            if self.disk and kind in self.DISK_KINDS:
+                row = self.conn.execute(
+                    "SELECT data FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None and key in self._pending:
+                    # Escrita en este batch y ya fuera de la LRU
+                    row = (self._pending[key][1],)
+                if row is not None:
+                    if self._batch_depth:
+                        self._touched[key] = time.time()
+                    else:
+                        self.conn.execute(
+                            "UPDATE entries SET used = ? WHERE key = ?", (time.time(), key)
+                        )
+                        self.conn.commit()
+
+                    data = zlib.decompress(row[0])
+                    self._remember(key, data)
+                    self.hits["disk"] += 1
+                    count(f"cache.{kind}.disk_hit")
+                    return data
+
+            self.misses += 1
+            count(f"cache.{kind}.miss")
+            return None
+
+    def _put(self, kind: str, key: str, data: bytes):
+        with self._lock:
+            self._remember(key, data)
+
+            if not self.disk or kind not in self.DISK_KINDS:
+                return
+
+            packed = zlib.compress(data, self.COMPRESSION_LEVEL)
+
+            if self._batch_depth:
+                self._pending[key] = (kind, packed)
+                return
+
+            self._insert(kind, key, packed)
+            self.conn.commit()
+
+    def _insert(self, kind: str, key: str, packed: bytes):
+        cur = self.conn.execute(
+            """
+            INSERT OR IGNORE INTO entries (key, kind, version, size, used, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (key, kind, self.version(kind), len(packed), time.time(), packed)
+        )
+
+        if cur.rowcount:
+            if self._disk_bytes is None:
+                self._disk_bytes = self.conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()[0]
+            else:
+                self._disk_bytes += len(packed)
+
+            if self._disk_bytes > self.disk_budget:
+                self._trim_disk()
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_budget:
+            return
+
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _trim_disk(self):
+        """
+        Borra las entradas usadas hace más tiempo hasta quedar en el 90%
+        del presupuesto (así no se recorta en cada escritura).
+        """
+        target = self.disk_budget * 9 // 10
+        removed = []
+
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY used"):
+            if self._disk_bytes <= target:
+                break
+            removed.append((key,))
+            self._disk_bytes -= size
+
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", removed)
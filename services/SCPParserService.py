@@ -1,6 +1,9 @@
 import re
+from collections.abc import Mapping
 from decimal import Decimal, getcontext
 
+from services.SCPMetricsService import timed
+
 # Precisión suficiente para FX / spreads
 getcontext().prec = 18
 
@@ -66,6 +69,19 @@ def parse_atom(val: str):
         return val
 
 
+def atom_code(value):
+    """
+    Código original de un átomo T/F que parse_atom convirtió en booleano
+    (p. ej. mktMode=F → False → "F"). Cualquier otro valor se devuelve tal
+    cual.
+    """
+    if value is True:
+        return "T"
+    if value is False:
+        return "F"
+    return value
+
+
 # ================= HELPERS =================
 
 def split_top_level(s: str, sep=","):
@@ -171,4 +187,669 @@ def parse_block(s: str):
             k, v = part.split("=", 1)
             result[k.strip()] = parse_value(v.strip())
 
-    return result
\ No newline at end of file
+    return result
+
+# ================= SINGLE-PASS ENGINE =================
+#
+# Motor alternativo a parse_block: recorre la traza una sola vez trabajando
+# con offsets sobre la cadena original (sin copiar substrings por nivel) y
+# construye exactamente la misma salida dict/list/__type__.
+#
+# Normalización de decimales: el motor legacy aplica normalize_numbers al
+# texto de cada valor antes de partirlo, por lo que dentro de cualquier valor
+# anidado "1,5" es un decimal y no un separador. Aquí se replica tratando como
+# parte del átomo toda coma entre dígitos a partir del primer nivel de
+# anidamiento. En el cuerpo del bloque raíz la coma siempre separa, igual que
+# en parse_block.
+#
+# Una cadena de varias comas entre dígitos ("[1,2,3,4]") no se puede replicar
+# así: el legacy la normaliza una vez por nivel de anidamiento y el reparto
+# entre decimales y separadores depende de la profundidad. En ese caso se
+# reparsea la traza entera con parse_block.
+#
+# Cualquier otra forma que el motor no reconozca (texto tras un contenedor,
+# corchetes dentro de un átomo...) se delega en el motor legacy para ese
+# valor; si los corchetes están desbalanceados se reparsea la traza entera con
+# parse_block. ENGINE_EQUIVALENCE_CASES recoge los casos límite en los que
+# ambos motores deben coincidir (engine_mismatches).
+
+_WS_RE = re.compile(r'\s*')
+_BLOCK_HEAD_RE = re.compile(r'(\w+)\s*\[')
+_KEY_STOP_RE = re.compile(r'[=,\[\]{}]')
+_VALUE_STOP_RE = re.compile(r'[,\[\]{}]')
+_AMOUNT_SIDE_RE = re.compile(r'^\d+(\.\d+)?:\s*[A-Z]$')
+
+_CLOSER_FOR = {"[": "]", "{": "}"}
+
+# Tipos de item dentro de un contenedor [...]
+_ITEM_EMPTY = 0
+_ITEM_VALUE = 1
+_ITEM_BLOCK = 2
+_ITEM_KV = 3
+_ITEM_RAW = 4
+
+
+class _LegacyFallback(Exception):
+    """Traza con forma no soportada por el motor single-pass."""
+
+
+def _is_decimal_comma(s: str, j: int) -> bool:
+    return (
+        0 < j < len(s) - 1
+        and s[j - 1].isdecimal()
+        and s[j + 1].isdecimal()
+    )
+
+
+def _atom_from_text(val: str):
+    """
+    Equivalente a parse_atom para un texto ya limpio y normalizado.
+    """
+    if val == "T":
+        return True
+    if val == "F":
+        return False
+
+    low = val.lower()
+    if low == "true":
+        return True
+    if low == "false":
+        return False
+
+    if val == "null":
+        return None
+
+    if _AMOUNT_SIDE_RE.match(val):
+        amt, side = val.split(":")
+        return {
+            "amount": Decimal(amt.strip()),
+            "side": side.strip()
+        }
+
+    try:
+        if "." in val or "e" in low:
+            return Decimal(val)
+        return int(val)
+    except Exception:
+        return val
+
+
+def _scan_value_end(s: str, i: int, nested: bool) -> int:
+    """
+    Devuelve el offset del separador (o cierre) que termina el valor que
+    empieza en i, respetando [], {} igual que split_top_level.
+    """
+    depth = 0
+    n = len(s)
+
+    while True:
+        m = _VALUE_STOP_RE.search(s, i)
+        if not m:
+            return n
+
+        j = m.start()
+        c = s[j]
+
+        if c in "[{":
+            depth += 1
+        elif c in "]}":
+            if depth == 0:
+                return j
+            depth -= 1
+        elif depth == 0 and not (nested and _is_decimal_comma(s, j)):
+            return j
+
+        i = j + 1
+
+
+def _legacy_value(s: str, start: int, nested: bool):
+    end = _scan_value_end(s, start, nested)
+    return parse_value(s[start:end]), end
+
+
+def _is_value_end(s: str, i: int) -> bool:
+    return i >= len(s) or s[i] in ",]}"
+
+
+def _parse_value_at(s: str, i: int, nested: bool, block=None):
+    """
+    Parsea el valor que empieza en i.
+    Devuelve (valor, offset del separador/cierre que lo termina).
+    block (opcional) convierte cada bloque Class [...] al cerrarse.
+    """
+    i = _WS_RE.match(s, i).end()
+    if i >= len(s):
+        return "", i
+
+    c = s[i]
+
+    is_block = False
+
+    if c == "{":
+        val, j = _parse_fields_at(s, i + 1, {}, "}", True, block)
+    elif c == "[":
+        val, j = _parse_list_at(s, i + 1, block)
+    else:
+        m = _BLOCK_HEAD_RE.match(s, i)
+        if m:
+            val, j = _parse_fields_at(
+                s, m.end(), {"__type__": m.group(1)}, "]", True, block
+            )
+            is_block = True
+        else:
+            return _parse_atom_at(s, i, nested)
+
+    j = _WS_RE.match(s, j).end()
+    if not _is_value_end(s, j):
+        # Texto tras el contenedor: forma rara, decide el motor legacy
+        return _legacy_value(s, i, nested)
+
+    if is_block and block is not None:
+        val = block(val)
+
+    return val, j
+
+
+def _parse_atom_at(s: str, i: int, nested: bool):
+    j = i
+    decimal_commas = 0
+
+    while True:
+        m = _VALUE_STOP_RE.search(s, j)
+        if not m:
+            end = len(s)
+            break
+
+        k = m.start()
+        c = s[k]
+
+        if c == ",":
+            if nested and _is_decimal_comma(s, k):
+                decimal_commas += 1
+                if decimal_commas > 1:
+                    # Cadena dígito,dígito,dígito: depende de la profundidad
+                    raise _LegacyFallback()
+                j = k + 1
+                continue
+            end = k
+            break
+
+        if c in "]}":
+            end = k
+            break
+
+        # Corchete dentro de un átomo
+        return _legacy_value(s, i, nested)
+
+    val = s[i:end].strip()
+    if nested and "," in val:
+        val = val.replace(",", ".")
+
+    return _atom_from_text(val), end
+
+
+def _parse_fields_at(s: str, i: int, result: dict, closer: str, nested: bool, block=None):
+    """
+    Parsea pares key=value hasta el cierre de un bloque Class[...] o de un
+    mapa {...}. Las partes sin '=' se ignoran, como en parse_block/parse_map.
+    Devuelve (result, offset tras el cierre).
+    """
+    n = len(s)
+
+    while True:
+        i = _WS_RE.match(s, i).end()
+        if i >= n:
+            raise _LegacyFallback()
+
+        c = s[i]
+
+        if c in "]}":
+            if c != closer:
+                raise _LegacyFallback()
+            return result, i + 1
+
+        if c == ",":
+            i += 1
+            continue
+
+        m = _KEY_STOP_RE.search(s, i)
+        if not m:
+            raise _LegacyFallback()
+
+        j = m.start()
+        c = s[j]
+
+        if c == "=":
+            key = s[i:j].strip()
+            result[key], i = _parse_value_at(s, j + 1, nested, block)
+            if i < n and s[i] == ",":
+                i += 1
+            continue
+
+        if c in ",]}":
+            # Parte sin '=' (p.ej. 'SPOT' en FwdPt): se descarta
+            i = j
+            continue
+
+        # Parte que empieza por contenedor: se resuelve como en legacy
+        end = _scan_value_end(s, i, nested)
+        part = s[i:end].strip()
+        if nested:
+            part = normalize_numbers(part)
+        if "=" in part:
+            k, v = part.split("=", 1)
+            result[k.strip()] = parse_value(v.strip())
+        i = end
+
+
+def _parse_list_at(s: str, i: int, block=None):
+    """
+    Parsea el contenido de [...] y decide, igual que parse_value, si es una
+    lista de bloques, un mapa key=value o una lista simple.
+    Devuelve (valor, offset tras el cierre).
+    """
+    n = len(s)
+    items = []
+
+    while True:
+        i = _WS_RE.match(s, i).end()
+        if i >= n:
+            raise _LegacyFallback()
+
+        c = s[i]
+
+        if c in "]}":
+            if c != "]":
+                raise _LegacyFallback()
+            i += 1
+            break
+
+        if c == ",":
+            items.append((_ITEM_EMPTY, None, None, i, i))
+            i += 1
+            continue
+
+        start = i
+
+        if _BLOCK_HEAD_RE.match(s, i):
+            val, i = _parse_value_at(s, i, True, block)
+            items.append((_ITEM_BLOCK, None, val, start, i))
+        else:
+            m = _KEY_STOP_RE.search(s, i)
+            stop = s[m.start()] if m else ","
+
+            if stop == "=":
+                key = s[i:m.start()].strip()
+                val, i = _parse_value_at(s, m.end(), True, block)
+                items.append((_ITEM_KV, key, val, start, i))
+            elif stop in "[{":
+                i = _scan_value_end(s, i, True)
+                raw = normalize_numbers(s[start:i].strip())
+                items.append((_ITEM_RAW, None, raw, start, i))
+            else:
+                val, i = _parse_value_at(s, i, True, block)
+                items.append((_ITEM_VALUE, None, val, start, i))
+
+        if i < n and s[i] == ",":
+            i += 1
+
+    has_block = any(kind == _ITEM_BLOCK for kind, *_ in items)
+
+    has_kv_only = not has_block and all(
+        kind == _ITEM_KV or (kind == _ITEM_RAW and "=" in val)
+        for kind, _, val, _, _ in items
+    )
+
+    if has_kv_only:
+        obj = {}
+        for kind, key, val, _, _ in items:
+            if kind == _ITEM_KV:
+                obj[key] = val
+            else:
+                k, v = val.split("=", 1)
+                obj[k.strip()] = parse_value(v.strip())
+        return obj, i
+
+    result = []
+    for kind, _, val, start, end in items:
+        if kind in (_ITEM_VALUE, _ITEM_BLOCK):
+            result.append(val)
+        elif kind == _ITEM_EMPTY:
+            result.append("")
+        else:
+            # key=value o contenedor dentro de una lista → como legacy
+            result.append(parse_value(s[start:end]))
+
+    return result, i
+
+
+def parse_block_single_pass(s: str, block=None):
+    """
+    Parsea ClassName[ ... ] → dict con __type__ en una sola pasada.
+    Misma salida que parse_block.
+
+    block (opcional) recibe cada dict de bloque Class [...] en cuanto se
+    cierra (con sus bloques hijos ya convertidos) y devuelve lo que lo
+    sustituye en el árbol. Si se reparsea con parse_block el resultado son
+    dicts sin convertir.
+    """
+    s = s.strip()
+
+    m = _BLOCK_HEAD_RE.match(s)
+    if not m or not s.endswith("]"):
+        return parse_block(s)
+
+    try:
+        result, end = _parse_fields_at(
+            s, m.end(), {"__type__": m.group(1)}, "]", False, block
+        )
+    except _LegacyFallback:
+        return parse_block(s)
+
+    if end != len(s):
+        return parse_block(s)
+
+    return block(result) if block is not None else result
+
+
+# ================= LAZY PARSING =================
+#
+# parse_scp_lazy no construye el árbol: recorre los campos del bloque raíz
+# guardando el tramo (offsets) del valor de cada uno y solo lo parsea al
+# accederlo. Los valores que son a su vez bloques Class [...] se devuelven
+# igual de perezosos, de modo que leer key.ccyPair, tom.time o crl.origin
+# no parsea clientPrc, skew, smu ni el XCalc del CRL.
+#
+# El recorrido replica _parse_fields_at saltando los valores, y cada valor
+# se parsea con el motor single-pass, así que el resultado (to_dict()) es
+# el mismo que el de parse_scp. Ante cualquier forma rara (corchetes
+# desbalanceados o cruzados, un tramo que no coincide) se parsea la traza
+# entera con parse_block, que da la misma salida, y se sirve desde ahí.
+
+_NESTING_RE = re.compile(r'[\[\]{}]')
+# Como _VALUE_STOP_RE sin las comas decimales (dígito,dígito) de los valores
+# anidados
+_NESTED_VALUE_STOP_RE = re.compile(r'[\[\]{}]|,(?!\d)|(?<!\d),')
+
+
+def _skip_value(s: str, i: int, nested: bool, closes: dict) -> int:
+    """
+    Mismo resultado que _scan_value_end, pero salta cada contenedor de una
+    vez y exige que sus corchetes cierren con su pareja. closes guarda, por
+    offset de apertura, el offset tras su cierre: cada corchete de la traza
+    se recorre una sola vez aunque luego se escaneen los bloques anidados.
+    """
+    stop_re = _NESTED_VALUE_STOP_RE if nested else _VALUE_STOP_RE
+
+    while True:
+        m = stop_re.search(s, i)
+        if not m:
+            return len(s)
+
+        j = m.start()
+        if s[j] not in "[{":
+            return j
+
+        i = closes.get(j) or _skip_container(s, j, closes)
+
+
+def _skip_container(s: str, i: int, closes: dict) -> int:
+    """
+    Offset tras el cierre del contenedor que abre en i.
+    """
+    stack = []
+
+    for m in _NESTING_RE.finditer(s, i):
+        c = m.group()
+        if c in "[{":
+            stack.append((m.start(), _CLOSER_FOR[c]))
+            continue
+
+        start, closer = stack.pop()
+        if closer != c:
+            raise _LegacyFallback()
+        closes[start] = m.end()
+        if not stack:
+            return m.end()
+
+    raise _LegacyFallback()
+
+
+def _scan_fields_at(s: str, i: int, spans: dict, closer: str, nested: bool, closes: dict):
+    """
+    Mismo recorrido que _parse_fields_at sin parsear los valores: guarda
+    por clave (inicio, fin) del valor, o el texto para las partes que
+    resuelve el motor legacy. Devuelve (spans, offset tras el cierre).
+    """
+    n = len(s)
+
+    while True:
+        i = _WS_RE.match(s, i).end()
+        if i >= n:
+            raise _LegacyFallback()
+
+        c = s[i]
+
+        if c in "]}":
+            if c != closer:
+                raise _LegacyFallback()
+            return spans, i + 1
+
+        if c == ",":
+            i += 1
+            continue
+
+        m = _KEY_STOP_RE.search(s, i)
+        if not m:
+            raise _LegacyFallback()
+
+        j = m.start()
+        c = s[j]
+
+        if c == "=":
+            end = _skip_value(s, j + 1, nested, closes)
+            spans[s[i:j].strip()] = (j + 1, end)
+            i = end
+            if i < n and s[i] == ",":
+                i += 1
+            continue
+
+        if c in ",]}":
+            i = j
+            continue
+
+        end = _skip_value(s, i, nested, closes)
+        part = s[i:end].strip()
+        if nested:
+            part = normalize_numbers(part)
+        if "=" in part:
+            k, v = part.split("=", 1)
+            spans[k.strip()] = v.strip()
+        i = end
+
+
+class _LazyTrace:
+    """Texto de la traza y, si hizo falta, su parseo legacy completo."""
+
+    __slots__ = ("s", "closes", "legacy")
+
+    def __init__(self, s: str, closes: dict):
+        self.s = s
+        self.closes = closes
+        self.legacy = None
+
+    def fallback(self):
+        if self.legacy is None:
+            self.legacy = parse_block(self.s)
+
+
+class LazyBlock(Mapping):
+    """
+    Bloque Class [...] parseado bajo demanda (Mapping de solo lectura).
+    to_dict() devuelve el dict completo, igual al de parse_scp.
+    """
+
+    __slots__ = ("_trace", "_path", "_nested", "_spans", "_values")
+
+    def __init__(self, trace: _LazyTrace, path: tuple, nested: bool, spans: dict, block_type: str):
+        self._trace = trace
+        self._path = path
+        self._nested = nested
+        self._spans = spans
+        # Un campo "__type__" en el cuerpo pisa el tipo, como en el dict
+        self._values = {} if spans["__type__"] is not None else {"__type__": block_type}
+
+    def __getitem__(self, key):
+        if self._trace.legacy is not None:
+            return self._legacy()[key]
+
+        values = self._values
+        if key in values:
+            return values[key]
+
+        span = self._spans[key]
+        try:
+            value = self._parse(key, span)
+        except _LegacyFallback:
+            self._trace.fallback()
+            return self._legacy()[key]
+
+        values[key] = value
+        return value
+
+    def __iter__(self):
+        if self._trace.legacy is not None:
+            return iter(self._legacy())
+        return iter(self._spans)
+
+    def __len__(self):
+        if self._trace.legacy is not None:
+            return len(self._legacy())
+        return len(self._spans)
+
+    def __contains__(self, key):
+        if self._trace.legacy is not None:
+            return key in self._legacy()
+        return key in self._spans
+
+    def __repr__(self):
+        return f"LazyBlock({self.get('__type__')})"
+
+    def to_dict(self) -> dict:
+        return {
+            key: value.to_dict() if isinstance(value, LazyBlock) else value
+            for key, value in self.items()
+        }
+
+    def _legacy(self):
+        value = self._trace.legacy
+        for key in self._path:
+            value = value[key]
+        return value
+
+    def _parse(self, key, span):
+        if type(span) is str:
+            return parse_value(span)
+
+        start, end = span
+        trace = self._trace
+        s = trace.s
+
+        i = _WS_RE.match(s, start).end()
+        m = _BLOCK_HEAD_RE.match(s, i)
+        if m:
+            spans, block_end = _scan_fields_at(
+                s, m.end(), {"__type__": None}, "]", True, trace.closes
+            )
+            if _WS_RE.match(s, block_end).end() == end:
+                return LazyBlock(trace, self._path + (key,), True, spans, m.group(1))
+
+        value, value_end = _parse_value_at(s, start, self._nested)
+        if value_end != end:
+            raise _LegacyFallback()
+        return value
+
+
+def parse_scp_lazy(s: str):
+    """
+    Traza SCP → LazyBlock: solo se localizan los campos; cada valor se
+    parsea al accederlo. Si la traza no tiene la forma esperada devuelve
+    directamente el dict de parse_block.
+    """
+    s = s.strip()
+
+    m = _BLOCK_HEAD_RE.match(s)
+    if not m or not s.endswith("]"):
+        return parse_block(s)
+
+    closes = {}
+    try:
+        spans, end = _scan_fields_at(s, m.end(), {"__type__": None}, "]", False, closes)
+    except _LegacyFallback:
+        return parse_block(s)
+
+    if end != len(s):
+        return parse_block(s)
+
+    return LazyBlock(_LazyTrace(s, closes), (), False, spans, m.group(1))
+
+
+# ================= ENGINE SELECTION =================
+
+PARSER_ENGINES = {
+    "legacy": parse_block,
+    "single_pass": parse_block_single_pass,
+}
+
+DEFAULT_PARSER_ENGINE = "single_pass"
+
+# Casos límite en los que los motores deben coincidir
+ENGINE_EQUIVALENCE_CASES = (
+    "A [x=[1,2,3,4]]",
+    "A [x=B [y=[1,2,3]]]",
+    "A [x=[1,2], y=3,5, z=[a=1,5, b=[7,8]]]",
+    "A [x={a=1,2,3, b=4}]",
+    "A [x=[B [v=1,25], C [v=2,5,0]]]",
+    "A [x=T, y=F, z=null, w=17660840,23:Q]",
+    "A [x=[], y=[a b], z=B [w=1] tail]",
+)
+
+
+def engine_mismatches(traces=ENGINE_EQUIVALENCE_CASES) -> list:
+    """
+    Trazas (de los casos límite por defecto) en las que algún motor no da
+    la misma salida que parse_block: [(traza, [motores])].
+    """
+    mismatches = []
+    for trace in traces:
+        expected = parse_block(trace.strip())
+        engines = [
+            engine for engine, parser in PARSER_ENGINES.items()
+            if parser(trace) != expected
+        ]
+        if engines:
+            mismatches.append((trace, engines))
+    return mismatches
+
+
+@timed("parse")
+def parse_scp(s: str, engine: str = None, builder=None):
+    """
+    Punto de entrada común para parsear una traza SCP con el motor indicado
+    (por defecto DEFAULT_PARSER_ENGINE).
+
+    Con builder (SCPModel.ModelBuilder) devuelve el SCP como modelo
+    compacto. El motor single-pass convierte cada bloque al cerrarlo; con
+    legacy (o si se reparsea con él) se convierte el dict al final.
+    """
+    engine = engine or DEFAULT_PARSER_ENGINE
+
+    if engine not in PARSER_ENGINES:
+        raise ValueError(f"Motor de parseo desconocido: {engine}")
+
+    if builder is None:
+        return PARSER_ENGINES[engine](s)
+
+    if engine == "single_pass":
+        return builder.build(parse_block_single_pass(s, builder.block))
+    return builder.build(PARSER_ENGINES[engine](s))
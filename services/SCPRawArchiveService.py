@@ -0,0 +1,533 @@
+import os
+import re
+import json
+import zlib
+import sqlite3
+import hashlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, List, Iterable, Optional
+
+
+# =========================
+# DICCIONARIO
+# =========================
+#
+# zlib admite un diccionario predefinido (zdict) de hasta 32 KB: las
+# trazas comprimen mucho mejor si empiezan "conociendo" los nombres de
+# campo y valores habituales. El diccionario 0 es el esqueleto de una
+# traza SCP; train() añade diccionarios entrenados sobre trazas reales.
+# Cada bloque guarda el id del diccionario con el que se comprimió, así
+# que los diccionarios nunca se modifican ni se borran.
+
+DICTIONARY_SIZE = 32 * 1024
+
+DEFAULT_DICTIONARY = (
+    "SCP [key=SCPKey [ccyPair=, pkg=null, pxProfCxt=null, venue=, group=null, "
+    "venueClientId=, venueAccountId=, venueUserId=, notional=, type=CLIENT_LEVEL, "
+    "tmType=APPLY_MARKUP, smType=SPOT, flType=CHECK, crChk=true, prcModel=RFS, "
+    "manualPx=false, priceCompetition=N, cpSubChk=true], id=, "
+    "clientPrc=[SCPDetails [baseAmt=, notionalAmt=, notionalCcy=, bidSpot=, "
+    "bidCond=T, bidTraderSpot=, bidMktSpot=, askSpot=, askCond=T, askTraderSpot=, "
+    "askMktSpot=, SCalc=CrlRung[uBidSpot=, uAskSpot=, uBidTrSpot=, uAskTrSpot=, "
+    "bAutoSkew=0, aAutoSkew=0, uBidTrSptXd=0.0, uAskTrSptXd=0.0, uBidSpotXd=0.0, "
+    "uAskSpotXd=0.0]]], traderAdjPrc=[SCPDetails [baseAmt=, trigTime=, trigType=, "
+    "trigId=, calcTime=, crl=CRL [id=, ccyPair=, valDt=, origin=, rType=LIVE, "
+    "rungs=[Rung [amt=, bidPrice=, bidCond=T, askPrice=, askCond=T]], "
+    "XCalc=[comp1FwdAdj=[fwdAdjCond=T, fwdAdjDone=false, fwdBidPt=0.0, "
+    "fwdAskPt=0.0, traderFwdAdjBid=, traderFwdAdjAsk=], comp2FwdAdj=[rawTriBid=, "
+    "triCompBid=, finalTriBid=, rawTriAsk=, triCompAsk=, finalTriAsk=, "
+    "compFactor=1, rungVol=FxCurrencyPairSourceRung [volume=], "
+    "comp1FwdPtStatus=OK, comp1FwdPt=FwdPt [rType=LIVE, SPOT, spotDt=, fixDt=, "
+    "dt=, b=0, a=0, cond=T], comp2FwdPtStatus=OK, comp2FwdPt=FwdPt [roundDp=, "
+    "comp1Calc=[ccyPair=, valDt=, vol=, bidCond=T, askCond=T, traderAdjBid=, "
+    "traderAdjAsk=, comp2Calc=[bSkew=0, aSkew=0, "
+    "rungmodifier=rungmodifier [rung=1, type=ADDITIVE, value=, min=0, max=0]], "
+    "tom=TOM [ccyPair=, trader=SYSTEM, riskCentre=, aMktModeQC=T, aMktMode=N, "
+    "mMktMode=N, mktMode=N, rungs=[Rung [amt=, bidSpread=0.0, askSpread=0.0, "
+    "minSpread=, bidCond=T, askCond=T]], time=], skew=AutoSkew [symbol=, pkg=, "
+    "rc=, bPos=0, bPosSignum=0, maxSkew%=0, belowMinPosSkew=false, riskCcy=null, "
+    "maxSkewBandAmt={N=0, A=0, B=0, F=0}, start%B=0, start%C=0, start%D=0, "
+    "start%E=0, tsA=0, tsB=0, tsC=0, tsD=0, tsE=0, asA=0, asB=0, asC=0, asD=0, "
+    "asE=0, enabled=false, desc=Empty Skew Package], tmu=STMU [package=, "
+    "traderSchemeName=, riskCentre=, rungs=[], rungmodifiers={N=[], A=[], B=[], "
+    "F=[]}], smu=SSMU [markups=[scheme=DEFAULT, schType=SPT, type=ABSOLUTE, "
+    "bidAdj=0, offerAdj=0]], flowLmtCond=T]"
+).encode("utf-8")
+
+_BRACKET_RE = re.compile(r'[\[\]]')
+
+# Fragmentos "campo=valor," que cuenta el entrenamiento
+_FRAGMENT_RE = re.compile(r'[^,\[\]{}]+[,\[\]{}]*')
+
+
+def train_dictionary(samples: Iterable[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Diccionario zlib a partir de trazas de ejemplo: los fragmentos que más
+    bytes ahorran (apariciones × longitud) detrás del esqueleto por
+    defecto. zlib prefiere las coincidencias cercanas al final, así que los
+    mejores fragmentos van los últimos.
+    """
+    counts = Counter()
+    for text in samples:
+        counts.update(set(_FRAGMENT_RE.findall(text)))
+
+    scored = sorted(
+        ((count * len(fragment), fragment) for fragment, count in counts.items() if count > 1),
+        reverse=True
+    )
+
+    chosen = []
+    total = len(DEFAULT_DICTIONARY)
+    for _, fragment in scored:
+        encoded = fragment.encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+
+    return DEFAULT_DICTIONARY + b"".join(reversed(chosen))
+
+
+# =========================
+# SERVICE
+# =========================
+
+class SCPRawArchiveService:
+    """
+    Archivo de trazas raw comprimidas y deduplicadas por contenido (SQLite,
+    un único fichero para backup).
+
+    - Cada traza se identifica por el SHA-256 de su texto: la misma traza
+      importada con varios ids se guarda una vez.
+    - Los bloques que se repiten entre SCPs (SHARED_BLOCKS: TOM, AutoSkew,
+      STMU, SSMU) se separan y se guardan una sola vez, también por hash;
+      la traza guarda el resto del texto y las referencias (receta).
+    - Bloques y recetas se comprimen con zlib y un diccionario compartido.
+
+    pack() es solo CPU (se puede ejecutar en los procesos de importación) y
+    store() escribe el resultado; put() hace ambas cosas.
+    """
+
+    SCHEMA_VERSION = 1
+    DB_NAME = "raw_archive.sqlite"
+
+    SHARED_BLOCKS = ("TOM", "AutoSkew", "STMU", "SSMU")
+    # Bloques más cortos se dejan en la receta
+    MIN_BLOCK_CHARS = 64
+
+    COMPRESSION_LEVEL = 9
+
+    # Trazas que usa migrate_raw_files() para entrenar el diccionario
+    TRAIN_SAMPLES = 500
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.history_path = os.path.join(
+            base_path,
+            "resources",
+            "scp",
+            "history"
+        )
+        self.raw_path = os.path.join(self.history_path, "raw")
+        self.db_path = os.path.join(self.history_path, self.DB_NAME)
+
+        self._conn = None
+        self._batch_depth = 0
+        self._dictionaries: Dict[int, bytes] = {}
+        self._current = None
+
+        self._block_re = re.compile(
+            r'\b(?:' + "|".join(map(re.escape, self.SHARED_BLOCKS)) + r') \['
+        )
+
+    # =========================
+    # CONNECTION / SCHEMA
+    # =========================
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.history_path, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._ensure_schema()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _ensure_schema(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == self.SCHEMA_VERSION:
+            return
+        if version > self.SCHEMA_VERSION:
+            raise ValueError(f"Archivo raw de una versión posterior: {self.db_path}")
+
+        # El archivo nunca se recrea: el esquema solo se crea si falta
+        # (varios procesos pueden abrirlo a la vez durante una importación)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS dictionaries (
+                dict_id  INTEGER PRIMARY KEY,
+                data     BLOB NOT NULL
+            );
+
+            -- Tablas con rowid: los blobs se añaden en orden de inserción
+            -- (con el hash como clave de la tabla, las páginas quedan a medias)
+            CREATE TABLE IF NOT EXISTS blocks (
+                hash     BLOB NOT NULL UNIQUE,
+                dict_id  INTEGER NOT NULL,
+                size     INTEGER NOT NULL,
+                data     BLOB NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS traces (
+                hash     BLOB NOT NULL UNIQUE,
+                dict_id  INTEGER NOT NULL,
+                size     INTEGER NOT NULL,
+                recipe   BLOB NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS scps (
+                scp_id      TEXT PRIMARY KEY,
+                trace_hash  BLOB NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_scps_trace ON scps (trace_hash);
+            """
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO dictionaries (dict_id, data) VALUES (0, ?)",
+            (DEFAULT_DICTIONARY,)
+        )
+        self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa varias escrituras en una única transacción
+        (importaciones masivas).
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.commit()
+
+    def _commit(self):
+        if self._batch_depth == 0:
+            self.conn.commit()
+
+    # =========================
+    # DICTIONARIES
+    # =========================
+
+    def _dictionary(self, dict_id: int) -> bytes:
+        data = self._dictionaries.get(dict_id)
+        if data is None:
+            row = self.conn.execute(
+                "SELECT data FROM dictionaries WHERE dict_id = ?", (dict_id,)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Diccionario {dict_id} no encontrado en el archivo raw")
+            data = self._dictionaries[dict_id] = row[0]
+        return data
+
+    def _current_dictionary(self) -> tuple:
+        if self._current is None:
+            dict_id, data = self.conn.execute(
+                "SELECT dict_id, data FROM dictionaries ORDER BY dict_id DESC LIMIT 1"
+            ).fetchone()
+            self._dictionaries[dict_id] = data
+            self._current = (dict_id, data)
+        return self._current
+
+    def train(self, samples: Iterable[str], size: int = DICTIONARY_SIZE) -> int:
+        """
+        Entrena un diccionario con las trazas de ejemplo y lo deja como
+        actual para las nuevas escrituras. Devuelve su id.
+        """
+        data = train_dictionary(samples, size)
+        cursor = self.conn.execute("INSERT INTO dictionaries (data) VALUES (?)", (data,))
+        self._commit()
+
+        self._current = (cursor.lastrowid, data)
+        self._dictionaries[cursor.lastrowid] = data
+        return cursor.lastrowid
+
+    def _compress(self, text: str, zdict: bytes) -> bytes:
+        compressor = zlib.compressobj(self.COMPRESSION_LEVEL, zdict=zdict)
+        return compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+    def _decompress(self, data: bytes, dict_id: int) -> str:
+        decompressor = zlib.decompressobj(zdict=self._dictionary(dict_id))
+        return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+
+    # =========================
+    # WRITE
+    # =========================
+
+    def split(self, trace: str) -> List[str]:
+        """
+        Texto de la traza alternando literal / bloque compartido
+        (posiciones impares). "".join(split(t)) == t.
+        """
+        parts = []
+        pos = 0
+
+        for m in self._block_re.finditer(trace):
+            if m.start() < pos:
+                # Bloque anidado dentro de uno ya separado
+                continue
+
+            end = self._block_end(trace, m.end() - 1)
+            if end < 0:
+                break
+            if end - m.start() < self.MIN_BLOCK_CHARS:
+                continue
+
+            parts.append(trace[pos:m.start()])
+            parts.append(trace[m.start():end])
+            pos = end
+
+        parts.append(trace[pos:])
+        return parts
+
+    @staticmethod
+    def _block_end(text: str, open_pos: int) -> int:
+        depth = 0
+        for m in _BRACKET_RE.finditer(text, open_pos):
+            depth += 1 if m.group() == "[" else -1
+            if depth == 0:
+                return m.end()
+        return -1
+
+    def pack(self, trace: str) -> Dict[str, Any]:
+        """
+        Comprime una traza sin escribir nada: hash, receta y bloques.
+        """
+        dict_id, zdict = self._current_dictionary()
+
+        recipe = []
+        blocks = {}
+        for i, part in enumerate(self.split(trace)):
+            if i % 2:
+                encoded = part.encode("utf-8")
+                digest = hashlib.sha256(encoded).digest()
+                if digest not in blocks:
+                    blocks[digest] = (len(encoded), self._compress(part, zdict))
+                recipe.append(digest.hex())
+            else:
+                recipe.append(part)
+
+        encoded = trace.encode("utf-8")
+        return {
+            "hash": hashlib.sha256(encoded).digest(),
+            "size": len(encoded),
+            "dictId": dict_id,
+            "recipe": self._compress(json.dumps(recipe, ensure_ascii=False), zdict),
+            "blocks": [(digest, size, data) for digest, (size, data) in blocks.items()]
+        }
+
+    def store(self, scp_id: str, packed: Dict[str, Any]) -> bytes:
+        """
+        Guarda una traza empaquetada con pack(). Como con los ficheros raw,
+        si el SCP ya tiene traza se conserva la primera.
+        Devuelve el hash de la traza.
+        """
+        conn = self.conn
+        trace_hash = packed["hash"]
+
+        exists = conn.execute(
+            "SELECT 1 FROM traces WHERE hash = ?", (trace_hash,)
+        ).fetchone()
+
+        if not exists:
+            dict_id = packed["dictId"]
+            conn.executemany(
+                "INSERT OR IGNORE INTO blocks (hash, dict_id, size, data) VALUES (?, ?, ?, ?)",
+                [(digest, dict_id, size, data) for digest, size, data in packed["blocks"]]
+            )
+            conn.execute(
+                "INSERT INTO traces (hash, dict_id, size, recipe) VALUES (?, ?, ?, ?)",
+                (trace_hash, dict_id, packed["size"], packed["recipe"])
+            )
+
+        conn.execute(
+            "INSERT OR IGNORE INTO scps (scp_id, trace_hash) VALUES (?, ?)",
+            (scp_id, trace_hash)
+        )
+        self._commit()
+        return trace_hash
+
+    def put(self, scp_id: str, trace: str) -> bytes:
+        return self.store(scp_id, self.pack(trace))
+
+    # =========================
+    # READ
+    # =========================
+
+    def contains(self, scp_id: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM scps WHERE scp_id = ?", (scp_id,)
+        ).fetchone() is not None
+
+    def get(self, scp_id: str) -> Optional[str]:
+        """
+        Traza raw original del SCP (None si no está archivada).
+        """
+        row = self.conn.execute(
+            """
+            SELECT t.hash, t.dict_id, t.recipe
+            FROM scps s JOIN traces t ON t.hash = s.trace_hash
+            WHERE s.scp_id = ?
+            """,
+            (scp_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        trace_hash, dict_id, recipe = row
+        parts = json.loads(self._decompress(recipe, dict_id))
+
+        for i in range(1, len(parts), 2):
+            block = self.conn.execute(
+                "SELECT dict_id, data FROM blocks WHERE hash = ?", (bytes.fromhex(parts[i]),)
+            ).fetchone()
+            if block is None:
+                raise ValueError(f"Bloque {parts[i]} no encontrado en el archivo raw")
+            parts[i] = self._decompress(block[1], block[0])
+
+        trace = "".join(parts)
+        if hashlib.sha256(trace.encode("utf-8")).digest() != trace_hash:
+            raise ValueError(f"Traza raw corrupta en el archivo: {scp_id}")
+        return trace
+
+    def load(self, scp_id: str) -> Optional[str]:
+        """
+        Traza raw del SCP con cualquiera de los dos almacenamientos: el
+        archivo o, si no está archivada, history/raw/<id>.txt.
+        """
+        if os.path.exists(self.db_path):
+            trace = self.get(scp_id)
+            if trace is not None:
+                return trace
+
+        name = f"{scp_id}.txt"
+        if not os.path.exists(os.path.join(self.raw_path, name)):
+            return None
+        return self._read_raw(name)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Tamaño lógico (trazas de todos los SCPs) frente a lo almacenado.
+        """
+        conn = self.conn
+        scps, raw_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(t.size), 0) FROM scps s JOIN traces t ON t.hash = s.trace_hash"
+        ).fetchone()
+        traces, recipe_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(recipe)), 0) FROM traces"
+        ).fetchone()
+        blocks, block_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blocks"
+        ).fetchone()
+
+        return {
+            "scps": scps,
+            "traces": traces,
+            "blocks": blocks,
+            "rawBytes": raw_bytes,
+            "storedBytes": recipe_bytes + block_bytes
+        }
+
+    # =========================
+    # MAINTENANCE
+    # =========================
+
+    def remove(self, scp_id: str) -> bool:
+        """
+        Quita la referencia del SCP y su traza si ningún otro SCP la usa;
+        los bloques compartidos se liberan con gc().
+        """
+        conn = self.conn
+        row = conn.execute(
+            "SELECT trace_hash FROM scps WHERE scp_id = ?", (scp_id,)
+        ).fetchone()
+        if row is None:
+            return False
+
+        conn.execute("DELETE FROM scps WHERE scp_id = ?", (scp_id,))
+        conn.execute(
+            """
+            DELETE FROM traces
+            WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM scps WHERE trace_hash = ?)
+            """,
+            (row[0], row[0])
+        )
+        self._commit()
+        return True
+
+    def gc(self) -> Dict[str, int]:
+        """
+        Borra trazas sin SCP y bloques que ya no usa ninguna receta
+        (recorre todas las recetas: es una operación de mantenimiento).
+        """
+        conn = self.conn
+        traces = conn.execute(
+            "DELETE FROM traces WHERE hash NOT IN (SELECT trace_hash FROM scps)"
+        ).rowcount
+
+        used = set()
+        for dict_id, recipe in conn.execute("SELECT dict_id, recipe FROM traces"):
+            used.update(json.loads(self._decompress(recipe, dict_id))[1::2])
+
+        unused = [
+            (digest,) for (digest,) in conn.execute("SELECT hash FROM blocks")
+            if digest.hex() not in used
+        ]
+        conn.executemany("DELETE FROM blocks WHERE hash = ?", unused)
+        self._commit()
+
+        return {"traces": traces, "blocks": len(unused)}
+
+    def migrate_raw_files(self, train: bool = True, remove: bool = False) -> int:
+        """
+        Archiva los ficheros history/raw/<id>.txt existentes. Con train,
+        si aún no hay diccionario entrenado se entrena con una muestra de
+        ellos; con remove, cada fichero se borra tras comprobar que se
+        recupera idéntico del archivo. Devuelve los ficheros archivados.
+        """
+        if not os.path.isdir(self.raw_path):
+            return 0
+
+        names = sorted(name for name in os.listdir(self.raw_path) if name.endswith(".txt"))
+
+        if train and self._current_dictionary()[0] == 0 and names:
+            step = max(1, len(names) // self.TRAIN_SAMPLES)
+            self.train(self._read_raw(name) for name in names[::step])
+
+        migrated = 0
+        with self.batch():
+            for name in names:
+                scp_id = name[:-len(".txt")]
+                content = self._read_raw(name)
+
+                self.put(scp_id, content)
+                migrated += 1
+
+                if remove and self.get(scp_id) == content:
+                    os.remove(os.path.join(self.raw_path, name))
+
+        return migrated
+
+    def _read_raw(self, name: str) -> str:
+        with open(os.path.join(self.raw_path, name), "r", encoding="utf-8") as f:
+            return f.read()
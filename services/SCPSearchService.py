@@ -0,0 +1,160 @@
+from typing import Dict, Any, List
+
+from services.SCPCatalogService import SCPCatalogService
+
+
+class SCPSearchService:
+    """
+    Búsqueda sobre el histórico de SCPs.
+
+    Trabaja solo contra el catálogo persistente (SCPCatalogService): cada
+    filtro se resuelve con un índice secundario y los resultados se
+    devuelven paginados, ordenados por time del TOM descendente, con el
+    mismo formato de fila que SCPIndexService.list_scps.
+
+    Filtros soportados (todos opcionales, se combinan con AND):
+    - ccy_pair, venue, crl_origin, mkt_mode: igualdad
+    - venue_client_id, venue_account_id, venue_user_id: igualdad
+    - client_id: coincide con cualquiera de los tres ids de cliente
+    - notional_min / notional_max: rango sobre el notional
+    - time_from / time_to: rango ISO sobre el time del TOM
+
+    El total de una búsqueda filtrada se cuenta como máximo hasta
+    COUNT_LIMIT (totalCapped=True si hay más) para que el coste de la
+    consulta no dependa del tamaño del histórico.
+    """
+
+    COUNT_LIMIT = 1000
+
+    _EQUALITY_FILTERS = {
+        "ccy_pair": "ccy_pair",
+        "venue": "venue",
+        "crl_origin": "crl_origin",
+        "mkt_mode": "mkt_mode",
+        "venue_client_id": "venue_client_id",
+        "venue_account_id": "venue_account_id",
+        "venue_user_id": "venue_user_id",
+    }
+
+    _UPPERCASE_FILTERS = ("ccy_pair", "crl_origin", "mkt_mode")
+
+    def __init__(self, base_path: str):
+        self.catalog = SCPCatalogService(base_path)
+
+    def close(self):
+        self.catalog.close()
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def search(self, page: int = 0, page_size: int = 5, **filters) -> Dict[str, Any]:
+        """
+        Devuelve:
+        {
+            "items": [filas de la página],
+            "total": int,
+            "totalCapped": bool,
+            "page": int,
+            "pageSize": int
+        }
+        """
+        total, capped = self.count(**filters)
+
+        page = max(0, page)
+        items = self.window(page * page_size, page_size, **filters)
+
+        return {
+            "items": items,
+            "total": total,
+            "totalCapped": capped,
+            "page": page,
+            "pageSize": page_size
+        }
+
+    def count(self, limit: int = None, **filters):
+        """
+        (total, capped): número de SCPs que cumplen los filtros, contando
+        como máximo hasta limit (COUNT_LIMIT por defecto) si hay filtros.
+        Sin filtros el total es exacto.
+        """
+        where, params = self._build_where(filters)
+
+        if not params:
+            return self.catalog.count(), False
+
+        limit = limit or self.COUNT_LIMIT
+        total = self.catalog.conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM scps WHERE {where} LIMIT ?)",
+            params + [limit + 1]
+        ).fetchone()[0]
+
+        return min(total, limit), total > limit
+
+    def window(self, offset: int, limit: int, **filters) -> List[Dict[str, Any]]:
+        """
+        Filas [offset, offset + limit) del resultado, en el orden del
+        listado (time del TOM descendente).
+        """
+        where, params = self._build_where(filters)
+
+        rows = self.catalog.conn.execute(
+            f"""
+            SELECT {SCPCatalogService.LIST_COLUMNS}
+            FROM scps
+            WHERE {where}
+            ORDER BY tom_time DESC, scp_id DESC
+            LIMIT ? OFFSET ?
+            """,
+            params + [limit, max(0, offset)]
+        )
+
+        return [SCPCatalogService.row_to_entry(row) for row in rows]
+
+    # =========================
+    # HELPERS
+    # =========================
+
+    def _build_where(self, filters: Dict[str, Any]):
+        clauses: List[str] = ["1 = 1"]
+        params: List[Any] = []
+
+        for name, value in filters.items():
+            if value is None or value == "":
+                continue
+
+            if name in self._EQUALITY_FILTERS:
+                value = str(value).strip()
+                if name in self._UPPERCASE_FILTERS:
+                    value = value.upper()
+                clauses.append(f"{self._EQUALITY_FILTERS[name]} = ?")
+                params.append(value)
+
+            elif name == "client_id":
+                value = str(value).strip()
+                clauses.append(
+                    "(venue_client_id = ? OR venue_account_id = ? OR venue_user_id = ?)"
+                )
+                params.extend([value, value, value])
+
+            elif name == "notional_min":
+                clauses.append("notional_num >= ?")
+                params.append(float(value))
+
+            elif name == "notional_max":
+                clauses.append("notional_num <= ?")
+                params.append(float(value))
+
+            elif name == "time_from":
+                clauses.append("tom_time >= ?")
+                params.append(str(value).strip())
+
+            elif name == "time_to":
+                # Inclusivo por prefijo: '2025-08-05' incluye todo ese día
+                clauses.append("tom_time <= ?")
+                params.append(str(value).strip() + "\uffff")
+
+            else:
+                raise ValueError(f"Filtro de búsqueda desconocido: {name}")
+
+        return " AND ".join(clauses), params
\ No newline at end of file
@@ -0,0 +1,119 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+
+# =========================
+# PERFIL DEL ARRANQUE DE LA APP
+# =========================
+#
+# main.py --startup-profile: tiempo de cada import que carga módulos nuevos
+# (acumulado y propio, sin los imports anidados) y marcas de las fases del
+# arranque (ventana creada, primer pintado, listado de SCPs...).
+#
+# Desactivado por defecto: mark() solo comprueba un flag y __import__ no se
+# toca hasta install(), que debe llamarse antes de importar la UI.
+
+DEFAULT_REPORT_LIMIT = 25
+
+# Referencia de los tiempos: import de este módulo (lo primero de main.py)
+_T0 = time.perf_counter()
+
+_enabled = False
+_original_import = builtins.__import__
+
+# (profundidad, módulo, segundos propios, segundos acumulados)
+_imports: List[Tuple[int, str, float, float]] = []
+# (fase, segundos desde _T0)
+_marks: List[Tuple[str, float]] = []
+
+# Pila por hilo con el tiempo de los imports hijos de cada import en curso
+_local = threading.local()
+
+
+def install():
+    global _enabled
+    _enabled = True
+    builtins.__import__ = _profiled_import
+
+
+def uninstall():
+    global _enabled
+    _enabled = False
+    builtins.__import__ = _original_import
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def mark(phase: str):
+    """
+    Marca el fin de una fase del arranque (y la escribe en stderr).
+    """
+    if not _enabled:
+        return
+    elapsed = time.perf_counter() - _T0
+    _marks.append((phase, elapsed))
+    sys.stderr.write(f"[startup] {elapsed * 1000:9.1f} ms  {phase}\n")
+
+
+# =========================
+# IMPORTS
+# =========================
+
+def _resolve(name: str, globals_, level: int) -> str:
+    if not level:
+        return name
+    try:
+        package = (globals_ or {}).get("__package__") or ""
+        return importlib.util.resolve_name("." * level + name, package)
+    except (ImportError, ValueError):
+        return name
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+
+    loaded = len(sys.modules)
+    stack.append(0.0)
+    t0 = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - t0
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        if len(sys.modules) > loaded:
+            _imports.append((len(stack), _resolve(name, globals, level), elapsed - children, elapsed))
+
+
+# =========================
+# REPORT
+# =========================
+
+def report(limit: int = DEFAULT_REPORT_LIMIT) -> str:
+    """
+    Fases del arranque y los imports más lentos: los de primer nivel por
+    tiempo acumulado y todos por tiempo propio.
+    """
+    lines = ["Fases del arranque (ms desde el inicio):"]
+    for phase, elapsed in _marks:
+        lines.append(f"  {elapsed * 1000:9.1f}  {phase}")
+
+    top_level = sorted((i for i in _imports if i[0] == 0), key=lambda i: -i[3])
+    lines.append(f"Imports de primer nivel (acumulado ms) · total {sum(i[3] for i in top_level) * 1000:.1f}:")
+    for _, name, _, cumulative in top_level[:limit]:
+        lines.append(f"  {cumulative * 1000:9.1f}  {name}")
+
+    lines.append(f"Imports por tiempo propio (ms), los {limit} más lentos:")
+    for _, name, own, cumulative in sorted(_imports, key=lambda i: -i[2])[:limit]:
+        lines.append(f"  {own * 1000:9.1f}  {name}  (acumulado {cumulative * 1000:.1f})")
+
+    return "\n".join(lines) + "\n"
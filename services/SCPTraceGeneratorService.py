@@ -0,0 +1,401 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from typing import Dict, Any, Iterator, List, Tuple
+
+
+# Valor en USD de una unidad de cada divisa (niveles de mercado realistas)
+USD_RATES = {
+    "USD": Decimal("1"),
+    "EUR": Decimal("1.1554"),
+    "GBP": Decimal("1.3412"),
+    "AUD": Decimal("0.6523"),
+    "NZD": Decimal("0.5931"),
+    "CHF": Decimal("1.2450"),
+    "CAD": Decimal("0.7285"),
+    "JPY": Decimal("0.006781"),
+    "MXN": Decimal("0.05351"),
+    "BGN": Decimal("0.5907"),
+    "PLN": Decimal("0.2712"),
+    "SEK": Decimal("0.1052"),
+    "NOK": Decimal("0.09913"),
+    "ZAR": Decimal("0.05621"),
+    "TRY": Decimal("0.02453"),
+}
+
+# Divisas que cotizan como base frente al USD (EURUSD) y como términos (USDJPY)
+BASE_CCYS = ("EUR", "GBP", "AUD", "NZD")
+TERMS_CCYS = ("CHF", "CAD", "JPY", "MXN", "BGN", "PLN", "SEK", "NOK", "ZAR", "TRY")
+
+# Prioridad de las divisas como base de un par (EURUSD, GBPJPY, USDMXN...)
+CONVENTION_ORDER = ("EUR", "GBP", "AUD", "NZD", "USD", "CAD", "CHF")
+
+DIRECT_ORIGINS = ("FLEXTRADE", "RMDS", "EBS", "REUTERS")
+VENUES = ("CH-CAPLIN", "CH-360T-SST", "CH-FXALL", "CH-BBG")
+RM_TYPES = ("ADDITIVE", "MULTIPLY")
+MARKET_MODES = ("N", "A", "B", "F")
+
+RUNG_AMOUNTS = (
+    1000000, 2000000, 3000000, 5000000, 10000000, 15000000, 20000000,
+    30000000, 50000000, 75000000, 100000000, 150000000, 200000000
+)
+
+DEFAULT_SEED = 0
+DEFAULT_RUNGS = 5
+DEFAULT_SYNTHETIC_RATIO = 0.5
+DEFAULT_RUNG_MODIFIER_RATIO = 0.5
+DEFAULT_DEPTH = 1
+MAX_DEPTH = 4
+DEFAULT_LEGS = 2
+MAX_LEGS = 5
+
+# Precisión de los cálculos: fija para que la traza no dependa del
+# contexto decimal global
+PRECISION = 18
+
+VALUE_DATE = "2025-08-07"
+FIX_DATE = "2025-08-05"
+
+
+class SCPTraceGeneratorService:
+    """
+    Generador determinista de trazas SCP sintéticas con el formato de los
+    logs reales (ver resources/scp/SCP_raw.txt), para benchmarks y
+    validación a escala.
+
+    - rungs: rungs del CRL principal (y de su TOM)
+    - synthetic_ratio: fracción de SCPs con CRL SYNTHETIC (triangulado,
+      con XCalc) frente a CRL directo
+    - rung_modifier_ratio: fracción de SCPs con tabla de rung modifiers en
+      el TMU para su modo de mercado
+    - depth: niveles de anidamiento de los CRLs sintéticos: con depth > 1
+      las patas de la triangulación pueden ser a su vez sintéticas
+    - legs: patas de cada triangulación (comp1Calc ... compNCalc)
+
+    La traza i depende solo de (seed, i) y de la configuración, así que
+    trace(i) devuelve siempre lo mismo sin generar las anteriores. Los
+    precios son coherentes: cada par cotiza según USD_RATES y los
+    sintéticos son el producto de sus patas.
+    """
+
+    def __init__(
+            self,
+            seed: int = DEFAULT_SEED,
+            rungs: int = DEFAULT_RUNGS,
+            synthetic_ratio: float = DEFAULT_SYNTHETIC_RATIO,
+            rung_modifier_ratio: float = DEFAULT_RUNG_MODIFIER_RATIO,
+            depth: int = DEFAULT_DEPTH,
+            legs: int = DEFAULT_LEGS
+    ):
+        if not 1 <= rungs <= len(RUNG_AMOUNTS):
+            raise ValueError(f"El número de rungs debe estar entre 1 y {len(RUNG_AMOUNTS)}")
+        if not 0 <= synthetic_ratio <= 1 or not 0 <= rung_modifier_ratio <= 1:
+            raise ValueError("Las proporciones deben estar entre 0 y 1")
+        if not 1 <= depth <= MAX_DEPTH:
+            raise ValueError(f"La profundidad debe estar entre 1 y {MAX_DEPTH}")
+        if not 2 <= legs <= MAX_LEGS:
+            raise ValueError(f"El número de patas debe estar entre 2 y {MAX_LEGS}")
+
+        self.seed = seed
+        self.rungs = rungs
+        self.synthetic_ratio = synthetic_ratio
+        self.rung_modifier_ratio = rung_modifier_ratio
+        self.depth = depth
+        self.legs = legs
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "rungs": self.rungs,
+            "syntheticRatio": self.synthetic_ratio,
+            "rungModifierRatio": self.rung_modifier_ratio,
+            "depth": self.depth,
+            "legs": self.legs
+        }
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def traces(self, count: int, start: int = 0) -> Iterator[str]:
+        for index in range(start, start + count):
+            yield self.trace(index)
+
+    def trace(self, index: int) -> str:
+        with localcontext() as ctx:
+            ctx.prec = PRECISION
+            return self._trace(index)
+
+    # =========================
+    # SCP
+    # =========================
+
+    def _trace(self, index: int) -> str:
+        rnd = random.Random(f"{self.seed}:{index}")
+        scp_id = f"G{self.seed}-{index}"
+
+        synthetic = rnd.random() < self.synthetic_ratio
+        if synthetic:
+            base, terms = rnd.choice(BASE_CCYS), rnd.choice(TERMS_CCYS)
+        elif rnd.random() < 0.5:
+            base, terms = rnd.choice(BASE_CCYS), "USD"
+        else:
+            base, terms = "USD", rnd.choice(TERMS_CCYS)
+        pair = base + terms
+
+        amounts = sorted(rnd.sample(RUNG_AMOUNTS, self.rungs))
+        notional = Decimal(rnd.randint(1000000, amounts[-1] * 100)) / 100
+        side = rnd.choice(("Q", "B", "S"))
+        mode = rnd.choice(MARKET_MODES)
+        time = self._timestamp(rnd, index)
+
+        if synthetic:
+            crl = self._synthetic_crl(rnd, base, terms, amounts, self.depth, time, root=True)
+        else:
+            crl = self._direct_crl(rnd, base, terms, amounts)
+
+        # TOM: spreads por rung; algunos rungs sin entrada (sin ajuste)
+        tom_rungs = [amt for amt in amounts if rnd.random() < 0.9]
+        tom = self._tom(rnd, pair, tom_rungs, mode, time, as_list=True)
+
+        rung_modifiers = rnd.random() < self.rung_modifier_ratio
+        tmu = self._tmu(rnd, mode, rung_modifiers)
+
+        first_bid, first_ask = self._quote(rnd, base, terms)
+        details = self._details(notional, notional / 2, terms, first_bid, first_ask)
+
+        return (
+            f"SCP [key=SCPKey [ccyPair={pair}, pkg=null, pxProfCxt=null, "
+            f"venue={rnd.choice(VENUES)}, group=null, venueClientId={rnd.randint(10000, 99999)}, "
+            f"venueAccountId={rnd.randint(10000, 99999)}, venueUserId=U{rnd.randint(100000, 999999)}, "
+            f"notional={notional}:{side}, type=CLIENT_LEVEL, tmType=APPLY_MARKUP, smType=SPOT, "
+            f"flType=CHECK, crChk=true, prcModel={rnd.choice(('RFS', 'ESP'))}, manualPx=false, "
+            f"priceCompetition={rnd.choice(('N', 'Y'))}, cpSubChk=true], id={scp_id}, "
+            f"clientPrc=[{details}], traderAdjPrc=[{details}], "
+            f"trigTime={rnd.randint(10 ** 14, 10 ** 15)}, trigType=HybridCrlSubServiceImpl, "
+            f"trigId={self._crl_id(rnd)}, calcTime={rnd.randint(1000, 99999)}, crl={crl}, "
+            f"tom={tom}, skew={self._skew(pair)}, tmu={tmu}, "
+            f"smu=SSMU [markups=[scheme=DEFAULT, schType=SPT, type=ABSOLUTE, bidAdj=0, offerAdj=0]], "
+            f"flowLmtCond=T]"
+        )
+
+    # =========================
+    # PRICES
+    # =========================
+
+    @staticmethod
+    def _mid(base: str, terms: str) -> Decimal:
+        return USD_RATES[base] / USD_RATES[terms]
+
+    @staticmethod
+    def _decimals(base: str, terms: str) -> int:
+        mid = USD_RATES[base] / USD_RATES[terms]
+        if mid > 50:
+            return 3
+        return 7 if mid < Decimal("0.1") else 5
+
+    def _quote(self, rnd: random.Random, base: str, terms: str) -> Tuple[Decimal, Decimal]:
+        mid = self._mid(base, terms)
+        half_spread = mid * Decimal(rnd.randint(1, 20)) / Decimal(100000)
+        exp = Decimal(1).scaleb(-self._decimals(base, terms))
+        return (
+            (mid - half_spread).quantize(exp, ROUND_HALF_UP),
+            (mid + half_spread).quantize(exp, ROUND_HALF_UP)
+        )
+
+    def _rungs(self, rnd: random.Random, base: str, terms: str, amounts: List[int], as_list: bool) -> str:
+        rungs = []
+        for amt in amounts:
+            bid, ask = self._quote(rnd, base, terms)
+            rungs.append(
+                f"Rung [amt={amt}, bidPrice={bid}, bidCond=T, askPrice={ask}, askCond=T]"
+            )
+        if len(rungs) == 1 and not as_list:
+            # Formato de los CRLs de las patas: un único Rung sin lista
+            return rungs[0]
+        return "[" + ", ".join(rungs) + "]"
+
+    # =========================
+    # CRL
+    # =========================
+
+    @staticmethod
+    def _crl_id(rnd: random.Random) -> str:
+        return f"{rnd.randint(1, 9)}G-{rnd.randint(100000, 9999999)}"
+
+    def _direct_crl(self, rnd: random.Random, base: str, terms: str, amounts: List[int], as_list: bool = True) -> str:
+        return (
+            f"CRL [id={self._crl_id(rnd)}, ccyPair={base}{terms}, valDt={VALUE_DATE}, "
+            f"origin={rnd.choice(DIRECT_ORIGINS)}, rType=LIVE, "
+            f"rungs={self._rungs(rnd, base, terms, amounts, as_list)}]"
+        )
+
+    def _synthetic_crl(
+            self,
+            rnd: random.Random,
+            base: str,
+            terms: str,
+            amounts: List[int],
+            depth: int,
+            time: str,
+            root: bool = False
+    ) -> str:
+        # Cadena base → vía(s) → términos. La raíz con dos patas triangula
+        # por USD; el resto por divisas al azar
+        if root and self.legs == 2:
+            vias = ["USD"]
+        else:
+            vias = rnd.sample([c for c in USD_RATES if c not in (base, terms)], self.legs - 1)
+        hops = [base] + vias + [terms]
+
+        volume = amounts[0]
+        legs = []
+        raw_bid = raw_ask = Decimal(1)
+        for hop_from, hop_to in zip(hops, hops[1:]):
+            # Las patas anidadas cotizan según la convención de mercado
+            # (pueden ir al revés que la cadena); las de la raíz, en orden
+            leg_base, leg_terms = (hop_from, hop_to) if root else self._convention(hop_from, hop_to)
+
+            if depth > 1 and rnd.random() < 0.5:
+                leg_crl = self._synthetic_crl(rnd, leg_base, leg_terms, [volume], depth - 1, time)
+            else:
+                leg_crl = self._direct_crl(rnd, leg_base, leg_terms, [volume], as_list=False)
+            bid, ask = self._quote(rnd, leg_base, leg_terms)
+            legs.append((leg_base + leg_terms, leg_crl, bid, ask))
+
+            if leg_base == hop_from:
+                raw_bid, raw_ask = raw_bid * bid, raw_ask * ask
+            else:
+                raw_bid, raw_ask = raw_bid / ask, raw_ask / bid
+
+        round_dp = 4 if root else self._decimals(base, terms)
+        exp = Decimal(1).scaleb(-round_dp)
+
+        calcs = []
+        for n, (leg_pair, leg_crl, bid, ask) in enumerate(legs, start=1):
+            calcs.append(
+                f"comp{n}Calc=[ccyPair={leg_pair}, valDt={VALUE_DATE}, vol={volume}, bidCond=T, "
+                f"askCond=T, traderAdjBid={bid}, traderAdjAsk={ask}, crl={leg_crl}, "
+                f"tom={self._tom(rnd, leg_pair, [volume], 'N', time, as_list=False)}, "
+                f"skew={self._skew(leg_pair)}, bSkew=0, aSkew=0, "
+                f"rungmodifier={self._rung_modifier(rnd, 1)}]"
+            )
+
+        fwd_adj = []
+        fwd_pt = []
+        for n, (_, _, bid, ask) in enumerate(legs, start=1):
+            fwd_adj.append(
+                f"comp{n}FwdAdj=[fwdAdjCond=T, fwdAdjDone=false, fwdBidPt=0.0, fwdAskPt=0.0, "
+                f"traderFwdAdjBid={bid}, traderFwdAdjAsk={ask}]"
+            )
+            fwd_pt.append(
+                f"comp{n}FwdPtStatus=OK, comp{n}FwdPt=FwdPt [rType=LIVE, SPOT, spotDt={VALUE_DATE}, "
+                f"fixDt={FIX_DATE}, dt={VALUE_DATE}, b=0, a=0, cond=T]"
+            )
+
+        xcalc = (
+            f"XCalc=[{', '.join(fwd_adj)}, rawTriBid={raw_bid}, triCompBid={raw_bid}, "
+            f"finalTriBid={raw_bid.quantize(exp, ROUND_HALF_UP)}, rawTriAsk={raw_ask}, "
+            f"triCompAsk={raw_ask}, finalTriAsk={raw_ask.quantize(exp, ROUND_HALF_UP)}, "
+            f"trigTime={rnd.randint(10 ** 14, 10 ** 15)}, trigType=CoreRateLadderLLBServiceProxy, "
+            f"trigId=RMDS-{rnd.randint(100000, 999999)}, compFactor=1, "
+            f"rungVol=FxCurrencyPairSourceRung [volume={volume}], {', '.join(fwd_pt)}, "
+            f"roundDp={round_dp}, {', '.join(calcs)}]"
+        )
+
+        return (
+            f"CRL [id={self._crl_id(rnd)}, ccyPair={base}{terms}, valDt={VALUE_DATE}, "
+            f"origin=SYNTHETIC, rType=LIVE, "
+            f"rungs={self._rungs(rnd, base, terms, amounts, as_list=root)}, {xcalc}]"
+        )
+
+    @staticmethod
+    def _convention(a: str, b: str) -> Tuple[str, str]:
+        """
+        Orden de cotización de mercado del par a/b: base la divisa con más
+        prioridad (CONVENTION_ORDER); el resto, por orden alfabético.
+        """
+        rank = {ccy: i for i, ccy in enumerate(CONVENTION_ORDER)}
+        key_a = (rank.get(a, len(rank)), a)
+        key_b = (rank.get(b, len(rank)), b)
+        return (a, b) if key_a <= key_b else (b, a)
+
+    # =========================
+    # TOM / TMU / SKEW
+    # =========================
+
+    @staticmethod
+    def _timestamp(rnd: random.Random, index: int) -> str:
+        day = 1 + index % 28
+        seconds = rnd.randint(0, 86399)
+        return (
+            f"2025-08-{day:02d}T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:"
+            f"{seconds % 60:02d}.{rnd.randint(0, 999):03d}Z"
+        )
+
+    @staticmethod
+    def _tom(rnd: random.Random, pair: str, amounts: List[int], mode: str, time: str, as_list: bool) -> str:
+        rungs = []
+        for amt in amounts:
+            bid_spread = Decimal(rnd.randint(-5, 5)) / 100000 if rnd.random() < 0.3 else Decimal("0.0")
+            ask_spread = Decimal(rnd.randint(-5, 5)) / 100000 if rnd.random() < 0.3 else Decimal("0.0")
+            min_spread = rnd.choice(("0", "0.00002", "0.00004", "0.0001", "0.004"))
+            rungs.append(
+                f"Rung [amt={amt}, bidSpread={bid_spread}, askSpread={ask_spread}, "
+                f"minSpread={min_spread}, bidCond=T, askCond=T]"
+            )
+
+        if as_list or len(rungs) != 1:
+            rungs_text = "[" + ", ".join(rungs) + "]"
+        else:
+            rungs_text = rungs[0]
+
+        return (
+            f"TOM [ccyPair={pair}, trader=SYSTEM, riskCentre=SIM, aMktModeQC=T, aMktMode={mode}, "
+            f"mMktMode={mode}, mktMode={mode}, rungs={rungs_text}, time={time}]"
+        )
+
+    @staticmethod
+    def _rung_modifier(rnd: random.Random, rung: int) -> str:
+        rm_type = rnd.choice(RM_TYPES)
+        if rm_type == "ADDITIVE":
+            value = Decimal(rnd.randint(1, 9)) / 100000
+        else:
+            value = Decimal(rnd.randint(40, 150)) / 100
+        rm_min = rnd.choice(("0", "0", "0.00002", "0.00004"))
+        return f"rungmodifier [rung={rung}, type={rm_type}, value={value}, min={rm_min}, max=0]"
+
+    def _tmu(self, rnd: random.Random, mode: str, rung_modifiers: bool) -> str:
+        tables = {m: "[]" for m in MARKET_MODES}
+        package = ""
+
+        if rung_modifiers:
+            package = f"pkg{rnd.randint(1, 50)}_R"
+            tables[mode] = "[" + ", ".join(
+                self._rung_modifier(rnd, position)
+                for position in range(1, self.rungs + 1)
+            ) + "]"
+
+        rms = ", ".join(f"{m}={tables[m]}" for m in MARKET_MODES)
+        return (
+            f"STMU [package={package}, traderSchemeName=RFSQ_Caplin_FX, riskCentre=SIM, "
+            f"rungs=[], rungmodifiers={{{rms}}}]"
+        )
+
+    @staticmethod
+    def _skew(pair: str) -> str:
+        return (
+            f"AutoSkew [symbol={pair}, pkg=, maxSkew%=0, belowMinPosSkew=false, riskCcy=null, "
+            f"maxSkewBandAmt={{N=0, A=0, B=0, F=0}}, start%B=0, start%C=0, start%D=0, start%E=0, "
+            f"tsA=0, tsB=0, tsC=0, tsD=0, tsE=0, asA=0, asB=0, asC=0, asD=0, asE=0, "
+            f"enabled=false, desc=Empty Skew Package]"
+        )
+
+    @staticmethod
+    def _details(notional: Decimal, base_amt: Decimal, ccy: str, bid: Decimal, ask: Decimal) -> str:
+        return (
+            f"SCPDetails [baseAmt={base_amt:.2f}, notionalAmt={notional}, notionalCcy={ccy}, "
+            f"bidSpot={bid}, bidCond=T, bidTraderSpot={bid}, bidMktSpot={bid}, askSpot={ask}, "
+            f"askCond=T, askTraderSpot={ask}, askMktSpot={ask}, SCalc=CrlRung[uBidSpot={bid}, "
+            f"uAskSpot={ask}, uBidTrSpot={bid}, uAskTrSpot={ask}, bAutoSkew=0, aAutoSkew=0, "
+            f"uBidTrSptXd=0.0, uAskTrSptXd=0.0, uBidSpotXd=0.0, uAskSpotXd=0.0]]"
+        )
@@ -1,6 +1,8 @@
 from decimal import Decimal
 from typing import Dict, Any
 
+from services.SCPMetricsService import timed
+
 
 class SpotAuditExplainService:
     """
@@ -18,6 +20,7 @@ class SpotAuditExplainService:
     # PUBLIC
     # =========================================================
 
+    @timed("explain.build")
     def build(self) -> str:
         sections = [
             self._context_section(),
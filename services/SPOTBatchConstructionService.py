@@ -0,0 +1,420 @@
+from decimal import Decimal
+from itertools import repeat
+from typing import Dict, Any, Iterable, List
+
+from services.SPOTConstructionService import SPOTConstructionService
+
+
+class _Irregular(Exception):
+    """SCP que el camino columnar no reproduce exactamente."""
+
+
+_ZERO = Decimal("0")
+
+# Por encima de esta magnitud Decimal podría redondear a exponente positivo
+# (y format(..., "f") dejaría de ser reversible): se usa el camino escalar
+_MAX_ADJUSTED = 14
+_MAX_VALUE = Decimal(10) ** 16
+
+# (rm_info, RMValue, RMMin) de los rungs sin rung modifier
+_NO_RM_ROW = (SPOTConstructionService.NO_RUNG_MODIFIER, None, _ZERO)
+
+
+class SPOTBatchConstructionService:
+    """
+    Spot construction de muchos SCPs a la vez, como tabla columnar (una
+    fila por rung, ver COLUMNS).
+
+    Los rungs de todos los SCPs se aplanan en columnas (listas paralelas) y
+    cada etapa (TOM adjust, mid/spread, rung modifier, min spread) se aplica
+    a la columna completa. A diferencia de SPOTConstructionService, los
+    valores intermedios se mantienen como Decimal y solo se formatean una
+    vez, y los rung modifiers se resuelven una sola vez por SCP
+    (SPOTConstructionService.rung_modifiers_by_amt).
+
+    Los valores son idénticos a los de los rungs de
+    SPOTConstructionService.build(); los SCPs que el camino columnar no
+    reproduce exactamente (NaN, exponentes positivos, magnitudes enormes,
+    rungs malformados) se construyen con el servicio escalar.
+    """
+
+    # Columnas de build_columns() (una fila por rung)
+    COLUMNS = (
+        "scpIndex",
+        "scpId",
+        "amt",
+        "coreBid",
+        "coreAsk",
+        "adjBidSpread",
+        "adjAskSpread",
+        "adjMinSpread",
+        "priceAdjBid",
+        "priceAdjAsk",
+        "mid",
+        "spread",
+        "volatilityScenario",
+        "rungModifier",
+        "RMValue",
+        "RMType",
+        "RMMin",
+        "priceAfterRMBid",
+        "priceAfterRMAsk",
+        "minSpread",
+        "priceAfterMinSpreadBid",
+        "priceAfterMinSpreadAsk"
+    )
+
+    def __init__(self, parsed_scps: Iterable[Dict[str, Any]], base_path: str):
+        self.scps = list(parsed_scps)
+        self.base_path = base_path
+
+        # Valida igual que el servicio escalar
+        self.services = [
+            SPOTConstructionService(scp, base_path) for scp in self.scps
+        ]
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def build_columns(self) -> Dict[str, List[Any]]:
+        """
+        Tabla columnar {columna: [valor por rung]} (ver COLUMNS) con los
+        mismos valores (strings) que los rungs de
+        SPOTConstructionService.build(), en el orden de entrada.
+        """
+        cols = self._compute()
+        scp_ids = [scp.get("id") for scp in self.scps]
+
+        rm_infos = cols["rmInfo"]
+        rm_bid = [
+            rm if rm is not None else adj
+            for rm, adj in zip(cols["fmtRMBid"], cols["fmtAdjBid"])
+        ]
+        rm_ask = [
+            rm if rm is not None else adj
+            for rm, adj in zip(cols["fmtRMAsk"], cols["fmtAdjAsk"])
+        ]
+
+        table = {
+            "scpIndex": list(cols["scp"]),
+            "scpId": [scp_ids[i] for i in cols["scp"]],
+            "amt": list(cols["amt"]),
+            "coreBid": list(cols["coreBid"]),
+            "coreAsk": list(cols["coreAsk"]),
+            "adjBidSpread": list(cols["adjBidSpread"]),
+            "adjAskSpread": list(cols["adjAskSpread"]),
+            "adjMinSpread": list(cols["adjMinSpread"]),
+            "priceAdjBid": cols["fmtAdjBid"],
+            "priceAdjAsk": cols["fmtAdjAsk"],
+            "mid": cols["fmtMid"],
+            "spread": cols["fmtSpread"],
+            "volatilityScenario": list(cols["volatility"]),
+            "rungModifier": [info["rungModifier"] for info in rm_infos],
+            "RMValue": [info["RMValue"] for info in rm_infos],
+            "RMType": [info["RMType"] for info in rm_infos],
+            "RMMin": [info["RMMin"] for info in rm_infos],
+            "priceAfterRMBid": rm_bid,
+            "priceAfterRMAsk": rm_ask,
+            "minSpread": cols["fmtMinSpread"],
+            "priceAfterMinSpreadBid": [
+                forced if forced is not None else price
+                for forced, price in zip(cols["fmtForcedBid"], rm_bid)
+            ],
+            "priceAfterMinSpreadAsk": [
+                forced if forced is not None else price
+                for forced, price in zip(cols["fmtForcedAsk"], rm_ask)
+            ]
+        }
+
+        if cols["irregular"]:
+            table = self._merge_irregular(table, cols["irregular"], scp_ids)
+
+        return table
+
+    def _merge_irregular(self, table: Dict[str, List[Any]], irregular: set, scp_ids: List[Any]) -> Dict[str, List[Any]]:
+        """
+        Sustituye las filas de los SCPs irregulares por las del servicio
+        escalar, manteniendo el orden de entrada.
+        """
+        rows = [
+            row for row in zip(*(table[name] for name in self.COLUMNS))
+            if row[0] not in irregular
+        ]
+
+        for i in irregular:
+            for rung in self.services[i].build_rungs():
+                rows.append(self._rung_to_row(i, scp_ids[i], rung))
+
+        # sort estable: respeta el orden de rungs dentro de cada SCP
+        rows.sort(key=lambda row: row[0])
+
+        columns = list(zip(*rows)) if rows else [()] * len(self.COLUMNS)
+        return {name: list(values) for name, values in zip(self.COLUMNS, columns)}
+
+    @staticmethod
+    def _rung_to_row(i: int, scp_id: Any, rung: Dict[str, Any]) -> tuple:
+        adjustment = rung["adjustment"] or {}
+        return (
+            i,
+            scp_id,
+            rung["amt"],
+            rung["core"]["bid"],
+            rung["core"]["ask"],
+            adjustment.get("bidSpread"),
+            adjustment.get("askSpread"),
+            adjustment.get("minSpread"),
+            rung["priceAdjustment"]["bid"],
+            rung["priceAdjustment"]["ask"],
+            rung["midSpread"]["mid"],
+            rung["midSpread"]["spread"],
+            rung["volatilityScenario"],
+            rung["rungModifier"],
+            rung["RMValue"],
+            rung["RMType"],
+            rung["RMMin"],
+            rung["priceAfterRungModifier"]["bid"],
+            rung["priceAfterRungModifier"]["ask"],
+            rung["minSpread"],
+            rung["priceAfterMinSpread"]["bid"],
+            rung["priceAfterMinSpread"]["ask"]
+        )
+
+    # =========================
+    # PIPELINE
+    # =========================
+
+    def _compute(self) -> Dict[str, Any]:
+        cols = self._gather()
+
+        self._stage_adjustment(cols)
+        self._stage_mid_spread(cols)
+        self._stage_rung_modifier(cols)
+        self._stage_min_spread(cols)
+        self._stage_format(cols)
+
+        return cols
+
+    # Columnas que produce _gather (orden de las filas de _gather_scp)
+    _GATHER_COLUMNS = (
+        "scp", "amt", "coreBid", "coreAsk", "bid", "ask",
+        "adjBidSpread", "adjAskSpread", "adjMinSpread", "bidSpread", "askSpread", "tomMin",
+        "volatility", "rmInfo", "rmValue", "rmMin"
+    )
+
+    def _gather(self) -> Dict[str, Any]:
+        """
+        Aplana los rungs del CRL de todos los SCPs en columnas y resuelve
+        por SCP el TOM, el escenario y los rung modifiers.
+        """
+        self._decimals = {}
+        rows = []
+        irregular = set()
+
+        for i, scp in enumerate(self.scps):
+            try:
+                rows.extend(self._gather_scp(i, scp))
+            except Exception:
+                # Lo resuelve el camino escalar
+                irregular.add(i)
+
+        columns = list(zip(*rows)) if rows else [()] * len(self._GATHER_COLUMNS)
+
+        cols = dict(zip(self._GATHER_COLUMNS, columns))
+        cols["irregular"] = irregular
+        return cols
+
+    def _gather_scp(self, i: int, scp: Dict[str, Any]) -> List[tuple]:
+        crl = scp.get("crl")
+        if not crl:
+            return []
+
+        service = self.services[i]
+        tom = scp.get("tom", {})
+        volatility = SPOTConstructionService.VOLATILITY_SCENARIOS.get(service.market_mode(), "Normal")
+
+        tom_index = {}
+        if tom:
+            for rung in tom.get("rungs", []):
+                try:
+                    tom_index[int(rung["amt"])] = rung
+                except Exception:
+                    continue
+
+        rm_by_amt = self._index_rung_modifiers(service)
+        decimal = self._decimal
+        check = self._check
+        rows = []
+
+        for rung in crl.get("rungs", []):
+            try:
+                amt = int(rung["amt"])
+                bid = Decimal(rung["bidPrice"])
+                ask = Decimal(rung["askPrice"])
+                core_bid = str(bid)
+                core_ask = str(ask)
+            except Exception:
+                continue
+
+            check(core_bid, bid)
+            check(core_ask, ask)
+
+            # Mismos strings que SPOTConstructionService._build_adjustment
+            tom_rung = tom_index.get(amt)
+            if tom_rung:
+                adj_bid = str(tom_rung.get("bidSpread", "0"))
+                adj_ask = str(tom_rung.get("askSpread", "0"))
+                adj_min = str(tom_rung.get("minSpread", "0"))
+                bid_spread = decimal(adj_bid)
+                ask_spread = decimal(adj_ask)
+                tom_min = decimal(adj_min) if adj_min else _ZERO
+            else:
+                adj_bid = adj_ask = adj_min = bid_spread = ask_spread = None
+                tom_min = _ZERO
+
+            rm_info, rm_value, rm_min = rm_by_amt.get(amt, _NO_RM_ROW)
+
+            rows.append((
+                i, amt, core_bid, core_ask, bid, ask,
+                adj_bid, adj_ask, adj_min, bid_spread, ask_spread, tom_min,
+                volatility, rm_info, rm_value, rm_min
+            ))
+
+        return rows
+
+    def _index_rung_modifiers(self, service: SPOTConstructionService) -> Dict[int, tuple]:
+        """
+        {amt: (rm_info, RMValue, RMMin)} de SPOTConstructionService
+        .rung_modifiers_by_amt con los valores ya como Decimal.
+        """
+        by_amt = service.rung_modifiers_by_amt()
+        if by_amt is None:
+            raise _Irregular()
+
+        return {
+            amt: (
+                rm_info,
+                self._decimal(rm_info["RMValue"]) if rm_info["RMType"] is not None else None,
+                self._decimal(rm_info["RMMin"]) if rm_info["RMMin"] else _ZERO
+            )
+            for amt, rm_info in by_amt.items()
+        }
+
+    def _decimal(self, text: str) -> Decimal:
+        # Spreads / RM se repiten mucho entre rungs y SCPs
+        try:
+            return self._decimals[text]
+        except KeyError:
+            value = Decimal(text)
+            self._check(text, value)
+            self._decimals[text] = value
+            return value
+
+    @staticmethod
+    def _check(text: str, value: Decimal):
+        if "E+" in text or "N" in text or "I" in text or value.adjusted() > _MAX_ADJUSTED:
+            raise _Irregular()
+
+    # =========================
+    # STAGES
+    # =========================
+
+    @staticmethod
+    def _stage_adjustment(cols: Dict[str, Any]):
+        cols["adjBid"] = [
+            b + s if s is not None else b
+            for b, s in zip(cols["bid"], cols["bidSpread"])
+        ]
+        cols["adjAsk"] = [
+            a + s if s is not None else a
+            for a, s in zip(cols["ask"], cols["askSpread"])
+        ]
+
+    @staticmethod
+    def _stage_mid_spread(cols: Dict[str, Any]):
+        cols["mid"] = [(b + a) / 2 for b, a in zip(cols["adjBid"], cols["adjAsk"])]
+        cols["spread"] = [a - b for b, a in zip(cols["adjBid"], cols["adjAsk"])]
+
+    @staticmethod
+    def _stage_rung_modifier(cols: Dict[str, Any]):
+        rm_bid = []
+        rm_ask = []
+
+        for row, (rm_val, rm_info) in enumerate(zip(cols["rmValue"], cols["rmInfo"])):
+            # Sin RM → hereda el precio ajustado (None)
+            if rm_val is None:
+                rm_bid.append(None)
+                rm_ask.append(None)
+                continue
+
+            spread = cols["spread"][row]
+            adjusted = (
+                spread + rm_val if rm_info["RMType"] == "ADDITIVE"
+                else spread * rm_val
+            )
+
+            if abs(adjusted) >= _MAX_VALUE:
+                cols["irregular"].add(cols["scp"][row])
+
+            half = adjusted / 2
+            mid = cols["mid"][row]
+            rm_bid.append(mid - half)
+            rm_ask.append(mid + half)
+
+        cols["rmBid"] = rm_bid
+        cols["rmAsk"] = rm_ask
+
+    @staticmethod
+    def _stage_min_spread(cols: Dict[str, Any]):
+        effective = []
+        forced_bid = []
+        forced_ask = []
+
+        for tom_min, rm_min, rm_bid, rm_ask, adj_bid, adj_ask in zip(
+                cols["tomMin"], cols["rmMin"],
+                cols["rmBid"], cols["rmAsk"], cols["adjBid"], cols["adjAsk"]
+        ):
+            eff = max(tom_min, rm_min)
+            effective.append(eff)
+
+            bid = rm_bid if rm_bid is not None else adj_bid
+            ask = rm_ask if rm_ask is not None else adj_ask
+
+            if eff == 0 or ask - bid >= eff:
+                forced_bid.append(None)
+                forced_ask.append(None)
+                continue
+
+            mid = (bid + ask) / 2
+            half = eff / 2
+            forced_bid.append(mid - half)
+            forced_ask.append(mid + half)
+
+        cols["minSpread"] = effective
+        cols["forcedBid"] = forced_bid
+        cols["forcedAsk"] = forced_ask
+
+    @staticmethod
+    def _stage_format(cols: Dict[str, Any]):
+        """
+        Formatea cada columna de precios una sola vez (format(..., "f")).
+        """
+        for name, column in (
+                ("fmtAdjBid", "adjBid"),
+                ("fmtAdjAsk", "adjAsk"),
+                ("fmtMid", "mid"),
+                ("fmtSpread", "spread"),
+                ("fmtMinSpread", "minSpread")
+        ):
+            cols[name] = list(map(format, cols[column], repeat("f")))
+
+        for name, column in (
+                ("fmtRMBid", "rmBid"),
+                ("fmtRMAsk", "rmAsk"),
+                ("fmtForcedBid", "forcedBid"),
+                ("fmtForcedAsk", "forcedAsk")
+        ):
+            cols[name] = [
+                format(value, "f") if value is not None else None
+                for value in cols[column]
+            ]
@@ -0,0 +1,832 @@
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+
+# =========================
+# FORMATO
+# =========================
+#
+# Un fichero por día (<YYYY-MM-DD>.spc) formado por segmentos columnares
+# que se añaden al final:
+#
+#   FILE_MAGIC (8 bytes)
+#   segmento:  SEGMENT_MAGIC + meta_len (u32) + body_len (u64)
+#              meta JSON (rellenado hasta múltiplo de 8)
+#              body: una columna tras otra, alineadas a 8 bytes
+#
+# Cada segmento tiene dos tablas: "scp" (una fila por resultado de
+# build()) y "rung" (una fila por rung, con su fila scp y su posición
+# 1-based). Tipos de columna:
+#   - u8 / i32 / i64: enteros de ancho fijo
+#   - dec: string decimal como coeficiente i64 + exponente i8
+#          ("1.9580" → 19580, -4), que se vuelve a formatear exacto
+#   - val: código i32 a la tabla de valores (JSON) del segmento
+# Lo que no cabe en el ancho fijo ("-0.0", "1E+3", amt fuera de i64...) se
+# guarda literal en meta["overflow"], así que la lectura devuelve lo mismo
+# que json.loads(to_json()).
+#
+# Guardar de nuevo un SCP añade otra fila (manda la última) y borrarlo
+# añade una fila lápida (deleted = 1). compact() reescribe el día con solo
+# las filas vivas.
+
+FILE_MAGIC = b"SPCOL01\n"
+SEGMENT_MAGIC = b"SPCS"
+
+_SEGMENT_HEADER = struct.Struct("<4sIQ")
+
+_NULL_EXP = -128
+_OVERFLOW_EXP = 127
+_OVERFLOW_CODE = -1
+
+_I64_MIN = -(1 << 63)
+_I64_MAX = (1 << 63) - 1
+
+_DECIMAL_RE = re.compile(r'(-?)(0|[1-9][0-9]*)(?:\.([0-9]+))?')
+_DAY_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+_TYPECODES = {"u8": "B", "i32": "i", "i64": "q", "dec": "q"}
+_INT_RANGES = {"u8": (0, 255), "i32": (-(1 << 31), (1 << 31) - 1), "i64": (_I64_MIN, _I64_MAX)}
+
+_RESULT_KEYS = ("context", "client", "notional", "rungs")
+
+_SCP_SECTIONS = (
+    ("context", ("ccyPair", "venue", "group", "smType", "prcModel", "priceCompetition")),
+    ("client", ("venueClientId", "venueAccountId", "venueUserId")),
+    ("notional", ("amount", "side")),
+)
+
+_RUNG_KEYS = (
+    "amt", "core", "adjustment", "priceAdjustment", "midSpread",
+    "volatilityScenario", "rungModifier", "RMValue", "RMType", "RMMin",
+    "priceAfterRungModifier", "minSpread", "priceAfterMinSpread"
+)
+
+_RUNG_NESTED = {
+    "core": ("bid", "ask"),
+    "adjustment": ("bidSpread", "askSpread", "minSpread", "source"),
+    "priceAdjustment": ("bid", "ask"),
+    "midSpread": ("mid", "spread"),
+    "priceAfterRungModifier": ("bid", "ask"),
+    "priceAfterMinSpread": ("bid", "ask"),
+}
+
+SCP_COLUMNS = {
+    "scpId": "val",
+    "deleted": "u8",
+    "rungStart": "i64",
+    "rungCount": "i32",
+    **{
+        f"{section}.{field}": "val"
+        for section, fields in _SCP_SECTIONS
+        for field in fields
+    }
+}
+
+RUNG_COLUMNS = {
+    "scp": "i32",
+    "position": "i32",
+    "adjustment": "u8",
+    "amt": "i64",
+    "core.bid": "dec",
+    "core.ask": "dec",
+    "adjustment.bidSpread": "dec",
+    "adjustment.askSpread": "dec",
+    "adjustment.minSpread": "dec",
+    "adjustment.source": "val",
+    "priceAdjustment.bid": "dec",
+    "priceAdjustment.ask": "dec",
+    "midSpread.mid": "dec",
+    "midSpread.spread": "dec",
+    "volatilityScenario": "val",
+    "rungModifier": "val",
+    "RMValue": "dec",
+    "RMType": "val",
+    "RMMin": "dec",
+    "priceAfterRungModifier.bid": "dec",
+    "priceAfterRungModifier.ask": "dec",
+    "minSpread": "dec",
+    "priceAfterMinSpread.bid": "dec",
+    "priceAfterMinSpread.ask": "dec",
+}
+
+# Columnas de rung que salen de un campo del resultado: (columna, clave, subclave)
+_RUNG_PATHS = tuple(
+    (name, *name.partition(".")[::2])
+    for name in RUNG_COLUMNS
+    if name not in ("scp", "position", "adjustment")
+)
+
+_TABLES = {"scp": SCP_COLUMNS, "rung": RUNG_COLUMNS}
+
+
+# =========================
+# VALORES
+# =========================
+
+def _encode_decimal(value):
+    """
+    String decimal → (coef, exp) si se puede reconstruir exactamente;
+    None en otro caso.
+    """
+    if type(value) is not str:
+        return None
+
+    m = _DECIMAL_RE.fullmatch(value)
+    if not m:
+        return None
+
+    sign, int_part, frac = m.groups()
+    coef = int(int_part + frac) if frac else int(int_part)
+    if sign:
+        if coef == 0:
+            return None
+        coef = -coef
+
+    exp = -len(frac) if frac else 0
+    if exp <= _NULL_EXP or not _I64_MIN <= coef <= _I64_MAX:
+        return None
+    return coef, exp
+
+
+def _format_decimal(coef: int, exp: int) -> str:
+    if exp == 0:
+        return str(coef)
+
+    digits = str(abs(coef)).rjust(1 - exp, "0")
+    sign = "-" if coef < 0 else ""
+    return f"{sign}{digits[:exp]}.{digits[exp:]}"
+
+
+def _check_shape(scp_id, result) -> None:
+    """
+    El almacén guarda resultados de SPOTConstructionService.build(): mismas
+    claves y en el mismo orden.
+    """
+    ok = type(result) is dict and tuple(result) == _RESULT_KEYS and all(
+        type(result[section]) is dict and tuple(result[section]) == fields
+        for section, fields in _SCP_SECTIONS
+    ) and type(result["rungs"]) is list
+
+    if ok:
+        for rung in result["rungs"]:
+            if type(rung) is not dict or tuple(rung) != _RUNG_KEYS:
+                ok = False
+                break
+            for key, fields in _RUNG_NESTED.items():
+                value = rung[key]
+                if key == "adjustment" and value is None:
+                    continue
+                if type(value) is not dict or tuple(value) != fields:
+                    ok = False
+                    break
+            if not ok:
+                break
+
+    if not ok:
+        raise ValueError(f"Resultado de spot construction con formato no soportado: {scp_id}")
+
+
+# =========================
+# SEGMENT WRITER
+# =========================
+
+class _SegmentWriter:
+    """
+    Acumula filas y las serializa como un segmento.
+    """
+
+    def __init__(self):
+        self.scp = {name: [] for name in SCP_COLUMNS}
+        self.rung = {name: [] for name in RUNG_COLUMNS}
+
+    def __len__(self):
+        return len(self.scp["scpId"])
+
+    def add(self, scp_id, result: Dict[str, Any]):
+        _check_shape(scp_id, result)
+
+        scp = self.scp
+        rung_rows = self.rung
+        row = len(scp["scpId"])
+        rungs = result["rungs"]
+
+        scp["scpId"].append(scp_id)
+        scp["deleted"].append(0)
+        scp["rungStart"].append(len(rung_rows["scp"]))
+        scp["rungCount"].append(len(rungs))
+
+        for section, fields in _SCP_SECTIONS:
+            values = result[section]
+            for field in fields:
+                scp[f"{section}.{field}"].append(values[field])
+
+        for position, rung in enumerate(rungs, start=1):
+            rung_rows["scp"].append(row)
+            rung_rows["position"].append(position)
+            rung_rows["adjustment"].append(0 if rung["adjustment"] is None else 1)
+
+            for name, key, sub in _RUNG_PATHS:
+                value = rung[key]
+                if sub:
+                    value = None if value is None else value[sub]
+                rung_rows[name].append(value)
+
+    def add_tombstone(self, scp_id):
+        scp = self.scp
+
+        scp["scpId"].append(scp_id)
+        scp["deleted"].append(1)
+        scp["rungStart"].append(len(self.rung["scp"]))
+        scp["rungCount"].append(0)
+
+        for section, fields in _SCP_SECTIONS:
+            for field in fields:
+                scp[f"{section}.{field}"].append(None)
+
+    def to_bytes(self) -> bytes:
+        values = []
+        codes = {}
+        columns = {}
+        overflow = {}
+        body = bytearray()
+
+        for table, rows in (("scp", self.scp), ("rung", self.rung)):
+            table_columns = columns[table] = {}
+
+            for name, kind in _TABLES[table].items():
+                spill = {}
+
+                if kind == "dec":
+                    physical = self._encode_decimals(name, rows[name], spill)
+                elif kind == "val":
+                    physical = [(name, self._encode_values(rows[name], values, codes, spill))]
+                else:
+                    physical = [(name, self._encode_ints(kind, rows[name], spill))]
+
+                for column, data in physical:
+                    body.extend(b"\0" * (-len(body) % 8))
+                    table_columns[column] = [len(body), data.typecode]
+                    body.extend(data.tobytes())
+
+                if spill:
+                    overflow.setdefault(table, {})[name] = spill
+
+        meta = json.dumps({
+            "byteorder": sys.byteorder,
+            "rows": {"scp": len(self.scp["scpId"]), "rung": len(self.rung["scp"])},
+            "values": values,
+            "columns": columns,
+            "overflow": overflow
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        meta += b" " * (-len(meta) % 8)
+
+        return _SEGMENT_HEADER.pack(SEGMENT_MAGIC, len(meta), len(body)) + meta + bytes(body)
+
+    @staticmethod
+    def _encode_ints(kind: str, data: List[Any], spill: Dict[str, Any]) -> array:
+        low, high = _INT_RANGES[kind]
+        out = array(_TYPECODES[kind])
+
+        for row, value in enumerate(data):
+            if type(value) is int and low <= value <= high:
+                out.append(value)
+            else:
+                out.append(0)
+                spill[str(row)] = value
+        return out
+
+    @staticmethod
+    def _encode_values(data: List[Any], values: List[Any], codes: Dict[Any, int], spill: Dict[str, Any]) -> array:
+        out = array("i")
+
+        for row, value in enumerate(data):
+            try:
+                token = (type(value), value)
+                code = codes.get(token)
+            except TypeError:
+                out.append(_OVERFLOW_CODE)
+                spill[str(row)] = value
+                continue
+
+            if code is None:
+                code = codes[token] = len(values)
+                values.append(value)
+            out.append(code)
+        return out
+
+    @staticmethod
+    def _encode_decimals(name: str, data: List[Any], spill: Dict[str, Any]) -> List[tuple]:
+        coefs = array("q")
+        exps = array("b")
+
+        for row, value in enumerate(data):
+            if value is None:
+                coefs.append(0)
+                exps.append(_NULL_EXP)
+                continue
+
+            encoded = _encode_decimal(value)
+            if encoded is None:
+                coefs.append(0)
+                exps.append(_OVERFLOW_EXP)
+                spill[str(row)] = value
+            else:
+                coefs.append(encoded[0])
+                exps.append(encoded[1])
+
+        return [(name, coefs), (name + "#exp", exps)]
+
+
+# =========================
+# SEGMENT READER
+# =========================
+
+class _Segment:
+    """
+    Lectura de un segmento sobre el mmap del fichero: cada columna se lee
+    solo en el rango de filas pedido.
+    """
+
+    __slots__ = ("_mm", "_body", "meta", "rows", "_swap")
+
+    def __init__(self, mm, meta: Dict[str, Any], body: int):
+        self._mm = mm
+        self._body = body
+        self.meta = meta
+        self.rows = meta["rows"]
+        self._swap = meta["byteorder"] != sys.byteorder
+
+    def read(self, table: str, name: str, start: int = 0, stop: int = None) -> array:
+        offset, typecode = self.meta["columns"][table][name]
+        stop = self.rows[table] if stop is None else stop
+
+        data = array(typecode)
+        base = self._body + offset
+        data.frombytes(self._mm[base + start * data.itemsize: base + stop * data.itemsize])
+        if self._swap:
+            data.byteswap()
+        return data
+
+    def decode(self, table: str, name: str, rows=None) -> List[Any]:
+        """
+        Valores de la columna. rows: range (se lee solo ese tramo) o lista
+        de filas; por defecto todas.
+        """
+        if rows is None:
+            rows = range(self.rows[table])
+        if isinstance(rows, range):
+            start, stop = rows.start, rows.stop
+        else:
+            start, stop = 0, self.rows[table]
+
+        if start >= stop:
+            return []
+
+        kind = _TABLES[table][name]
+        spill = self.meta["overflow"].get(table, {}).get(name, {})
+
+        if kind == "dec":
+            coefs = self.read(table, name, start, stop)
+            exps = self.read(table, name + "#exp", start, stop)
+            out = []
+            for row in rows:
+                exp = exps[row - start]
+                if exp == _NULL_EXP:
+                    out.append(None)
+                elif exp == _OVERFLOW_EXP:
+                    out.append(spill[str(row)])
+                else:
+                    out.append(_format_decimal(coefs[row - start], exp))
+            return out
+
+        data = self.read(table, name, start, stop)
+
+        if kind == "val":
+            values = self.meta["values"]
+            return [
+                values[data[row - start]] if data[row - start] != _OVERFLOW_CODE
+                else spill[str(row)]
+                for row in rows
+            ]
+
+        if spill:
+            return [spill.get(str(row), data[row - start]) for row in rows]
+        return [data[row - start] for row in rows]
+
+    def find_scp(self, scp_id) -> Optional[int]:
+        """
+        Última fila scp con ese id: se busca el código del id como bytes
+        sobre el mmap, sin decodificar la columna.
+        """
+        try:
+            code = self.meta["values"].index(scp_id)
+        except ValueError:
+            return None
+
+        offset, _ = self.meta["columns"]["scp"]["scpId"]
+        start = self._body + offset
+        end = start + self.rows["scp"] * 4
+        pattern = struct.pack("<i" if self.meta["byteorder"] == "little" else ">i", code)
+
+        pos = self._mm.rfind(pattern, start, end)
+        while pos >= 0 and (pos - start) % 4:
+            pos = self._mm.rfind(pattern, start, pos + 3)
+
+        return None if pos < 0 else (pos - start) // 4
+
+    def is_deleted(self, row: int) -> bool:
+        return bool(self.read("scp", "deleted", row, row + 1)[0])
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """
+        Reconstruye el resultado de build() de la fila scp.
+        """
+        rows = range(row, row + 1)
+        result = {
+            section: {
+                field: self.decode("scp", f"{section}.{field}", rows)[0]
+                for field in fields
+            }
+            for section, fields in _SCP_SECTIONS
+        }
+
+        start = self.read("scp", "rungStart", row, row + 1)[0]
+        count = self.read("scp", "rungCount", row, row + 1)[0]
+        rung_rows = range(start, start + count)
+
+        columns = {name: self.decode("rung", name, rung_rows) for name in RUNG_COLUMNS}
+        rungs = []
+
+        for i in range(count):
+            rung = {}
+            for key in _RUNG_KEYS:
+                fields = _RUNG_NESTED.get(key)
+                if fields is None:
+                    rung[key] = columns[key][i]
+                elif key == "adjustment" and not columns["adjustment"][i]:
+                    rung[key] = None
+                else:
+                    rung[key] = {field: columns[f"{key}.{field}"][i] for field in fields}
+            rungs.append(rung)
+
+        result["rungs"] = rungs
+        return result
+
+
+# =========================
+# SERVICE
+# =========================
+
+class SPOTColumnarStoreService:
+    """
+    Almacén columnar (binario, un fichero por día) de resultados de spot
+    construction, alternativo a los JSON de resources/scp/spot_construction.
+
+    - append() / delete() escriben segmentos al final del fichero del día
+      (dentro de batch() se agrupan en un segmento por día)
+    - load() devuelve el resultado de un SCP leyendo solo sus filas
+    - scan() lee solo las columnas pedidas de todos los rungs vivos de un
+      día, p.ej. los spreads del rung 3 de EURUSD:
+        scan(day, ["midSpread.spread"],
+             where={"context.ccyPair": "EURUSD", "position": 3})
+    """
+
+    DIR_NAME = "columnar"
+    FILE_EXT = ".spc"
+    UNDATED_DAY = "undated"
+
+    # Segmentos por día a partir de los cuales flush() compacta el fichero
+    MAX_SEGMENTS = 64
+    # Filas pendientes dentro de batch() antes de volcar a disco
+    FLUSH_ROWS = 5000
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.store_path = os.path.join(
+            base_path,
+            "resources",
+            "scp",
+            "spot_construction",
+            self.DIR_NAME
+        )
+
+        self._pending: Dict[str, _SegmentWriter] = {}
+        self._batch_depth = 0
+        # path → (inode, fin del último segmento completo, [(meta, body)])
+        self._segment_cache = {}
+
+    # =========================
+    # PATHS / DAYS
+    # =========================
+
+    @classmethod
+    def day_of(cls, parsed_scp: Dict[str, Any]) -> str:
+        """
+        Día (YYYY-MM-DD) del SCP según el time del TOM.
+        """
+        tom = parsed_scp.get("tom") if isinstance(parsed_scp, Mapping) else None
+        time = tom.get("time") if isinstance(tom, Mapping) else None
+
+        m = _DAY_RE.match(time) if isinstance(time, str) else None
+        return m.group(0) if m else cls.UNDATED_DAY
+
+    def path_for(self, day: str) -> str:
+        if day != self.UNDATED_DAY and not _DAY_RE.fullmatch(day or ""):
+            raise ValueError(f"Día inválido: {day}")
+        return os.path.join(self.store_path, f"{day}{self.FILE_EXT}")
+
+    def days(self) -> List[str]:
+        if not os.path.isdir(self.store_path):
+            return []
+        return sorted(
+            name[:-len(self.FILE_EXT)]
+            for name in os.listdir(self.store_path)
+            if name.endswith(self.FILE_EXT)
+        )
+
+    # =========================
+    # WRITE
+    # =========================
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa las escrituras en un segmento por día (importaciones
+        masivas).
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def append(self, scp_id: str, day: str, result: Dict[str, Any]) -> str:
+        """
+        Añade el resultado de build() de un SCP y devuelve el fichero del día.
+        """
+        path = self.path_for(day)
+        self._pending.setdefault(day, _SegmentWriter()).add(scp_id, result)
+        self._maybe_flush()
+        return path
+
+    def delete(self, scp_id: str) -> bool:
+        """
+        Marca el SCP como borrado en los días en que está vivo.
+        Devuelve True si existía.
+        """
+        found = False
+
+        for day in sorted(set(self.days()) | set(self._pending)):
+            with self._open_day(day) as segments:
+                live = self._live_row(segments, scp_id) is not None
+
+            pending = self._pending.get(day)
+            if live or (pending and scp_id in pending.scp["scpId"]):
+                self._pending.setdefault(day, _SegmentWriter()).add_tombstone(scp_id)
+                found = True
+
+        self._maybe_flush()
+        return found
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+
+        for day, writer in pending.items():
+            if not len(writer):
+                continue
+
+            segments = self._append_segment(self.path_for(day), writer.to_bytes())
+            if segments > self.MAX_SEGMENTS:
+                self.compact(day)
+
+    def compact(self, day: str) -> int:
+        """
+        Reescribe el fichero del día en un único segmento con las filas
+        vivas. Devuelve el número de SCPs que quedan.
+        """
+        self.flush()
+        path = self.path_for(day)
+
+        writer = _SegmentWriter()
+        with self._open_day(day) as segments:
+            for segment, row, scp_id in self._live_rows(segments):
+                writer.add(scp_id, segment.record(row))
+
+        self._segment_cache.pop(path, None)
+
+        if not len(writer):
+            if os.path.exists(path):
+                os.remove(path)
+            return 0
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(FILE_MAGIC)
+            f.write(writer.to_bytes())
+        os.replace(tmp_path, path)
+
+        return len(writer)
+
+    def _maybe_flush(self):
+        if self._batch_depth == 0:
+            self.flush()
+        elif sum(len(w) for w in self._pending.values()) >= self.FLUSH_ROWS:
+            self.flush()
+
+    def _append_segment(self, path: str, data: bytes) -> int:
+        """
+        Añade un segmento (descartando una cola incompleta de una escritura
+        interrumpida) y devuelve los segmentos que tiene el fichero.
+        """
+        os.makedirs(self.store_path, exist_ok=True)
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as f:
+                f.write(FILE_MAGIC)
+
+        with open(path, "r+b") as f:
+            with self._mmap(f) as mm:
+                _, end, entries = self._index_segments(path, os.fstat(f.fileno()), mm)
+
+            f.truncate(end)
+            f.seek(end)
+            f.write(data)
+
+        return len(entries) + 1
+
+    # =========================
+    # READ
+    # =========================
+
+    def load(self, scp_id: str, day: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Resultado de build() de un SCP (igual que json.loads del JSON de
+        spot construction) o None si no está. Sin día se buscan todos, del
+        más reciente al más antiguo.
+        """
+        days = [day] if day else list(reversed(self.days()))
+
+        for d in days:
+            with self._open_day(d) as segments:
+                for segment in reversed(segments):
+                    row = segment.find_scp(scp_id)
+                    if row is not None:
+                        return None if segment.is_deleted(row) else segment.record(row)
+
+        return None
+
+    def scan(self, day: str, columns: List[str], where: Dict[str, Any] = None) -> Dict[str, List[Any]]:
+        """
+        Columnas de los rungs vivos del día, en orden de escritura. Admite
+        columnas de rung y de SCP (se repiten por rung); where filtra por
+        igualdad.
+        """
+        where = where or {}
+
+        unknown = [
+            name for name in (*columns, *where)
+            if name not in RUNG_COLUMNS and name not in SCP_COLUMNS
+        ]
+        if unknown:
+            raise ValueError(f"Columnas desconocidas: {', '.join(unknown)}")
+
+        result = {name: [] for name in columns}
+
+        with self._open_day(day) as segments:
+            live = {}
+            for segment, row, _ in self._live_rows(segments):
+                live.setdefault(id(segment), set()).add(row)
+
+            for segment in segments:
+                scp_rows = live.get(id(segment))
+                if not scp_rows:
+                    continue
+
+                rung_scp = segment.read("rung", "scp")
+                selected = [r for r, s in enumerate(rung_scp) if s in scp_rows]
+
+                for name, expected in where.items():
+                    if not selected:
+                        break
+                    values = self._rung_values(segment, name, rung_scp, selected)
+                    selected = [r for r, v in zip(selected, values) if v == expected]
+
+                for name in columns:
+                    result[name].extend(self._rung_values(segment, name, rung_scp, selected))
+
+        return result
+
+    @staticmethod
+    def _rung_values(segment: _Segment, name: str, rung_scp, rows: List[int]) -> List[Any]:
+        if name in RUNG_COLUMNS:
+            return segment.decode("rung", name, rows)
+
+        scp_rows = sorted({rung_scp[r] for r in rows})
+        values = dict(zip(scp_rows, segment.decode("scp", name, scp_rows)))
+        return [values[rung_scp[r]] for r in rows]
+
+    def _live_rows(self, segments: List[_Segment]) -> List[tuple]:
+        """
+        (segmento, fila, scp id) de la última versión no borrada de cada
+        SCP, en orden de escritura.
+        """
+        seen = set()
+        live = []
+
+        for segment in reversed(segments):
+            ids = segment.decode("scp", "scpId")
+            deleted = segment.read("scp", "deleted")
+
+            for row in range(len(ids) - 1, -1, -1):
+                scp_id = ids[row]
+                if scp_id in seen:
+                    continue
+                seen.add(scp_id)
+                if not deleted[row]:
+                    live.append((segment, row, scp_id))
+
+        live.reverse()
+        return live
+
+    @staticmethod
+    def _live_row(segments: List[_Segment], scp_id) -> Optional[tuple]:
+        for segment in reversed(segments):
+            row = segment.find_scp(scp_id)
+            if row is not None:
+                return None if segment.is_deleted(row) else (segment, row)
+        return None
+
+    # =========================
+    # FILE ACCESS
+    # =========================
+
+    @staticmethod
+    @contextmanager
+    def _mmap(f):
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+    @contextmanager
+    def _open_day(self, day: str) -> Iterator[List[_Segment]]:
+        path = self.path_for(day)
+
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            yield []
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                yield []
+                return
+
+            with self._mmap(f) as mm:
+                _, _, entries = self._index_segments(path, stat, mm)
+                yield [_Segment(mm, meta, body) for meta, body in entries]
+
+    def _index_segments(self, path: str, stat, mm) -> tuple:
+        """
+        Metadatos de los segmentos completos del fichero. El fichero solo
+        crece (salvo compactación, que cambia el inode), así que se
+        reutiliza lo ya leído y solo se parsean los segmentos nuevos.
+        """
+        cached = self._segment_cache.get(path)
+
+        if cached and cached[0] == stat.st_ino and stat.st_size >= cached[1]:
+            _, offset, entries = cached
+            entries = list(entries)
+        else:
+            if mm[:len(FILE_MAGIC)] != FILE_MAGIC:
+                raise ValueError(f"Fichero columnar inválido: {path}")
+            offset = len(FILE_MAGIC)
+            entries = []
+
+        size = len(mm)
+        while offset + _SEGMENT_HEADER.size <= size:
+            magic, meta_len, body_len = _SEGMENT_HEADER.unpack_from(mm, offset)
+            body = offset + _SEGMENT_HEADER.size + meta_len
+            if magic != SEGMENT_MAGIC or body + body_len > size:
+                # Cola incompleta (escritura interrumpida o en curso)
+                break
+
+            meta = json.loads(mm[offset + _SEGMENT_HEADER.size: body].decode("utf-8"))
+            entries.append((meta, body))
+            offset = body + body_len
+
+        cached = self._segment_cache[path] = (stat.st_ino, offset, entries)
+        return cached
@@ -3,9 +3,38 @@ import json
 from decimal import Decimal
 from typing import Dict, Any, List
 
+from services.SCPMetricsService import timed
+from services.SCPParserService import atom_code
+
+
+# Marca de índice aún no construido (None indica "no indexable")
+_UNBUILT = object()
+
 
 class SPOTConstructionService:
 
+    VOLATILITY_SCENARIOS = {
+        "N": "Normal",
+        "A": "Active",
+        "B": "Busy",
+        "F": "Fast"
+    }
+
+    NO_RUNG_MODIFIER = {
+        "rungModifier": None,
+        "RMValue": None,
+        "RMType": None,
+        "RMMin": None
+    }
+
+    # Overrides de what-if (SPOTScenarioService, SPOTStageGraphService)
+    MKT_MODES = ("N", "A", "B", "F")
+    TOM_FIELDS = {"bidSpread", "askSpread", "minSpread"}
+    RM_FIELDS = {"type", "value", "min"}
+
+    # Package del label cuando el SCP no trae TMU y el RM viene de un override
+    WHAT_IF_PACKAGE = "WHATIF"
+
     def __init__(self, parsed_scp: Dict[str, Any], base_path: str):
         if not parsed_scp or "__type__" not in parsed_scp:
             raise ValueError("SCP inválido o no parseado")
@@ -14,16 +43,21 @@ class SPOTConstructionService:
         self.key = parsed_scp.get("key", {})
         self.base_path = base_path
 
+        # Índices de rung modifier (se construyen en el primer uso)
+        self._position_index = _UNBUILT
+        self._modifier_index = {}
+
     # =========================
     # PUBLIC
     # =========================
 
+    @timed("construction.build")
     def build(self) -> Dict[str, Any]:
         return {
             "context": self._extract_context(),
             "client": self._extract_client(),
             "notional": self._extract_notional(),
-            "rungs": self._extract_rungs_with_adjustments()
+            "rungs": self.build_rungs()
         }
 
     def save(self) -> str:
@@ -31,20 +65,135 @@ class SPOTConstructionService:
         if not scp_id:
             raise ValueError("El SCP no tiene ID")
 
-        output_dir = os.path.join(
-            self.base_path,
+        output_path = self.output_path(self.base_path, scp_id)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+        return output_path
+
+    def to_json(self) -> str:
+        return json.dumps(self.build(), indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def output_path(base_path: str, scp_id: str) -> str:
+        return os.path.join(
+            base_path,
             "resources",
             "scp",
-            "spot_construction"
+            "spot_construction",
+            f"{scp_id}.json"
         )
-        os.makedirs(output_dir, exist_ok=True)
 
-        output_path = os.path.join(output_dir, f"{scp_id}.json")
+    @staticmethod
+    def active_rung(spot: Dict[str, Any]) -> Dict[str, Any] | None:
+        """
+        Rung de un resultado de build() que se aplica al cliente: el primero
+        cuyo importe cubre el notional. None si no hay ninguno.
+        """
+        notional_raw = spot.get("notional", {}).get("amount")
+        if not notional_raw:
+            return None
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(self.build(), f, indent=2, ensure_ascii=False)
+        try:
+            notional_amt = Decimal(notional_raw)
+            for rung in spot.get("rungs", []):
+                if Decimal(rung["amt"]) >= notional_amt:
+                    return rung
+        except Exception:
+            pass
 
-        return output_path
+        return None
+
+    def build_rungs(self) -> List[Dict[str, Any]]:
+        """
+        Rungs de build() (sin context / client / notional).
+        """
+        core_rungs = self._extract_core_rungs()
+        tom_index = self._index_tom_rungs()
+
+        result = []
+
+        for rung in core_rungs:
+            result.append(self._build_rung(rung, tom_index.get(rung["amt"])))
+
+        return result
+
+    def market_mode(self) -> str:
+        """
+        mktMode (N/A/B/F) con el que se eligen los rung modifiers.
+        """
+        return self._market_mode()
+
+    def rung_modifiers_by_amt(self) -> Dict[int, Dict[str, Any]] | None:
+        """
+        amt → rung modifier (mismo dict que en los rungs de build()) de los
+        rungs del CRL que tienen RM en el mktMode del SCP, resuelto una vez
+        con los índices de posición y de RM. None si algún índice no se
+        puede construir: build() usa entonces la búsqueda lineal.
+        """
+        tmu = self.scp.get("tmu", {})
+        scenario = self._market_mode()
+        rms = self._rung_modifiers(scenario)
+
+        if not tmu.get("package") or not rms:
+            return {}
+
+        positions = self._rung_position_index()
+        by_position = self._rung_modifier_index(scenario, rms)
+
+        if positions is None or by_position is None:
+            return None
+
+        index = {}
+        for amt, position in positions.items():
+            rm = by_position.get(position)
+            if rm is not None:
+                index[amt] = self._rung_modifier_info(tmu.get("package"), scenario, position, rm)
+
+        return index
+
+    @staticmethod
+    def check_override_fields(fields: Dict[str, Any], allowed: set, label: str) -> Dict[str, Any]:
+        """
+        Copia de un override comprobando que solo trae campos de allowed
+        (TOM_FIELDS / RM_FIELDS).
+        """
+        unknown = set(fields) - allowed
+        if unknown:
+            raise ValueError(f"Campos de {label} desconocidos: {', '.join(sorted(unknown))}")
+        return dict(fields)
+
+    def rung_modifier_with_override(
+            self, amt: int, scenario: str, override: Dict[str, Any] | None
+    ) -> Dict[str, Any]:
+        """
+        Rung modifier (mismo dict que en los rungs de build()) del rung amt
+        en el mktMode scenario, con el override (type, value, min)
+        combinado con el RM registrado en su posición. Un rung sin RM pasa
+        a tenerlo; sin override es el RM registrado.
+        """
+        tmu = self.scp.get("tmu", {})
+        rung_pos = self._get_active_rung_position(amt)
+        rms = self._rung_modifiers(scenario)
+
+        rm = (
+            self._find_rung_modifier(scenario, rms, rung_pos)
+            if tmu.get("package") and rms else None
+        )
+
+        if override:
+            rm = {**(rm or {"rung": rung_pos}), **override}
+            if rm.get("type") is not None and rm.get("value") is None:
+                raise ValueError(f"Override de RM sin value para la posición {rung_pos}")
+
+        if rm is None:
+            return dict(self.NO_RUNG_MODIFIER)
+
+        return self._rung_modifier_info(
+            tmu.get("package") or self.WHAT_IF_PACKAGE, scenario, rung_pos, rm
+        )
 
     # =========================
     # EXTRACTORS
@@ -81,79 +230,77 @@ class SPOTConstructionService:
     # RUNG LOGIC
     # =========================
 
-    def _extract_rungs_with_adjustments(self) -> List[Dict[str, Any]]:
-        core_rungs = self._extract_core_rungs()
-        tom_index = self._index_tom_rungs()
+    @timed("construction.rung")
+    def _build_rung(self, rung: Dict[str, Any], tom: Dict[str, Any] | None) -> Dict[str, Any]:
+        amt = rung["amt"]
+        core = rung["core"]
 
-        result = []
+        adjustment = self._build_adjustment(tom)
 
-        for rung in core_rungs:
-            amt = rung["amt"]
-            core = rung["core"]
-            tom = tom_index.get(amt)
-
-            adjustment = None
-            if tom:
-                adjustment = {
-                    "bidSpread": str(tom.get("bidSpread", "0")),
-                    "askSpread": str(tom.get("askSpread", "0")),
-                    "minSpread": str(tom.get("minSpread", "0")),
-                    "source": "TOM"
-                }
-
-            # --- PRICE ADJ (CRL + TOM)
-            price_adjustment = self._apply_adjustment(core, adjustment)
-
-            # --- MID / SPREAD
-            mid_spread = self._calculate_mid_and_spread(price_adjustment)
-
-            # --- RUNG MODIFIER METADATA
-            rm_info = self._extract_rung_modifier(amt)
-
-            # --- PRICE AFTER RM (HEREDA SI NO HAY RM)
-            price_after_rm = self._apply_rung_modifier_price(
-                mid_spread,
-                rm_info["RMType"],
-                rm_info["RMValue"],
-                fallback_price=price_adjustment
-            )
-
-            # --- MIN SPREAD EFECTIVO
-            effective_min_spread = self._calculate_effective_min_spread(
-                adjustment,
-                rm_info["RMMin"]
-            )
-
-            # --- PRICE AFTER MIN SPREAD (HEREDA SI NO SE FUERZA)
-            price_after_min_spread = self._apply_min_spread(
-                price_after_rm,
-                effective_min_spread
-            )
-
-            result.append({
-                "amt": amt,
-                "core": core,
-                "adjustment": adjustment,
-                "priceAdjustment": price_adjustment,
-                "midSpread": mid_spread,
-                "volatilityScenario": self._extract_volatility_scenario(),
-
-                "rungModifier": rm_info["rungModifier"],
-                "RMValue": rm_info["RMValue"],
-                "RMType": rm_info["RMType"],
-                "RMMin": rm_info["RMMin"],
-
-                "priceAfterRungModifier": price_after_rm,
-                "minSpread": effective_min_spread,
-                "priceAfterMinSpread": price_after_min_spread
-            })
+        # --- PRICE ADJ (CRL + TOM)
+        price_adjustment = self._apply_adjustment(core, adjustment)
 
-        return result
+        # --- MID / SPREAD
+        mid_spread = self._calculate_mid_and_spread(price_adjustment)
+
+        # --- RUNG MODIFIER METADATA
+        rm_info = self._extract_rung_modifier(amt)
+
+        # --- PRICE AFTER RM (HEREDA SI NO HAY RM)
+        price_after_rm = self._apply_rung_modifier_price(
+            mid_spread,
+            rm_info["RMType"],
+            rm_info["RMValue"],
+            fallback_price=price_adjustment
+        )
+
+        # --- MIN SPREAD EFECTIVO
+        effective_min_spread = self._calculate_effective_min_spread(
+            adjustment,
+            rm_info["RMMin"]
+        )
+
+        # --- PRICE AFTER MIN SPREAD (HEREDA SI NO SE FUERZA)
+        price_after_min_spread = self._apply_min_spread(
+            price_after_rm,
+            effective_min_spread
+        )
+
+        return {
+            "amt": amt,
+            "core": core,
+            "adjustment": adjustment,
+            "priceAdjustment": price_adjustment,
+            "midSpread": mid_spread,
+            "volatilityScenario": self._extract_volatility_scenario(),
+
+            "rungModifier": rm_info["rungModifier"],
+            "RMValue": rm_info["RMValue"],
+            "RMType": rm_info["RMType"],
+            "RMMin": rm_info["RMMin"],
+
+            "priceAfterRungModifier": price_after_rm,
+            "minSpread": effective_min_spread,
+            "priceAfterMinSpread": price_after_min_spread
+        }
+
+    @timed("construction.adjustment")
+    def _build_adjustment(self, tom: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        if not tom:
+            return None
+
+        return {
+            "bidSpread": str(tom.get("bidSpread", "0")),
+            "askSpread": str(tom.get("askSpread", "0")),
+            "minSpread": str(tom.get("minSpread", "0")),
+            "source": "TOM"
+        }
 
     # =========================
     # PRICE ADJUSTMENT (TOM)
     # =========================
 
+    @timed("construction.price_adjustment")
     def _apply_adjustment(self, core: Dict[str, str], adjustment: Dict[str, Any] | None) -> Dict[str, str]:
         bid = Decimal(core["bid"])
         ask = Decimal(core["ask"])
@@ -168,6 +315,7 @@ class SPOTConstructionService:
     # CORE (CRL)
     # =========================
 
+    @timed("construction.core_rungs")
     def _extract_core_rungs(self) -> List[Dict[str, Any]]:
         rungs_data = []
         crl = self.scp.get("crl")
@@ -192,6 +340,7 @@ class SPOTConstructionService:
     # TOM
     # =========================
 
+    @timed("construction.tom_index")
     def _index_tom_rungs(self) -> Dict[int, Dict[str, Any]]:
         tom = self.scp.get("tom")
         if not tom:
@@ -205,62 +354,113 @@ class SPOTConstructionService:
                 continue
         return index
 
+    def _market_mode(self) -> str:
+        # Fast (mktMode=F) llega del parser como False
+        return atom_code(self.scp.get("tom", {}).get("mktMode", "N"))
+
     def _extract_volatility_scenario(self) -> str:
-        return {
-            "N": "Normal",
-            "A": "Active",
-            "B": "Busy",
-            "F": "Fast"
-        }.get(self.scp.get("tom", {}).get("mktMode", "N"), "Normal")
+        return self.VOLATILITY_SCENARIOS.get(self._market_mode(), "Normal")
 
     # =========================
     # RUNG MODIFIER
     # =========================
 
     def _get_active_rung_position(self, amt: int) -> int:
+        index = self._rung_position_index()
+        if index is None:
+            return self._scan_rung_position(amt)
+        return index.get(amt, 1)
+
+    def _scan_rung_position(self, amt: int) -> int:
         for idx, r in enumerate(self.scp.get("crl", {}).get("rungs", []), start=1):
             if int(r.get("amt")) == amt:
                 return idx
         return 1
 
+    def _rung_position_index(self) -> Dict[int, int] | None:
+        """
+        amt → primera posición (1-based) en crl.rungs, construido una vez
+        por SCP. None si algún amt no es numérico: en ese caso se usa la
+        búsqueda lineal, que conserva sus errores.
+        """
+        if self._position_index is _UNBUILT:
+            try:
+                index = {}
+                for idx, r in enumerate(self.scp.get("crl", {}).get("rungs", []), start=1):
+                    index.setdefault(int(r.get("amt")), idx)
+            except Exception:
+                index = None
+            self._position_index = index
+
+        return self._position_index
+
+    def _rung_modifiers(self, scenario: str):
+        return self.scp.get("tmu", {}).get("rungmodifiers", {}).get(scenario)
+
+    @timed("construction.rung_modifier")
     def _extract_rung_modifier(self, amt: int) -> Dict[str, Any]:
         tmu = self.scp.get("tmu", {})
-        scenario = self.scp.get("tom", {}).get("mktMode", "N")
-        rms = tmu.get("rungmodifiers", {}).get(scenario)
+        scenario = self._market_mode()
+        rms = self._rung_modifiers(scenario)
 
         if not tmu.get("package") or not rms:
-            return {
-                "rungModifier": None,
-                "RMValue": None,
-                "RMType": None,
-                "RMMin": None
-            }
+            return dict(self.NO_RUNG_MODIFIER)
 
         rung_pos = self._get_active_rung_position(amt)
+        rm = self._find_rung_modifier(scenario, rms, rung_pos)
 
-        for rm in rms:
-            if rm.get("rung") == rung_pos:
-                return {
-                    "rungModifier": (
-                        f"{tmu.get('package')}_{scenario}_FA "
-                        f"(Rung {rung_pos} {rm.get('type')} {rm.get('value')})"
-                    ),
-                    "RMValue": str(rm.get("value")),
-                    "RMType": rm.get("type"),
-                    "RMMin": str(rm.get("min")) if rm.get("min") not in (None, 0, "0") else None
-                }
+        if rm is None:
+            return dict(self.NO_RUNG_MODIFIER)
+
+        return self._rung_modifier_info(tmu.get("package"), scenario, rung_pos, rm)
+
+    def _find_rung_modifier(self, scenario: str, rms, rung_pos: int) -> Dict[str, Any] | None:
+        index = self._rung_modifier_index(scenario, rms)
+
+        if index is None:
+            for rm in rms:
+                if rm.get("rung") == rung_pos:
+                    return rm
+            return None
+
+        return index.get(rung_pos)
+
+    def _rung_modifier_index(self, scenario: str, rms) -> Dict[Any, Dict[str, Any]] | None:
+        """
+        posición → primer RM de la tabla del escenario, construido una vez
+        por escenario. None si la tabla no es indexable: en ese caso se
+        recorre linealmente, que conserva sus errores.
+        """
+        index = self._modifier_index.get(scenario, _UNBUILT)
+
+        if index is _UNBUILT:
+            try:
+                index = {}
+                for rm in rms:
+                    index.setdefault(rm.get("rung"), rm)
+            except Exception:
+                index = None
+            self._modifier_index[scenario] = index
+
+        return index
 
+    @staticmethod
+    def _rung_modifier_info(package, scenario: str, rung_pos: int, rm: Dict[str, Any]) -> Dict[str, Any]:
         return {
-            "rungModifier": None,
-            "RMValue": None,
-            "RMType": None,
-            "RMMin": None
+            "rungModifier": (
+                f"{package}_{scenario}_FA "
+                f"(Rung {rung_pos} {rm.get('type')} {rm.get('value')})"
+            ),
+            "RMValue": str(rm.get("value")),
+            "RMType": rm.get("type"),
+            "RMMin": str(rm.get("min")) if rm.get("min") not in (None, 0, "0") else None
         }
 
     # =========================
     # PRICE AFTER RUNG MODIFIER
     # =========================
 
+    @timed("construction.price_after_rm")
     def _apply_rung_modifier_price(
             self,
             mid_spread,
@@ -299,12 +499,14 @@ class SPOTConstructionService:
     # MIN SPREAD
     # =========================
 
+    @timed("construction.min_spread")
     def _calculate_effective_min_spread(self, tom_adj, rm_min):
         tom_min = Decimal(tom_adj.get("minSpread")) if tom_adj and tom_adj.get("minSpread") else Decimal("0")
         rm_min_val = Decimal(rm_min) if rm_min else Decimal("0")
         eff = max(tom_min, rm_min_val)
         return format(eff, "f")  # 🔥 nunca None
 
+    @timed("construction.price_after_min_spread")
     def _apply_min_spread(self, price, min_spread):
         if Decimal(min_spread) == 0:
             return price
@@ -326,6 +528,7 @@ class SPOTConstructionService:
     # MID / SPREAD
     # =========================
 
+    @timed("construction.mid_spread")
     def _calculate_mid_and_spread(self, price):
         bid = Decimal(price["bid"])
         ask = Decimal(price["ask"])
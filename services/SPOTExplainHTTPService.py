@@ -0,0 +1,373 @@
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from services.CRLService import explain_triangulation
+from services.SCPParseCacheService import SCPParseCacheService
+from services.SPOTAuditExplainService import SpotAuditExplainService
+from services.SPOTConstructionService import SPOTConstructionService
+
+
+# Rungs que se explican: todos o solo el que se aplica al notional
+EXPLAIN_RUNGS = ("all", "active")
+DEFAULT_EXPLAIN_RUNGS = "all"
+
+# El servicio solo escucha en la máquina local
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+# =========================
+# WORKERS (pool de procesos)
+# =========================
+
+def explain_trace(base_path: str, engine: str, trace: str, rungs: str) -> Dict[str, Any]:
+    """
+    Traza → spot construction, audit explain de los rungs y triangulación
+    del CRL (None si el CRL no es sintético). Usa la caché de parseo
+    compartida, así que una traza repetida no se vuelve a parsear.
+    """
+    cache = SCPParseCacheService.shared(base_path)
+
+    try:
+        parsed_scp = cache.parse(trace, engine)
+        scp_id = parsed_scp.get("id") if isinstance(parsed_scp, dict) else None
+        if not scp_id:
+            raise ValueError("No se pudo extraer el ID del SCP")
+
+        spot = cache.construction(trace, parsed_scp, engine)
+
+        if rungs == "active":
+            rung = SPOTConstructionService.active_rung(spot)
+            selected = [rung] if rung is not None else []
+        else:
+            selected = spot.get("rungs", [])
+
+        try:
+            triangulation = explain_triangulation(parsed_scp)
+        except ValueError:
+            triangulation = None
+
+        return {
+            "scpId": scp_id,
+            "construction": spot,
+            "explains": [
+                {
+                    "amt": rung.get("amt"),
+                    "explain": SpotAuditExplainService(
+                        context=spot.get("context", {}),
+                        notional=spot.get("notional", {}),
+                        rung=rung
+                    ).build()
+                }
+                for rung in selected
+            ],
+            "triangulation": triangulation
+        }
+    except Exception as e:
+        return {"scpId": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def explain_traces(base_path: str, engine: str, traces: List[str], rungs: str) -> List[Dict[str, Any]]:
+    return [explain_trace(base_path, engine, trace, rungs) for trace in traces]
+
+
+class _HTTPError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SPOTExplainHTTPService:
+    """
+    Servicio HTTP/1.1 local (asyncio, sin dependencias externas) que
+    devuelve para una traza SCP su spot construction, el audit explain y la
+    triangulación del CRL.
+
+    Endpoints (respuesta JSON):
+    - GET  /health
+    - POST /explain         cuerpo: la traza (texto) o {"trace": "..."}
+    - POST /explain/batch   cuerpo: {"traces": [...]} → {"results": [...]}
+    Parámetro opcional ?rungs=all|active (por defecto todos los rungs).
+
+    Las conexiones se mantienen abiertas entre peticiones (keep-alive,
+    cerradas tras KEEPALIVE_TIMEOUT s sin actividad). El parseo y la
+    construcción se hacen en un pool de procesos; los lotes se reparten en
+    trozos de BATCH_CHUNK_SIZE trazas entre los workers.
+    """
+
+    DEFAULT_PORT = 8765
+    KEEPALIVE_TIMEOUT = 15
+    MAX_BODY_BYTES = 64 * 1024 * 1024
+    BATCH_CHUNK_SIZE = 16
+
+    _REASONS = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        405: "Method Not Allowed",
+        411: "Length Required",
+        413: "Payload Too Large",
+        422: "Unprocessable Entity",
+        431: "Request Header Fields Too Large",
+        500: "Internal Server Error",
+        501: "Not Implemented",
+    }
+
+    def __init__(
+            self,
+            base_path: str,
+            host: str = "127.0.0.1",
+            port: int = DEFAULT_PORT,
+            workers: int = None,
+            engine: str = None
+    ):
+        if host not in LOCAL_HOSTS:
+            raise ValueError(f"El servicio de explain solo escucha en local: {host}")
+
+        self.base_path = base_path
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.engine = engine
+
+        self._pool = None
+        self._server = None
+
+    # =========================
+    # LIFECYCLE
+    # =========================
+
+    async def start(self) -> asyncio.AbstractServer:
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Con port=0 el sistema asigna uno libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def run(self):
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    # =========================
+    # CONNECTIONS
+    # =========================
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.KEEPALIVE_TIMEOUT
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "Cabeceras demasiado grandes"}, False)
+                    return
+
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                except _HTTPError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, False)
+                    return
+
+                keep_alive = self._keep_alive(version, headers)
+
+                try:
+                    body = await self._read_body(reader, headers)
+                    status, payload = await self._dispatch(method, target, body)
+                except _HTTPError as e:
+                    # Cuerpo no leído o petición rota: no se puede seguir
+                    # usando la conexión
+                    keep_alive = keep_alive and e.status not in (411, 413, 501)
+                    status, payload = e.status, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    return
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _parse_head(head: bytes):
+        lines = head.decode("latin-1").split("\r\n")
+
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise _HTTPError(400, "Línea de petición inválida")
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise _HTTPError(400, "Cabecera inválida")
+            headers[name.strip().lower()] = value.strip()
+
+        return method, target, version, headers
+
+    @staticmethod
+    def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if "transfer-encoding" in headers:
+            raise _HTTPError(501, "Transfer-Encoding no soportado: usa Content-Length")
+
+        length = headers.get("content-length")
+        if length is None:
+            return b""
+
+        try:
+            length = int(length)
+        except ValueError:
+            raise _HTTPError(411, "Content-Length inválido")
+        if length < 0:
+            raise _HTTPError(411, "Content-Length inválido")
+        if length > self.MAX_BODY_BYTES:
+            raise _HTTPError(413, "Cuerpo demasiado grande")
+
+        return await reader.readexactly(length)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+
+        head = [
+            f"HTTP/1.1 {status} {self._REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+        ]
+        if keep_alive:
+            head.append("Connection: keep-alive")
+            head.append(f"Keep-Alive: timeout={self.KEEPALIVE_TIMEOUT}")
+        else:
+            head.append("Connection: close")
+
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    # =========================
+    # ENDPOINTS
+    # =========================
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+
+        routes = {
+            "/health": ("GET", self._health),
+            "/explain": ("POST", self._explain),
+            "/explain/batch": ("POST", self._explain_batch),
+        }
+
+        route = routes.get(url.path.rstrip("/") or "/")
+        if route is None:
+            raise _HTTPError(404, f"Ruta desconocida: {url.path}")
+
+        allowed, handler = route
+        if method != allowed:
+            raise _HTTPError(405, f"Método no permitido: {method}")
+
+        rungs = query.get("rungs", [DEFAULT_EXPLAIN_RUNGS])[-1]
+        if rungs not in EXPLAIN_RUNGS:
+            raise _HTTPError(400, f"Valor de rungs desconocido: {rungs}")
+
+        return await handler(body, rungs)
+
+    async def _health(self, body: bytes, rungs: str):
+        return 200, {"status": "ok"}
+
+    async def _explain(self, body: bytes, rungs: str):
+        text = self._decode(body)
+
+        if text.lstrip().startswith("{"):
+            trace = self._load_json(text).get("trace")
+        else:
+            trace = text
+
+        if not isinstance(trace, str) or not trace.strip():
+            raise _HTTPError(400, "Falta la traza SCP")
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self._pool, explain_trace, self.base_path, self.engine, trace, rungs
+        )
+
+        return (422 if result.get("error") else 200), result
+
+    async def _explain_batch(self, body: bytes, rungs: str):
+        traces = self._load_json(self._decode(body)).get("traces")
+
+        if not isinstance(traces, list) or not all(isinstance(t, str) for t in traces):
+            raise _HTTPError(400, "traces debe ser una lista de trazas")
+
+        loop = asyncio.get_running_loop()
+        chunks = [
+            traces[i:i + self.BATCH_CHUNK_SIZE]
+            for i in range(0, len(traces), self.BATCH_CHUNK_SIZE)
+        ]
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(
+                self._pool, explain_traces, self.base_path, self.engine, chunk, rungs
+            )
+            for chunk in chunks
+        ))
+
+        return 200, {"results": [r for results in chunk_results for r in results]}
+
+    # =========================
+    # HELPERS
+    # =========================
+
+    @staticmethod
+    def _decode(body: bytes) -> str:
+        try:
+            return body.decode("utf-8")
+        except UnicodeDecodeError:
+            raise _HTTPError(400, "El cuerpo debe estar en UTF-8")
+
+    @staticmethod
+    def _load_json(text: str) -> Dict[str, Any]:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise _HTTPError(400, "JSON inválido")
+        if not isinstance(data, dict):
+            raise _HTTPError(400, "Se esperaba un objeto JSON")
+        return data
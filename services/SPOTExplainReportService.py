@@ -0,0 +1,331 @@
+import html
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, TextIO
+
+from services.SCPCatalogService import SCPCatalogService
+from services.SCPSearchService import SCPSearchService
+from services.SPOTAuditExplainService import SpotAuditExplainService
+from services.SPOTColumnarStoreService import SPOTColumnarStoreService
+from services.SPOTConstructionService import SPOTConstructionService
+from services.SPOTExplainHTTPService import EXPLAIN_RUNGS, DEFAULT_EXPLAIN_RUNGS
+
+
+# Formatos del informe (por defecto según la extensión del fichero)
+REPORT_FORMATS = ("text", "html", "jsonl")
+DEFAULT_REPORT_FORMAT = "text"
+
+_FORMAT_EXTENSIONS = {".txt": "text", ".html": "html", ".htm": "html", ".jsonl": "jsonl"}
+
+
+def load_spot(
+        base_path: str,
+        scp_id: str,
+        store: SPOTColumnarStoreService = None,
+        catalog: SCPCatalogService = None
+):
+    """
+    Spot construction guardado de un SCP: el JSON si existe y si no el
+    almacén columnar (mismo orden que SpotConstructionScreen). None si no
+    hay ninguno.
+
+    En el almacén columnar solo se lee el día que registra el catálogo;
+    se buscan todos los días únicamente si el SCP no está catalogado.
+    """
+    path = SPOTConstructionService.output_path(base_path, scp_id)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    if catalog is None:
+        catalog = SCPCatalogService(base_path)
+        try:
+            day = catalog.spot_day(scp_id)
+        finally:
+            catalog.close()
+    else:
+        day = catalog.spot_day(scp_id)
+
+    return (store or SPOTColumnarStoreService(base_path)).load(scp_id, day)
+
+
+def explain_spot(spot: Dict[str, Any], rungs: str = DEFAULT_EXPLAIN_RUNGS) -> List[Dict[str, Any]]:
+    """
+    Audit explain de los rungs de un spot construction: todos o solo el
+    que se aplica al notional (rungs="active").
+    """
+    if rungs == "active":
+        rung = SPOTConstructionService.active_rung(spot)
+        selected = [rung] if rung is not None else []
+    else:
+        selected = spot.get("rungs", [])
+
+    return [
+        {
+            "amt": rung.get("amt"),
+            "explain": SpotAuditExplainService(
+                context=spot.get("context", {}),
+                notional=spot.get("notional", {}),
+                rung=rung
+            ).build()
+        }
+        for rung in selected
+    ]
+
+
+def _explain_chunk(base_path: str, scp_ids: List[str], rungs: str) -> List[Dict[str, Any]]:
+    """
+    Trabajo de un chunk (proceso del pool): explains de cada SCP.
+    """
+    store = SPOTColumnarStoreService(base_path)
+    catalog = SCPCatalogService(base_path)
+    records = []
+
+    for scp_id in scp_ids:
+        try:
+            spot = load_spot(base_path, scp_id, store, catalog)
+            if spot is None:
+                raise ValueError("No existe el desglose de Spot")
+
+            records.append({
+                "scpId": scp_id,
+                "context": spot.get("context", {}),
+                "client": spot.get("client", {}),
+                "notional": spot.get("notional", {}),
+                "explains": explain_spot(spot, rungs)
+            })
+        except Exception as e:
+            records.append({"scpId": scp_id, "error": f"{type(e).__name__}: {e}"})
+
+    catalog.close()
+    return records
+
+
+class SPOTExplainReportService:
+    """
+    Informe de auditoría de muchos SCPs en un único fichero: el audit
+    explain de todos sus rungs (o solo del activo), en texto, HTML o JSON
+    Lines.
+
+    Los SCPs se indican por id o con los filtros de SCPSearchService (p. ej.
+    client_id + time_from/time_to de un día). Los ids se leen del catálogo
+    por páginas y los explains se generan en un pool de procesos con como
+    máximo 2 × workers chunks en vuelo; cada resultado se escribe en cuanto
+    llega y en el orden de entrada, así que la memoria no depende del
+    número de SCPs. El fichero se escribe en un temporal y se renombra al
+    terminar.
+    """
+
+    DEFAULT_CHUNK_SIZE = 32
+    PAGE_SIZE = 500
+
+    TEXT_RULE = "=" * 80
+
+    def __init__(self, base_path: str, workers: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.base_path = base_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    @staticmethod
+    def format_for(path: str, report_format: str = None) -> str:
+        report_format = report_format or _FORMAT_EXTENSIONS.get(
+            os.path.splitext(path)[1].lower(), DEFAULT_REPORT_FORMAT
+        )
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Formato de informe desconocido: {report_format}")
+        return report_format
+
+    def iter_scp_ids(self, **filters) -> Iterator[str]:
+        """
+        Ids del catálogo que cumplen los filtros, en el orden del listado,
+        leídos de PAGE_SIZE en PAGE_SIZE.
+        """
+        search = SCPSearchService(self.base_path)
+        try:
+            search.catalog.sync()
+            offset = 0
+            while True:
+                page = search.window(offset, self.PAGE_SIZE, **filters)
+                for entry in page:
+                    yield entry["scpId"]
+                if len(page) < self.PAGE_SIZE:
+                    return
+                offset += len(page)
+        finally:
+            search.close()
+
+    def write(
+            self,
+            output_path: str,
+            scp_ids: Iterable[str] = None,
+            rungs: str = DEFAULT_EXPLAIN_RUNGS,
+            report_format: str = None,
+            **filters
+    ) -> Dict[str, Any]:
+        """
+        Genera el informe de scp_ids (o de los SCPs que cumplen filters) y
+        devuelve un resumen:
+        {"path", "format", "scps", "rungs", "failed", "failures": [{"scpId", "error"}]}
+        """
+        if rungs not in EXPLAIN_RUNGS:
+            raise ValueError(f"Valor de rungs desconocido: {rungs}")
+        report_format = self.format_for(output_path, report_format)
+
+        if scp_ids is None:
+            scp_ids = self.iter_scp_ids(**filters)
+
+        summary = {
+            "path": output_path,
+            "format": report_format,
+            "scps": 0,
+            "rungs": 0,
+            "failed": 0,
+            "failures": []
+        }
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{output_path}.tmp"
+
+        try:
+            with open(tmp, "w", encoding="utf-8") as out:
+                self._write_header(out, report_format, filters)
+
+                for record in self._iter_records(scp_ids, rungs):
+                    summary["scps"] += 1
+                    if record.get("error"):
+                        summary["failed"] += 1
+                        summary["failures"].append(
+                            {"scpId": record["scpId"], "error": record["error"]}
+                        )
+                    else:
+                        summary["rungs"] += len(record["explains"])
+                    self._write_record(out, report_format, record)
+
+                self._write_footer(out, report_format, summary)
+
+            os.replace(tmp, output_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        return summary
+
+    # =========================
+    # PIPELINE
+    # =========================
+
+    def _iter_chunks(self, scp_ids: Iterable[str]) -> Iterator[List[str]]:
+        iterator = iter(scp_ids)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _iter_records(self, scp_ids: Iterable[str], rungs: str) -> Iterator[Dict[str, Any]]:
+        if self.workers <= 1:
+            for chunk in self._iter_chunks(scp_ids):
+                yield from _explain_chunk(self.base_path, chunk, rungs)
+            return
+
+        max_in_flight = self.workers * 2
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+
+            for chunk in self._iter_chunks(scp_ids):
+                pending.append((chunk, pool.submit(_explain_chunk, self.base_path, chunk, rungs)))
+                if len(pending) >= max_in_flight:
+                    yield from self._collect(*pending.popleft())
+
+            while pending:
+                yield from self._collect(*pending.popleft())
+
+    @staticmethod
+    def _collect(chunk: List[str], future) -> Iterator[Dict[str, Any]]:
+        try:
+            yield from future.result()
+        except Exception as e:
+            # Caída del worker: todo el chunk se marca como fallido
+            for scp_id in chunk:
+                yield {"scpId": scp_id, "error": f"{type(e).__name__}: {e}"}
+
+    # =========================
+    # RENDER
+    # =========================
+
+    def _write_header(self, out: TextIO, report_format: str, filters: Dict[str, Any]):
+        generated = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        criteria = ", ".join(f"{k}={v}" for k, v in filters.items() if v not in (None, ""))
+
+        if report_format == "text":
+            out.write(
+                f"{self.TEXT_RULE}\nSPOT AUDIT EXPLAIN REPORT\n"
+                f"Generado: {generated}\n"
+                + (f"Filtros: {criteria}\n" if criteria else "")
+                + f"{self.TEXT_RULE}\n\n"
+            )
+        elif report_format == "html":
+            out.write(
+                "<!DOCTYPE html>\n<html lang=\"es\">\n<head>\n<meta charset=\"utf-8\">\n"
+                "<title>Spot audit explain report</title>\n"
+                "<style>body{font-family:sans-serif;margin:2em}"
+                "section{border-top:1px solid #ccc;padding:1em 0}"
+                "pre{background:#f6f8fa;padding:1em;white-space:pre-wrap}"
+                ".error{color:#b91c1c}</style>\n</head>\n<body>\n"
+                "<h1>Spot audit explain report</h1>\n"
+                f"<p>Generado: {html.escape(generated)}"
+                + (f"<br>Filtros: {html.escape(criteria)}" if criteria else "")
+                + "</p>\n"
+            )
+
+    def _write_record(self, out: TextIO, report_format: str, record: Dict[str, Any]):
+        if report_format == "jsonl":
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            return
+
+        context = record.get("context", {})
+        notional = record.get("notional", {})
+        client = record.get("client", {})
+        title = (
+            f"SCP {record['scpId']} · {context.get('ccyPair')} · "
+            f"notional {notional.get('amount')} · cliente {client.get('venueClientId')}"
+        )
+
+        if report_format == "text":
+            out.write(f"{self.TEXT_RULE}\n{title}\n{self.TEXT_RULE}\n")
+            if record.get("error"):
+                out.write(f"ERROR: {record['error']}\n\n")
+                return
+            for item in record["explains"]:
+                out.write(f"\n--- RUNG {item['amt']} ---\n\n{item['explain']}\n")
+            out.write("\n")
+            return
+
+        out.write(f"<section>\n<h2>{html.escape(title)}</h2>\n")
+        if record.get("error"):
+            out.write(f"<p class=\"error\">{html.escape(record['error'])}</p>\n")
+        for item in record.get("explains", []):
+            out.write(
+                f"<h3>Rung {html.escape(str(item['amt']))}</h3>\n"
+                f"<pre>{html.escape(item['explain'])}</pre>\n"
+            )
+        out.write("</section>\n")
+
+    def _write_footer(self, out: TextIO, report_format: str, summary: Dict[str, Any]):
+        totals = f"SCPs: {summary['scps']} · rungs: {summary['rungs']} · errores: {summary['failed']}"
+
+        if report_format == "text":
+            out.write(f"{self.TEXT_RULE}\n{totals}\n")
+        elif report_format == "html":
+            out.write(f"<p><strong>{html.escape(totals)}</strong></p>\n</body>\n</html>\n")
@@ -0,0 +1,139 @@
+from typing import Dict, Any, Iterable
+
+from services.SPOTConstructionService import SPOTConstructionService
+
+
+class SPOTScenarioService(SPOTConstructionService):
+    """
+    What-if de spot construction sobre un SCP ya parseado.
+
+    Calcula los rungs bajo varios escenarios en una sola llamada: otro
+    mktMode (N/A/B/F) y/o overrides de TOM (bidSpread, askSpread,
+    minSpread) y de rung modifiers (type, value, min). Los precios core
+    del CRL, el índice del TOM, las posiciones de cada rung y las tablas
+    de RM por escenario se calculan una vez y se reutilizan en todos los
+    escenarios.
+
+    Escenario (dict, o solo el mktMode como string):
+    {
+        "name": str                          (opcional, por defecto el mktMode)
+        "mktMode": "N" | "A" | "B" | "F"     (por defecto el del TOM)
+        "tom": {campo: valor}                (todos los rungs)
+        "tomByAmt": {amt: {campo: valor}}
+        "rm": {campo: valor}                 (todas las posiciones)
+        "rmByPosition": {posición: {campo: valor}}
+    }
+    Los overrides se combinan con el rung del TOM / RM registrado; un rung
+    sin entrada pasa a tenerla.
+    """
+
+    SCENARIO_KEYS = {"name", "mktMode", "tom", "tomByAmt", "rm", "rmByPosition"}
+
+    def __init__(self, parsed_scp: Dict[str, Any], base_path: str):
+        super().__init__(parsed_scp, base_path)
+        self._scenario = None
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def run(self, scenarios: Iterable[Any] = None) -> Dict[str, Any]:
+        """
+        Devuelve el contexto del SCP y, por escenario, los rungs con el
+        mismo formato que SPOTConstructionService.build().
+        Sin escenarios se calculan los cuatro mktMode sin overrides.
+        """
+        if scenarios is None:
+            scenarios = self.MKT_MODES
+
+        specs = [self._normalize_scenario(s) for s in scenarios]
+
+        # Intermedios compartidos entre escenarios (los índices de posición
+        # y de RM los mantiene el servicio base)
+        core_rungs = self._extract_core_rungs()
+        tom_index = self._index_tom_rungs()
+
+        results = []
+        try:
+            for spec in specs:
+                self._scenario = spec
+                results.append({
+                    "name": spec["name"],
+                    "mktMode": spec["mktMode"],
+                    "volatilityScenario": self._extract_volatility_scenario(),
+                    "rungs": [
+                        self._build_rung(rung, self._scenario_tom(tom_index, rung["amt"]))
+                        for rung in core_rungs
+                    ]
+                })
+        finally:
+            self._scenario = None
+
+        return {
+            "context": self._extract_context(),
+            "client": self._extract_client(),
+            "notional": self._extract_notional(),
+            "recordedMktMode": super()._market_mode(),
+            "scenarios": results
+        }
+
+    # =========================
+    # SCENARIOS
+    # =========================
+
+    def _normalize_scenario(self, scenario) -> Dict[str, Any]:
+        if isinstance(scenario, str):
+            scenario = {"mktMode": scenario}
+
+        unknown = set(scenario) - self.SCENARIO_KEYS
+        if unknown:
+            raise ValueError(f"Campos de escenario desconocidos: {', '.join(sorted(unknown))}")
+
+        mkt_mode = scenario.get("mktMode") or super()._market_mode()
+        if mkt_mode not in self.MKT_MODES:
+            raise ValueError(f"mktMode desconocido: {mkt_mode}")
+
+        tom_by_amt = {
+            int(amt): self.check_override_fields(fields, self.TOM_FIELDS, "TOM")
+            for amt, fields in (scenario.get("tomByAmt") or {}).items()
+        }
+        rm_by_position = {
+            int(pos): self.check_override_fields(fields, self.RM_FIELDS, "RM")
+            for pos, fields in (scenario.get("rmByPosition") or {}).items()
+        }
+
+        return {
+            "name": scenario.get("name") or mkt_mode,
+            "mktMode": mkt_mode,
+            "tom": self.check_override_fields(scenario.get("tom") or {}, self.TOM_FIELDS, "TOM"),
+            "tomByAmt": tom_by_amt,
+            "rm": self.check_override_fields(scenario.get("rm") or {}, self.RM_FIELDS, "RM"),
+            "rmByPosition": rm_by_position
+        }
+
+    def _scenario_tom(self, tom_index: Dict[int, Dict[str, Any]], amt: int) -> Dict[str, Any] | None:
+        tom = tom_index.get(amt)
+        overrides = {**self._scenario["tom"], **self._scenario["tomByAmt"].get(amt, {})}
+
+        if not overrides:
+            return tom
+
+        return {**(tom or {"amt": amt}), **overrides}
+
+    # =========================
+    # OVERRIDES DEL SERVICIO BASE
+    # =========================
+
+    def _market_mode(self) -> str:
+        if self._scenario is None:
+            return super()._market_mode()
+        return self._scenario["mktMode"]
+
+    def _extract_rung_modifier(self, amt: int) -> Dict[str, Any]:
+        if self._scenario is None or not (self._scenario["rm"] or self._scenario["rmByPosition"]):
+            return super()._extract_rung_modifier(amt)
+
+        rung_pos = self._get_active_rung_position(amt)
+        overrides = {**self._scenario["rm"], **self._scenario["rmByPosition"].get(rung_pos, {})}
+
+        return self.rung_modifier_with_override(amt, self._market_mode(), overrides)
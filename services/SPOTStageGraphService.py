@@ -0,0 +1,250 @@
+from collections import Counter
+from typing import Dict, Any, List
+
+from services.SPOTConstructionService import SPOTConstructionService
+
+
+# Entradas de cada rung (por posición en los rungs core) y globales
+RUNG_INPUTS = ("core", "tom", "rmOverride")
+GLOBAL_INPUTS = ("mktMode",)
+
+# Grafo de etapas de un rung, en orden topológico: nodo → (dependencias,
+# método que lo calcula). Los métodos reciben la posición del rung y los
+# valores de las dependencias
+STAGES = {
+    "adjustment": (("tom",), "_stage_adjustment"),
+    "priceAdjustment": (("core", "adjustment"), "_stage_price_adjustment"),
+    "midSpread": (("priceAdjustment",), "_stage_mid_spread"),
+    "rungModifier": (("mktMode", "rmOverride"), "_stage_rung_modifier"),
+    "priceAfterRungModifier": (
+        ("midSpread", "rungModifier", "priceAdjustment"), "_stage_price_after_rm"
+    ),
+    "minSpread": (("adjustment", "rungModifier"), "_stage_min_spread"),
+    "priceAfterMinSpread": (
+        ("priceAfterRungModifier", "minSpread"), "_stage_price_after_min_spread"
+    ),
+    "rung": (
+        (
+            "core", "adjustment", "priceAdjustment", "midSpread", "mktMode",
+            "rungModifier", "priceAfterRungModifier", "minSpread", "priceAfterMinSpread"
+        ),
+        "_stage_rung"
+    ),
+}
+
+
+class SPOTStageGraphService(SPOTConstructionService):
+    """
+    Spot construction incremental: cada rung se calcula como un grafo de
+    etapas (core → ajuste TOM → mid/spread → RM → min spread) con la salida
+    de cada nodo memorizada.
+
+    Al cambiar una entrada (set_core, set_tom, set_rung_modifier,
+    set_market_mode) el siguiente build() recalcula solo los nodos que
+    dependen de ella; si un nodo recalculado da el mismo valor que antes,
+    los posteriores no se recalculan. build() devuelve lo mismo que
+    SPOTConstructionService.build() sobre el SCP con esas entradas.
+
+    Los overrides siguen las reglas de SPOTScenarioService (se combinan con
+    el rung del TOM / el RM registrado, ver rung_modifier_with_override). Los resultados comparten los nodos
+    memorizados: no deben modificarse.
+    """
+
+    def __init__(self, parsed_scp: Dict[str, Any], base_path: str):
+        super().__init__(parsed_scp, base_path)
+
+        self._core = self._extract_core_rungs()
+        self._tom_index = self._index_tom_rungs()
+        self._static = {
+            "context": self._extract_context(),
+            "client": self._extract_client(),
+            "notional": self._extract_notional()
+        }
+
+        # Valores de entradas y nodos por rung, y entradas cambiadas desde
+        # el último build() (al principio todas)
+        self._mkt_mode = super()._market_mode()
+        self._values = [
+            {"core": rung["core"], "tom": self._tom_index.get(rung["amt"]), "rmOverride": None}
+            for rung in self._core
+        ]
+        self._changed = {
+            index: set(RUNG_INPUTS + GLOBAL_INPUTS) for index in range(len(self._core))
+        }
+
+        # Recálculos por etapa (diagnóstico y pruebas)
+        self.recomputed = Counter()
+
+    # =========================
+    # PUBLIC
+    # =========================
+
+    def build(self) -> Dict[str, Any]:
+        for index, changed in self._changed.items():
+            self._recompute(index, changed)
+        self._changed = {}
+
+        return {
+            **self._static,
+            "rungs": [values["rung"] for values in self._values]
+        }
+
+    def set_market_mode(self, mkt_mode: str | None):
+        """
+        mktMode con el que se eligen los rung modifiers (None: el del TOM).
+        """
+        if mkt_mode is None:
+            mkt_mode = super()._market_mode()
+        elif mkt_mode not in self.MKT_MODES:
+            raise ValueError(f"mktMode desconocido: {mkt_mode}")
+
+        if mkt_mode != self._mkt_mode:
+            self._mkt_mode = mkt_mode
+            for index in range(len(self._core)):
+                self._changed.setdefault(index, set()).add("mktMode")
+
+    def set_core(self, amt: int, core: Dict[str, str] | None):
+        """
+        Precios core {"bid", "ask"} de los rungs de importe amt (None: los
+        del CRL).
+        """
+        for index in self._positions(amt):
+            value = self._core[index]["core"] if core is None else {
+                "bid": str(core["bid"]), "ask": str(core["ask"])
+            }
+            self._set_input(index, "core", value)
+
+    def set_tom(self, amt: int, fields: Dict[str, Any] | None):
+        """
+        Override del rung del TOM de importe amt (bidSpread, askSpread,
+        minSpread). None vuelve al TOM registrado.
+        """
+        recorded = self._tom_index.get(int(amt))
+        if fields:
+            fields = self.check_override_fields(fields, self.TOM_FIELDS, "TOM")
+            value = {**(recorded or {"amt": int(amt)}), **fields}
+        else:
+            value = recorded
+
+        for index in self._positions(amt):
+            self._set_input(index, "tom", value)
+
+    def set_rung_modifier(self, amt: int, fields: Dict[str, Any] | None):
+        """
+        Override del rung modifier de los rungs de importe amt (type, value,
+        min). None vuelve al RM registrado.
+        """
+        if fields:
+            fields = self.check_override_fields(fields, self.RM_FIELDS, "RM")
+
+        for index in self._positions(amt):
+            self._set_input(index, "rmOverride", dict(fields) if fields else None)
+
+    def reset(self):
+        """
+        Vuelve a las entradas del SCP (los nodos que no cambian se
+        conservan).
+        """
+        self.set_market_mode(None)
+        for index, rung in enumerate(self._core):
+            self._set_input(index, "core", rung["core"])
+            self._set_input(index, "tom", self._tom_index.get(rung["amt"]))
+            self._set_input(index, "rmOverride", None)
+
+    # =========================
+    # GRAPH
+    # =========================
+
+    def _positions(self, amt: int) -> List[int]:
+        positions = [i for i, rung in enumerate(self._core) if rung["amt"] == int(amt)]
+        if not positions:
+            raise ValueError(f"No hay ningún rung con importe {amt}")
+        return positions
+
+    def _set_input(self, index: int, name: str, value):
+        if self._values[index][name] != value:
+            self._values[index][name] = value
+            self._changed.setdefault(index, set()).add(name)
+
+    def _recompute(self, index: int, changed: set):
+        """
+        Recalcula en orden topológico los nodos del rung con alguna
+        dependencia cambiada; un nodo que da el mismo valor no cuenta como
+        cambiado para los siguientes.
+        """
+        values = self._values[index]
+        values["mktMode"] = self._mkt_mode
+
+        for name, (deps, method) in STAGES.items():
+            if changed.isdisjoint(deps):
+                continue
+
+            value = getattr(self, method)(index, *(values[dep] for dep in deps))
+            self.recomputed[name] += 1
+
+            if name not in values or values[name] != value:
+                values[name] = value
+                changed.add(name)
+
+    # =========================
+    # STAGES
+    # =========================
+
+    def _stage_adjustment(self, index, tom):
+        return self._build_adjustment(tom)
+
+    def _stage_price_adjustment(self, index, core, adjustment):
+        return self._apply_adjustment(core, adjustment)
+
+    def _stage_mid_spread(self, index, price_adjustment):
+        return self._calculate_mid_and_spread(price_adjustment)
+
+    def _stage_rung_modifier(self, index, mkt_mode, override):
+        amt = self._core[index]["amt"]
+        if not override:
+            return self._extract_rung_modifier(amt)
+        return self.rung_modifier_with_override(amt, mkt_mode, override)
+
+    def _stage_price_after_rm(self, index, mid_spread, rm_info, price_adjustment):
+        return self._apply_rung_modifier_price(
+            mid_spread,
+            rm_info["RMType"],
+            rm_info["RMValue"],
+            fallback_price=price_adjustment
+        )
+
+    def _stage_min_spread(self, index, adjustment, rm_info):
+        return self._calculate_effective_min_spread(adjustment, rm_info["RMMin"])
+
+    def _stage_price_after_min_spread(self, index, price_after_rm, min_spread):
+        return self._apply_min_spread(price_after_rm, min_spread)
+
+    def _stage_rung(
+            self, index, core, adjustment, price_adjustment, mid_spread, mkt_mode,
+            rm_info, price_after_rm, min_spread, price_after_min_spread
+    ):
+        # Mismo formato que SPOTConstructionService._build_rung
+        return {
+            "amt": self._core[index]["amt"],
+            "core": core,
+            "adjustment": adjustment,
+            "priceAdjustment": price_adjustment,
+            "midSpread": mid_spread,
+            "volatilityScenario": self.VOLATILITY_SCENARIOS.get(mkt_mode, "Normal"),
+
+            "rungModifier": rm_info["rungModifier"],
+            "RMValue": rm_info["RMValue"],
+            "RMType": rm_info["RMType"],
+            "RMMin": rm_info["RMMin"],
+
+            "priceAfterRungModifier": price_after_rm,
+            "minSpread": min_spread,
+            "priceAfterMinSpread": price_after_min_spread
+        }
+
+    # =========================
+    # OVERRIDES DEL SERVICIO BASE
+    # =========================
+
+    def _market_mode(self) -> str:
+        return self._mkt_mode